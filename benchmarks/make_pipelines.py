@@ -0,0 +1,155 @@
+"""Compile synthetic KubeFlow Pipelines with different shapes for benchmarking."""
+from pathlib import Path
+
+from kfp import compiler, dsl
+from kfp.dsl.graph_component import GraphComponent
+
+PIPELINE_ROOT_PATH = "gs://object-storage"
+
+
+@dsl.component(base_image="python:3.10")
+def noop() -> None:
+    """Do nothing - used to measure the overhead of launching a task."""
+
+
+@dsl.component(base_image="python:3.10")
+def increment(x: int) -> int:
+    """Add one to x."""
+    return x + 1
+
+
+@dsl.component(base_image="python:3.10")
+def many_params(
+    i0: int,
+    i1: int,
+    f0: float,
+    f1: float,
+    s0: str,
+    s1: str,
+    b0: bool,
+    b1: bool,
+    l0: list,
+    l1: list,
+    d0: dict,
+    d1: dict,
+) -> int:
+    """Consume parameters of every type."""
+    return i0 + i1 + len(s0 + s1) + len(l0 + l1) + len(d0) + len(d1)
+
+
+@dsl.component(base_image="python:3.10")
+def write_bytes(size: int, data: dsl.Output[dsl.Dataset]) -> None:
+    """Write size bytes to an artifact."""
+    chunk = bytes(1024 * 1024)
+    with open(data.path, "wb") as file:
+        for _ in range(size // len(chunk)):
+            file.write(chunk)
+        file.write(bytes(size % len(chunk)))
+
+
+@dsl.component(base_image="python:3.10")
+def read_bytes(data: dsl.Input[dsl.Dataset]) -> int:
+    """Read an artifact and return its size."""
+    with open(data.path, "rb") as file:
+        return len(file.read())
+
+
+def noop_pipeline() -> GraphComponent:
+    """Pipeline with a single task that does nothing."""
+
+    @dsl.pipeline(name="noop", pipeline_root=PIPELINE_ROOT_PATH)
+    def pipeline() -> None:
+        noop()
+
+    return pipeline
+
+
+def wide_pipeline(width: int) -> GraphComponent:
+    """Pipeline with one task fanning out to width independent tasks."""
+
+    @dsl.pipeline(name=f"wide-{width}", pipeline_root=PIPELINE_ROOT_PATH)
+    def pipeline() -> None:
+        source = increment(x=0)
+        for _ in range(width):
+            increment(x=source.output)
+
+    return pipeline
+
+
+def deep_pipeline(depth: int) -> GraphComponent:
+    """Pipeline with a chain of depth tasks, each depending on the one before."""
+
+    @dsl.pipeline(name=f"deep-{depth}", pipeline_root=PIPELINE_ROOT_PATH)
+    def pipeline() -> None:
+        task = increment(x=0)
+        for _ in range(depth - 1):
+            task = increment(x=task.output)
+
+    return pipeline
+
+
+def many_params_pipeline(n_tasks: int) -> GraphComponent:
+    """Pipeline with n_tasks tasks that each take twelve parameters.
+
+    Parameters are taken from pipeline inputs, constants and upstream task outputs,
+    to cover every way in which a parameter can be resolved.
+    """
+
+    @dsl.pipeline(name=f"params-{n_tasks}", pipeline_root=PIPELINE_ROOT_PATH)
+    def pipeline(
+        seed: int = 42,
+        rate: float = 0.5,
+        name: str = "benchmark",
+        flag: bool = True,
+        items: list = [1, 2, 3],
+        config: dict = {"a": 1, "b": [2, 3]},
+    ) -> None:
+        source = increment(x=seed)
+        for n in range(n_tasks):
+            many_params(
+                i0=source.output,
+                i1=n,
+                f0=rate,
+                f1=0.25,
+                s0=name,
+                s1=f"task-{n}",
+                b0=flag,
+                b1=False,
+                l0=items,
+                l1=["x", "y"],
+                d0=config,
+                d1={"n": n},
+            )
+
+    return pipeline
+
+
+def large_artifacts_pipeline(size_mb: int, n_readers: int = 2) -> GraphComponent:
+    """Pipeline with one task writing a size_mb artifact that n_readers tasks read."""
+
+    @dsl.pipeline(name=f"artifacts-{size_mb}mb", pipeline_root=PIPELINE_ROOT_PATH)
+    def pipeline() -> None:
+        writer = write_bytes(size=size_mb * 1024 * 1024)
+        for _ in range(n_readers):
+            read_bytes(data=writer.outputs["data"])
+
+    return pipeline
+
+
+def compile_pipeline(pipeline: GraphComponent, output_dir: Path) -> Path:
+    """Compile a pipeline into output_dir/{pipeline name}.json."""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    package_path = output_dir / f"{pipeline.name}.json"
+    compiler.Compiler().compile(pipeline_func=pipeline, package_path=str(package_path))
+    return package_path
+
+
+if __name__ == "__main__":
+    for pipeline in [
+        noop_pipeline(),
+        wide_pipeline(16),
+        deep_pipeline(16),
+        many_params_pipeline(16),
+        large_artifacts_pipeline(64),
+    ]:
+        print(compile_pipeline(pipeline, Path("benchmark-pipelines")))
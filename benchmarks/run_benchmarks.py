@@ -0,0 +1,326 @@
+"""Benchmark the kfp-local execution engine using synthetic pipelines.
+
+Results are written to a JSON file named after the kfp-local version and the time
+the benchmarks were run, so that results from different releases can be compared
+using the --compare option.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from datetime import datetime
+from importlib.metadata import version
+from pathlib import Path
+from typing import Any
+
+from benchmarks.make_pipelines import (
+    compile_pipeline,
+    deep_pipeline,
+    large_artifacts_pipeline,
+    many_params_pipeline,
+    noop_pipeline,
+    wide_pipeline,
+)
+from kfp_local.pipelines import _get_func_args, run_pipeline
+from kfp_local.plan import plan_pipeline
+from kfp_local.report import TIMINGS_FILE
+from kfp_local.spec import SPEC_CACHE_SUFFIX, get_index, load_pipeline_spec
+
+RESULTS_FOLDER = Path(__file__).parent / "results"
+MODES = ["subprocess", "warm", "nox"]
+
+Result = dict[str, Any]
+
+
+def _result(benchmark: str, case: str, samples: list[float]) -> Result:
+    """Summarise timings from repeated runs of a benchmark."""
+    return {
+        "name": f"{benchmark}[{case}]",
+        "median": statistics.median(samples),
+        "min": min(samples),
+        "max": max(samples),
+        "samples": samples,
+    }
+
+
+def _time(fn: Callable[[], Any], repeat: int) -> list[float]:
+    """Time repeated calls to a function."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def _run(pipeline_file: Path, mode: str, root: Path, **kwargs: Any) -> str:
+    """Run every task in a pipeline using one of the execution modes."""
+    tasks = list(get_index(load_pipeline_spec(str(pipeline_file))).tasks)
+    return run_pipeline(
+        tasks,
+        str(pipeline_file),
+        use_nox=mode == "nox",
+        use_warm_pool=mode == "warm",
+        use_cache=False,
+        root=str(root),
+        keep_runs=None,
+        **kwargs,
+    )
+
+
+def bench_load_pipeline_spec(pipeline_file: Path, repeat: int) -> list[Result]:
+    """Time loading a compiled pipeline, with and without a cached spec."""
+
+    def load_cold() -> None:
+        for cache in pipeline_file.parent.glob(f".*{SPEC_CACHE_SUFFIX}"):
+            cache.unlink()
+        load_pipeline_spec(str(pipeline_file))
+
+    def load_warm() -> None:
+        load_pipeline_spec(str(pipeline_file))
+
+    load_cold()
+    return [
+        _result(
+            "load_pipeline_spec", f"{pipeline_file.stem}/cold", _time(load_cold, repeat)
+        ),
+        _result(
+            "load_pipeline_spec", f"{pipeline_file.stem}/warm", _time(load_warm, repeat)
+        ),
+    ]
+
+
+def bench_get_func_args(pipeline_file: Path, root: Path, repeat: int) -> Result:
+    """Time resolving the executor inputs for every task in a pipeline.
+
+    Outputs are shared between tasks using a store, as they are by run_pipeline, so
+    each task's output_metadata.json is read once per pass.
+    """
+    run_id = _run(pipeline_file, "warm", root)
+    pipeline = load_pipeline_spec(str(pipeline_file))
+    tasks = list(get_index(pipeline).tasks)
+    run_dir = str(root / run_id)
+
+    def resolve_all() -> None:
+        outputs: dict[str, dict[str, Any]] = {}
+        for task in tasks:
+            _get_func_args(pipeline, task, run_dir, outputs=outputs)
+
+    samples = [t / len(tasks) for t in _time(resolve_all, repeat)]
+    return _result("get_func_args_per_task", pipeline_file.stem, samples)
+
+
+def bench_plan_pipeline(pipeline_file: Path, root: Path, repeat: int) -> Result:
+    """Time planning a run of every task in a pipeline."""
+    pipeline = load_pipeline_spec(str(pipeline_file))
+    tasks = list(get_index(pipeline).tasks)
+    samples = _time(lambda: plan_pipeline(tasks, pipeline, root=str(root)), repeat)
+    return _result("plan_pipeline", pipeline_file.stem, samples)
+
+
+def bench_launch_overhead(
+    pipeline_file: Path, mode: str, root: Path, repeat: int
+) -> list[Result]:
+    """Time launching a task that does nothing, split into setup and execution."""
+    setup_times, run_times = [], []
+    for _ in range(repeat):
+        run_id = _run(pipeline_file, mode, root)
+        timings = json.loads((root / run_id / TIMINGS_FILE).read_text())
+        setup_times.append(timings["tasks"][0]["setup_time"])
+        run_times.append(timings["tasks"][0]["run_time"])
+    return [
+        _result("launch_setup", mode, setup_times),
+        _result("launch_run", mode, run_times),
+    ]
+
+
+def bench_run_pipeline(
+    pipeline_file: Path, mode: str, root: Path, repeat: int, max_workers: int | None
+) -> Result:
+    """Time running every task in a pipeline end-to-end."""
+    samples = _time(
+        lambda: _run(pipeline_file, mode, root, max_workers=max_workers), repeat
+    )
+    return _result("run_pipeline", f"{pipeline_file.stem}/{mode}", samples)
+
+
+def bench_cli_startup(pipeline_file: Path, history: Path, repeat: int) -> list[Result]:
+    """Time running kfpl commands that don't execute tasks, from start to exit.
+
+    Starting the Python interpreter on its own is timed too, as a baseline.
+    """
+    commands = {
+        "python": ["-c", "pass"],
+        "help": ["-m", "kfp_local.cli", "--help"],
+        "tasks": ["-m", "kfp_local.cli", "tasks", "--pipeline", str(pipeline_file)],
+        "runs_list": [
+            "-m",
+            "kfp_local.cli",
+            "runs",
+            "--history",
+            str(history),
+            "list",
+        ],
+    }
+    return [
+        _result(
+            "cli_startup",
+            case,
+            _time(
+                lambda: subprocess.run(
+                    [sys.executable, *args], check=True, stdout=subprocess.DEVNULL
+                ),
+                repeat,
+            ),
+        )
+        for case, args in commands.items()
+    ]
+
+
+def _metadata() -> dict[str, Any]:
+    """Describe the version of kfp-local and the machine the benchmarks ran on."""
+    commit = subprocess.run(
+        ["git", "rev-parse", "--short", "HEAD"],
+        capture_output=True,
+        text=True,
+        cwd=Path(__file__).parent,
+    )
+    return {
+        "kfp_local_version": version("kfp-local"),
+        "kfp_version": version("kfp"),
+        "git_commit": commit.stdout.strip() if commit.returncode == 0 else None,
+        "python_version": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def compare_results(baseline: dict[str, Any], current: dict[str, Any]) -> str:
+    """Format a table comparing the median timings of two sets of results."""
+    baseline_medians = {r["name"]: r["median"] for r in baseline["results"]}
+    names = [r["name"] for r in current["results"]]
+    width = max(len(name) for name in names)
+    header = f"{'benchmark'.ljust(width)}  {'baseline':>12}  {'current':>12}  change"
+    lines = [header, "-" * len(header)]
+    for r in current["results"]:
+        before = baseline_medians.get(r["name"])
+        if before is None:
+            before_ms, change = "-", "new"
+        else:
+            before_ms = f"{before * 1e3:.3f}ms"
+            change = f"{(r['median'] - before) / before:+.1%}" if before else "-"
+        current_ms = f"{r['median'] * 1e3:.3f}ms"
+        lines.append(
+            f"{r['name'].ljust(width)}  {before_ms:>12}  {current_ms:>12}  {change}"
+        )
+    return "\n".join(lines)
+
+
+def run_benchmarks(
+    modes: list[str], quick: bool = False, max_workers: int | None = None
+) -> dict[str, Any]:
+    """Run all benchmarks.
+
+    Args:
+    ----
+        modes: Execution modes to benchmark - any of subprocess, warm and nox.
+        quick: Use smaller pipelines and fewer repeats. Defaults to False.
+        max_workers: Maximum number of tasks to run concurrently. Defaults to the
+            number of CPUs on the machine.
+
+    Returns:
+    -------
+        Metadata describing the environment, together with all results.
+    """
+    size = 4 if quick else 16
+    repeat = 5 if quick else 50
+    e2e_repeat = 1 if quick else 3
+    pipelines = [
+        wide_pipeline(size),
+        deep_pipeline(size),
+        many_params_pipeline(size),
+        large_artifacts_pipeline(size * 4),
+    ]
+
+    results: list[Result] = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pipelines_dir, root = Path(tmp_dir) / "pipelines", Path(tmp_dir) / "runs"
+        pipeline_files = [compile_pipeline(p, pipelines_dir) for p in pipelines]
+        noop_file = compile_pipeline(noop_pipeline(), pipelines_dir)
+
+        results += bench_cli_startup(
+            pipeline_files[0], Path(tmp_dir) / "history.db", repeat
+        )
+        for pipeline_file in pipeline_files:
+            results += bench_load_pipeline_spec(pipeline_file, repeat)
+            results.append(bench_get_func_args(pipeline_file, root, repeat))
+            results.append(bench_plan_pipeline(pipeline_file, root, repeat))
+        for mode in modes:
+            results += bench_launch_overhead(noop_file, mode, root, e2e_repeat)
+            for pipeline_file in pipeline_files:
+                results.append(
+                    bench_run_pipeline(
+                        pipeline_file, mode, root, e2e_repeat, max_workers
+                    )
+                )
+    return {"metadata": _metadata(), "results": results}
+
+
+def _cli() -> None:
+    """Entrypoint for running benchmarks from the command line."""
+    parser = argparse.ArgumentParser(description="Benchmark kfp-local.")
+    parser.add_argument(
+        "--modes",
+        nargs="+",
+        choices=MODES,
+        default=MODES,
+        help="execution modes to benchmark (defaults to all of them)",
+    )
+    parser.add_argument(
+        "--quick",
+        action="store_true",
+        default=False,
+        help="use smaller pipelines and fewer repeats",
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=None,
+        help="maximum number of tasks to run concurrently (defaults to CPU count)",
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=Path,
+        default=RESULTS_FOLDER,
+        help=f"directory to save results in (defaults to {RESULTS_FOLDER})",
+    )
+    parser.add_argument(
+        "--compare",
+        type=Path,
+        default=None,
+        help="results file to compare against",
+    )
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.modes, args.quick, args.max_workers)
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    version_str = results["metadata"]["kfp_local_version"]
+    results_file = args.output_dir / f"{version_str}-{timestamp}.json"
+    results_file.write_text(json.dumps(results, indent=2))
+
+    baseline = json.loads(args.compare.read_text()) if args.compare else {"results": []}
+    print(compare_results(baseline, results))
+    print(f"results saved to {results_file}")
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    _cli()
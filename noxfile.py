@@ -40,4 +40,11 @@ def check_code_formatting(session: nox.Session):
 def check_types(session: nox.Session):
     """Run static type checking."""
     session.install(".[dev]")
-    session.run("mypy", "src", "tests", "noxfile.py")
+    session.run("mypy", "src", "tests", "benchmarks", "noxfile.py")
+
+
+@nox.session(python=PYTHON_VERSION)
+def run_benchmarks(session: nox.Session):
+    """Run benchmarks and compare with previous results (pass --compare FILE)."""
+    session.install(".[dev]")
+    session.run("python", "-m", "benchmarks.run_benchmarks", *session.posargs)
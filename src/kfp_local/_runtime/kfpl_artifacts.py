@@ -0,0 +1,128 @@
+"""Reading and writing artifacts from within components run by kfp-local.
+
+Components usually read artifacts by loading the whole file at `artifact.path` into
+memory, so every task that consumes a large dataset holds its own copy of it. The
+helpers in this module map artifacts into memory read-only instead - runs and the
+cache share artifacts using links, so every task that maps the same dataset shares
+the same pages in the OS page cache - or stream them in chunks. This directory is
+put on the PYTHONPATH of every task process, so components can use the helpers with
+`from kfpl_artifacts import map_array` (etc.) in any environment used by kfp-local.
+
+Arrays written with `write_array` record their dtype and shape (together with the
+size and digest of the file) in the artifact's metadata, which is written to the
+task's output_metadata.json alongside its outputs and passed to downstream tasks,
+so that `map_array` can map them without being told how to interpret the bytes.
+Like the runtime hook, this module must not import kfp_local (or kfp), and only
+needs numpy for arrays.
+"""
+import hashlib
+import mmap
+import os
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+DEFAULT_CHUNK_SIZE = 1024**2
+
+
+def artifact_path(artifact: Any) -> Path:
+    """Get the local path of an artifact, or of anything with a `path` attribute."""
+    if isinstance(artifact, str | os.PathLike):
+        return Path(artifact)
+    return Path(artifact.path)
+
+
+def map_artifact(artifact: Any) -> mmap.mmap:
+    """Map an artifact's file into memory, read-only.
+
+    The map can be used as a context manager and sliced like bytes, without the file
+    being read into memory until the pages are accessed.
+
+    Args:
+    ----
+        artifact: Artifact (e.g. `dsl.Input[dsl.Dataset]`) or path to its file.
+
+    Raises:
+    ------
+        ValueError: If the file is empty, as empty files can't be mapped.
+    """
+    path = artifact_path(artifact)
+    if path.stat().st_size == 0:
+        raise ValueError(f"can't map empty artifact {path}")
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def iter_chunks(artifact: Any, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    """Stream an artifact's file in chunks of (at most) chunk_size bytes."""
+    with open(artifact_path(artifact), "rb") as f:
+        while chunk := f.read(chunk_size):
+            yield chunk
+
+
+def describe_artifact(artifact: Any) -> dict[str, Any]:
+    """Get the size (in bytes) and SHA256 digest of an artifact's file."""
+    hasher = hashlib.sha256()
+    for chunk in iter_chunks(artifact):
+        hasher.update(chunk)
+    return {
+        "size": artifact_path(artifact).stat().st_size,
+        "sha256": hasher.hexdigest(),
+    }
+
+
+def write_array(artifact: Any, array: Any) -> None:
+    """Write a numpy array to an artifact's file as raw bytes, with its metadata.
+
+    The array's dtype and shape, and the size and digest of the file, are added to
+    the artifact's metadata (when it has any - plain paths don't).
+    """
+    import numpy as np
+
+    path = artifact_path(artifact)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    array = np.ascontiguousarray(array)
+    array.tofile(path)
+    if hasattr(artifact, "metadata"):
+        artifact.metadata.update(
+            {
+                "dtype": array.dtype.str,
+                "shape": list(array.shape),
+                **describe_artifact(path),
+            }
+        )
+
+
+def map_array(
+    artifact: Any, dtype: str | None = None, shape: tuple[int, ...] | None = None
+) -> Any:
+    """Map an array written with `write_array` into memory, read-only.
+
+    Args:
+    ----
+        artifact: Artifact (e.g. `dsl.Input[dsl.Dataset]`) or path to its file.
+        dtype: Data type of the array. Defaults to the dtype in the artifact's
+            metadata.
+        shape: Shape of the array. Defaults to the shape in the artifact's metadata,
+            or a flat array if the dtype wasn't taken from the metadata either.
+
+    Returns:
+    -------
+        A read-only `numpy.memmap`.
+
+    Raises:
+    ------
+        ValueError: If dtype isn't set and the artifact has no dtype in its metadata.
+    """
+    import numpy as np
+
+    metadata = getattr(artifact, "metadata", None) or {}
+    if dtype is None and "dtype" not in metadata:
+        raise ValueError(f"dtype of {artifact_path(artifact)} isn't known - set dtype")
+    if dtype is None:
+        dtype = metadata["dtype"]
+        shape = shape or tuple(metadata.get("shape", ())) or None
+    path = artifact_path(artifact)
+    if path.stat().st_size == 0:
+        return np.empty(shape or (0,), dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=shape)
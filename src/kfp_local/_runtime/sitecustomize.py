@@ -0,0 +1,90 @@
+"""Runtime hook for task processes, imported automatically at interpreter startup.
+
+KFP expects artifacts in object storage to be mounted locally under /gcs/, so that
+an artifact with the URI gs://bucket/path can be read from /gcs/bucket/path. When
+tasks are executed by kfp-local, artifacts are kept relative to the working
+directory instead, so the mount prefix is removed when kfp's artifact_types module
+is imported - without importing kfp eagerly, or modifying it on disk.
+
+Executor inputs that are too large to pass on the command line are written to a
+file by kfp-local and passed as `--executor_input @path`, so the file is read back
+into sys.argv before kfp's executor parses its arguments.
+
+This directory is put on the PYTHONPATH of every task process. It must not import
+kfp_local, which isn't installed in the environments used to execute tasks.
+"""
+import importlib.abc
+import importlib.machinery
+import importlib.util
+import os
+import sys
+from collections.abc import Sequence
+from types import ModuleType
+
+_ARTIFACT_TYPES_MODULE = "kfp.dsl.types.artifact_types"
+_EXECUTOR_INPUT_ARG = "--executor_input"
+_EXECUTOR_INPUT_FILE_PREFIX = "@"  # must match kfp_local.launcher
+
+
+def _patch_artifact_types(module: ModuleType) -> None:
+    """Map gs:// URIs onto paths relative to the working directory."""
+    module._GCS_LOCAL_MOUNT_PREFIX = ""  # type: ignore
+
+
+class _ArtifactTypesFinder(importlib.abc.MetaPathFinder):
+    """Import hook that patches kfp's artifact_types module once it's executed."""
+
+    def find_spec(
+        self,
+        fullname: str,
+        path: Sequence[str] | None,
+        target: ModuleType | None = None,
+    ) -> importlib.machinery.ModuleSpec | None:
+        """Find the artifact_types module and wrap its loader."""
+        if fullname != _ARTIFACT_TYPES_MODULE:
+            return None
+        spec = importlib.machinery.PathFinder.find_spec(fullname, path)
+        if spec is None or spec.loader is None:
+            return None
+        exec_module = spec.loader.exec_module
+
+        def exec_and_patch_module(module: ModuleType) -> None:
+            exec_module(module)
+            _patch_artifact_types(module)
+
+        spec.loader.exec_module = exec_and_patch_module  # type: ignore
+        return spec
+
+
+def _read_executor_input_file(argv: list[str]) -> None:
+    """Replace `--executor_input @path` in argv with the contents of the file."""
+    for n, arg in enumerate(argv):
+        if arg == _EXECUTOR_INPUT_ARG and n + 1 < len(argv):
+            n, flag, value = n + 1, "", argv[n + 1]
+        elif arg.startswith(f"{_EXECUTOR_INPUT_ARG}="):
+            flag, value = arg.split("=", 1)
+            flag += "="
+        else:
+            continue
+        if value.startswith(_EXECUTOR_INPUT_FILE_PREFIX):
+            with open(value[len(_EXECUTOR_INPUT_FILE_PREFIX) :]) as file:
+                argv[n] = flag + file.read()
+        return
+
+
+def _import_shadowed_sitecustomize() -> None:
+    """Import the sitecustomize module (if any) that this one shadows."""
+    this_dir = os.path.dirname(os.path.abspath(__file__))
+    search_path = [p for p in sys.path if os.path.abspath(p or ".") != this_dir]
+    spec = importlib.machinery.PathFinder.find_spec("sitecustomize", search_path)
+    if spec is not None and spec.loader is not None:
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+
+
+if _ARTIFACT_TYPES_MODULE in sys.modules:
+    _patch_artifact_types(sys.modules[_ARTIFACT_TYPES_MODULE])
+else:
+    sys.meta_path.insert(0, _ArtifactTypesFinder())
+_read_executor_input_file(getattr(sys, "argv", []))
+_import_shadowed_sitecustomize()
@@ -0,0 +1,467 @@
+"""Executing tasks on other hosts, using agents that tasks are sent to over TCP.
+
+Agents are started on every worker host with `kfpl agent`, and the driver (i.e.
+`kfpl run --agent HOST:PORT ...`) sends each task's resolved command - with the
+executor input embedded in its args - to the least busy agent that has a free slot.
+The agent executes the task and streams its logs back line by line, followed by the
+exit code and resources used.
+
+Messages are JSON objects, one per line. A connection is opened for every request
+and carries one of two exchanges:
+
+    {"type": "hello"} -> {"type": "hello", "version", "slots", "cpus", "memory"}
+    {"type": "run", "task", "cmd", "resources", "outputs"} [-> files]
+        -> {"type": "log", "stream", "line"} ... [-> files] -> {"type": "exit", "usage"}
+
+While a task is running, agents also send {"type": "heartbeat"} every few seconds, so
+drivers can tell a task that's quiet from an agent that has hung or been cut off -
+drivers fail tasks whose agent hasn't sent anything for 60 seconds.
+
+By default, agents execute tasks in their working directory, which must be the same
+shared filesystem as the driver's (e.g. an NFS mount), so that artifacts are read
+and written in place. When artifacts are streamed instead, the driver sends the
+task's input artifacts after the request, the agent executes the task in a temporary
+directory and sends back its outputs (output_metadata.json and output artifacts),
+which the driver writes to the run directory. Files are sent as a sequence of
+{"type": "chunk", "path", "offset", "data"} messages, each with at most 1MiB of
+base64 encoded content, followed by {"type": "end"} - every chunk is written to disk
+as soon as it's received, so files of any size can be streamed.
+
+Agents execute any command they are sent, so must only listen on trusted networks.
+"""
+import base64
+import json
+import socket
+import socketserver
+import sys
+import tempfile
+import threading
+from collections.abc import Generator, Iterator
+from contextlib import AbstractContextManager, closing, contextmanager, nullcontext
+from pathlib import Path
+from typing import IO, Any, NamedTuple, TextIO
+
+from kfp_local.cache import input_paths, output_paths
+from kfp_local.launcher import (
+    ProcessUsage,
+    TaskLog,
+    executor_input_file,
+    run_process,
+    task_env,
+)
+from kfp_local.resources import ResourcePool, TaskResources
+
+PROTOCOL_VERSION = 2
+DEFAULT_PORT = 8765
+
+_CONNECT_TIMEOUT = 10.0
+_REPLY_TIMEOUT = 60.0
+_HEARTBEAT_INTERVAL = 5.0
+_CHUNK_SIZE = 1024**2
+
+
+def _send(wfile: IO[bytes], message: dict[str, Any]) -> None:
+    """Send a message as a line of JSON."""
+    wfile.write(json.dumps(message).encode() + b"\n")
+    wfile.flush()
+
+
+def _receive(rfile: IO[bytes]) -> dict[str, Any]:
+    """Receive a message sent as a line of JSON."""
+    line = rfile.readline()
+    if not line:
+        raise ConnectionError("connection closed before a message was received")
+    return json.loads(line)
+
+
+def _exchange(
+    host: str, port: int, request: dict[str, Any], files: list[Path] | None = None
+) -> Generator[dict[str, Any], None, None]:
+    """Send a request (and files) to an agent, and yield the messages it replies.
+
+    Raises TimeoutError if the agent doesn't send anything for _REPLY_TIMEOUT seconds.
+    """
+    with socket.create_connection((host, port), _CONNECT_TIMEOUT) as sock:
+        sock.settimeout(_REPLY_TIMEOUT)
+        with sock.makefile("wb") as wfile, sock.makefile("rb") as rfile:
+            _send(wfile, request)
+            if files is not None:
+                _send_files(wfile, files)
+            while True:
+                yield _receive(rfile)
+
+
+def _send_files(wfile: IO[bytes], paths: list[Path], root: Path | None = None) -> None:
+    """Send files, and every file within directories, in chunks (paths under root)."""
+    for path in paths:
+        local_path = root / path if root else path
+        if local_path.is_dir():
+            found = sorted(f for f in local_path.rglob("*") if f.is_file())
+        else:
+            found = [local_path] if local_path.exists() else []
+        for file in found:
+            key = str(file.relative_to(root) if root else file)
+            with open(file, "rb") as f:
+                offset = 0
+                while True:
+                    data = f.read(_CHUNK_SIZE)
+                    message = {
+                        "type": "chunk",
+                        "path": key,
+                        "offset": offset,
+                        "data": base64.b64encode(data).decode(),
+                    }
+                    _send(wfile, message)
+                    offset += len(data)
+                    if len(data) < _CHUNK_SIZE:
+                        break
+    _send(wfile, {"type": "end"})
+
+
+def _write_chunk(
+    message: dict[str, Any],
+    root: Path | None = None,
+    allowed: list[Path] | None = None,
+) -> None:
+    """Write a chunk of a file sent using _send_files (under root).
+
+    Args:
+    ----
+        message: Chunk message.
+        root: Directory to write the file under. Defaults to the working directory.
+        allowed: Paths that the file must be, or be within. Defaults to None, in
+            which case files can be written anywhere under root.
+
+    Raises:
+    ------
+        ValueError: If the file's path is absolute, leaves root using `..` or isn't
+            within the allowed paths.
+    """
+    path = Path(message["path"])
+    if (
+        path.is_absolute()
+        or ".." in path.parts
+        or allowed is not None
+        and not any(path == dest or dest in path.parents for dest in allowed)
+    ):
+        raise ValueError(f"refusing to write file sent to {path}")
+    if root:
+        path = root / path
+    if message["offset"] == 0:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.unlink(missing_ok=True)
+    with open(path, "r+b" if message["offset"] else "wb") as f:
+        f.seek(message["offset"])
+        f.write(base64.b64decode(message["data"]))
+
+
+def _receive_files(rfile: IO[bytes], root: Path | None = None) -> None:
+    """Receive files sent using _send_files, writing them to disk (under root)."""
+    while (message := _receive(rfile))["type"] == "chunk":
+        _write_chunk(message, root)
+
+
+class _RemoteLog(TaskLog):
+    """Log that sends every line back to the driver, instead of writing it."""
+
+    def __init__(self, wfile: IO[bytes]):
+        """Send lines to the driver using wfile."""
+        self.name = "agent"
+        self.lock = threading.Lock()
+        self._wfile = wfile
+
+    def send(self, message: dict[str, Any]) -> None:
+        """Send a message to the driver, between the lines of the task's logs."""
+        with self.lock:
+            _send(self._wfile, message)
+
+    def write_line(self, line: bytes, stream: TextIO) -> None:
+        """Send a line (or chunk of a long line) to the driver."""
+        name = "stderr" if stream is sys.stderr else "stdout"
+        line_str = line.decode(errors="replace")
+        self.send({"type": "log", "stream": name, "line": line_str})
+
+    def close(self) -> None:
+        """Nothing to close - the connection is owned by the agent."""
+
+
+@contextmanager
+def _heartbeats(log: _RemoteLog) -> Iterator[None]:
+    """Send heartbeats to the driver until the block exits."""
+    stop = threading.Event()
+
+    def beat() -> None:
+        while not stop.wait(_HEARTBEAT_INTERVAL):
+            try:
+                log.send({"type": "heartbeat"})
+            except OSError:
+                return
+
+    thread = threading.Thread(target=beat, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+class _AgentHandler(socketserver.StreamRequestHandler):
+    """Handle a request sent to an agent by a driver."""
+
+    server: "Agent"
+    timeout = _REPLY_TIMEOUT
+
+    def handle(self) -> None:
+        request = _receive(self.rfile)
+        if request.get("type") == "hello":
+            _send(self.wfile, self.server.hello())
+        elif request.get("type") == "run":
+            self.server.run_task(request, self.rfile, self.wfile)
+        else:
+            _send(self.wfile, {"type": "error", "error": "unknown request"})
+
+
+class Agent(socketserver.ThreadingTCPServer):
+    """Server that executes tasks sent to it by drivers, up to max_workers at once."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        max_workers: int | None = None,
+        workdir: str | None = None,
+    ):
+        """Listen for drivers on address.
+
+        Args:
+        ----
+            address: Host and port to listen on - port 0 picks a free port.
+            max_workers: Maximum number of tasks to execute at once. Defaults to the
+                number of CPUs on the host.
+            workdir: Directory in which to execute tasks, which must be the driver's
+                working directory on a shared filesystem unless artifacts are
+                streamed. Defaults to the current working directory.
+        """
+        super().__init__(address, _AgentHandler)
+        self.pool = ResourcePool(max_workers)
+        self.workdir = Path(workdir or Path.cwd()).absolute()
+
+    def hello(self) -> dict[str, Any]:
+        """Describe the agent and its capacity."""
+        return {
+            "type": "hello",
+            "version": PROTOCOL_VERSION,
+            "slots": self.pool.max_workers,
+            "cpus": self.pool.cpus,
+            "memory": self.pool.memory,
+        }
+
+    def run_task(
+        self, request: dict[str, Any], rfile: IO[bytes], wfile: IO[bytes]
+    ) -> None:
+        """Execute a task, streaming its logs and then its exit status to wfile.
+
+        When artifacts are streamed, the task's input files are read from rfile and
+        its outputs are sent to wfile before its exit status.
+        """
+        resources = TaskResources(*request.get("resources", ()))
+        streamed = request.get("outputs") is not None
+        sandbox: AbstractContextManager[str] = nullcontext(str(self.workdir))
+        if streamed:
+            sandbox = tempfile.TemporaryDirectory(dir=self.workdir)
+        log = _RemoteLog(wfile)
+        with _heartbeats(log):
+            with self.pool.reserve(resources) as limits, sandbox as cwd_name:
+                cwd = Path(cwd_name)
+                try:
+                    if streamed:
+                        _receive_files(rfile, cwd)
+                except ValueError as e:
+                    log.send({"type": "error", "error": str(e)})
+                    return
+                try:
+                    usage = run_process(request["cmd"], task_env(), log, limits, cwd)
+                except OSError as e:
+                    log.send({"type": "error", "error": str(e)})
+                    return
+                if streamed:
+                    outputs = [Path(path) for path in request["outputs"]]
+                    with log.lock:
+                        _send_files(wfile, outputs, cwd)
+        _send(wfile, {"type": "exit", "usage": usage._asdict()})
+
+
+def serve_agent(
+    host: str = "127.0.0.1",
+    port: int = DEFAULT_PORT,
+    max_workers: int | None = None,
+    workdir: str | None = None,
+) -> None:
+    """Run an agent until it's interrupted."""
+    with Agent((host, port), max_workers, workdir) as agent:
+        print(f"agent listening on {host}:{agent.server_address[1]}")
+        print(f"executing up to {agent.pool.max_workers} tasks in {agent.workdir}")
+        try:
+            agent.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+class AgentInfo(NamedTuple):
+    """Address and capacity of an agent, as reported when it was registered."""
+
+    host: str
+    port: int
+    slots: int
+    cpus: float
+    memory: int
+
+
+def _parse_address(address: str) -> tuple[str, int]:
+    """Parse HOST:PORT (or HOST, for the default port)."""
+    host, _, port = address.rpartition(":") if ":" in address else (address, "", "")
+    return host, int(port or DEFAULT_PORT)
+
+
+class AgentPool:
+    """Agents registered with a driver, which tasks are sent to for execution.
+
+    Every task is sent to the agent with the most free slots (relative to its
+    capacity), waiting for a slot to become free if all the agents are busy.
+    """
+
+    def __init__(self, addresses: list[str], stream_artifacts: bool = False):
+        """Register the agents at addresses (HOST:PORT).
+
+        Args:
+        ----
+            addresses: Addresses of the agents.
+            stream_artifacts: Send artifacts to and from agents, instead of using a
+                shared filesystem. Defaults to False.
+
+        Raises:
+        ------
+            RuntimeError: If an agent can't be reached, or uses another protocol.
+        """
+        self.stream_artifacts = stream_artifacts
+        self.agents = [self._register(address) for address in addresses]
+        self._busy = [0] * len(self.agents)
+        self._condition = threading.Condition()
+
+    @staticmethod
+    def _register(address: str) -> AgentInfo:
+        host, port = _parse_address(address)
+        try:
+            with closing(_exchange(host, port, {"type": "hello"})) as replies:
+                hello = next(replies)
+        except OSError as e:
+            raise RuntimeError(f"couldn't reach agent at {host}:{port} - {e}")
+        if hello.get("version") != PROTOCOL_VERSION:
+            msg = f"agent at {host}:{port} uses protocol version={hello.get('version')}"
+            raise RuntimeError(msg)
+        return AgentInfo(host, port, hello["slots"], hello["cpus"], hello["memory"])
+
+    @property
+    def slots(self) -> int:
+        """Total number of tasks that the agents can execute at once."""
+        return sum(agent.slots for agent in self.agents)
+
+    @property
+    def cpus(self) -> float:
+        """Total number of CPUs shared by the agents."""
+        return sum(agent.cpus for agent in self.agents)
+
+    @property
+    def memory(self) -> int:
+        """Total memory (in bytes) shared by the agents."""
+        return sum(agent.memory for agent in self.agents)
+
+    def _acquire(self) -> int:
+        with self._condition:
+            while True:
+                free = [
+                    (self._busy[n] / agent.slots, n)
+                    for n, agent in enumerate(self.agents)
+                    if self._busy[n] < agent.slots
+                ]
+                if free:
+                    n = min(free)[1]
+                    self._busy[n] += 1
+                    return n
+                self._condition.wait()
+
+    def _release(self, n: int) -> None:
+        with self._condition:
+            self._busy[n] -= 1
+            self._condition.notify()
+
+    def run(
+        self,
+        cmd: list[str],
+        executor_input: str,
+        log: TaskLog,
+        resources: TaskResources | None = None,
+    ) -> ProcessUsage:
+        """Execute a task on an agent, streaming its logs to log.
+
+        Args:
+        ----
+            cmd: Task command, including its args.
+            executor_input: JSON-serialised executor input - used to find the files
+                to send to and from the agent, when streaming artifacts.
+            log: Log to stream the task's output to.
+            resources: Resources requested by the task. Defaults to None.
+
+        Raises:
+        ------
+            RuntimeError: If the agent fails or stops replying, or artifacts are
+                streamed to or from paths that aren't relative to the working
+                directory.
+        """
+        request: dict[str, Any] = {
+            "type": "run",
+            "task": log.name,
+            "cmd": cmd,
+            "resources": list(resources or ()),
+        }
+        files = None
+        outputs: list[Path] = []
+        if self.stream_artifacts:
+            output_file, artifact_paths = output_paths(executor_input)
+            outputs = [output_file, *artifact_paths.values()]
+            inputs = input_paths(executor_input)
+            input_file = executor_input_file(cmd)
+            if input_file is not None:
+                inputs.append(input_file)
+            if any(path.is_absolute() for path in [*inputs, *outputs]):
+                msg = "streaming artifacts needs a root relative to the working dir"
+                raise RuntimeError(msg)
+            files = inputs
+            request["outputs"] = [str(path) for path in outputs]
+
+        n = self._acquire()
+        agent = self.agents[n]
+        try:
+            exchange = _exchange(agent.host, agent.port, request, files)
+            with closing(exchange) as replies:
+                for message in replies:
+                    if message["type"] == "log":
+                        stderr = message["stream"] == "stderr"
+                        stream = sys.stderr if stderr else sys.stdout
+                        log.write_line(message["line"].encode(), stream)
+                    elif message["type"] == "chunk":
+                        _write_chunk(message, allowed=outputs)
+                    elif message["type"] in ("end", "heartbeat"):
+                        continue
+                    elif message["type"] == "exit":
+                        return ProcessUsage(**message["usage"])
+                    else:
+                        raise RuntimeError(message.get("error", "unknown error"))
+            raise RuntimeError("no reply")
+        except (OSError, ValueError) as e:
+            raise RuntimeError(f"agent at {agent.host}:{agent.port} failed - {e}")
+        finally:
+            self._release(n)
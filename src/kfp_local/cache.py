@@ -0,0 +1,294 @@
+"""Content-addressed cache of task outputs."""
+import copy
+import hashlib
+import json
+import os
+import re
+import shutil
+import uuid
+from pathlib import Path
+from typing import Any
+
+from kfp_local.store import (
+    BLOBS_FOLDER,
+    BlobStore,
+    file_digest,
+    link_tree,
+    remove_path,
+)
+
+CACHE_FOLDER = ".kfp-local-cache"
+DEFAULT_MAX_CACHE_SIZE = 10 * 1024**3
+OUTPUT_METADATA_FILE = "output_metadata.json"
+
+_SIZE_UNITS = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+
+
+def artifact_local_path(uri: str) -> Path:
+    """Map an artifact URI onto the local path that KFP components read and write."""
+    return Path(re.sub(r"^[a-z0-9]+://", "", uri))
+
+
+def path_digest(path: Path) -> str:
+    """Compute a SHA256 digest of a file, or of every file within a directory."""
+    if not path.is_dir():
+        return file_digest(path)
+    hasher = hashlib.sha256()
+    for file in sorted(p for p in path.rglob("*") if p.is_file()):
+        hasher.update(str(file.relative_to(path)).encode())
+        hasher.update(file_digest(file).encode())
+    return hasher.hexdigest()
+
+
+def task_fingerprint(cmd: list[str], args: list[str], executor_input: str) -> str:
+    """Compute the cache key for a task.
+
+    The key covers the executor command (which embeds the component's source code),
+    the executor args, the resolved parameter values and the content of every input
+    artifact. Output locations are excluded so that the same task will have the same
+    key regardless of where its outputs are written.
+
+    Args:
+    ----
+        cmd: Executor command.
+        args: Executor args, excluding the resolved executor input.
+        executor_input: JSON-serialised executor input.
+
+    Raises:
+    ------
+        FileNotFoundError: If an input artifact does not exist.
+    """
+    inputs = copy.deepcopy(json.loads(executor_input)["inputs"])
+    for artifact in inputs.get("artifacts", {}).values():
+        for instance in artifact["artifacts"]:
+            path = artifact_local_path(instance.pop("uri"))
+            if not path.exists():
+                raise FileNotFoundError(f"couldn't find input artifact {path}")
+            instance["digest"] = path_digest(path)
+    outputs = json.loads(executor_input)["outputs"]
+    key_spec = {
+        "command": cmd,
+        "args": args,
+        "inputs": inputs,
+        "output_artifacts": sorted(outputs.get("artifacts", {})),
+    }
+    return hashlib.sha256(json.dumps(key_spec, sort_keys=True).encode()).hexdigest()
+
+
+def input_paths(executor_input: str) -> list[Path]:
+    """Get the paths of all input artifacts for a task."""
+    inputs = json.loads(executor_input)["inputs"]
+    return [
+        artifact_local_path(instance["uri"])
+        for artifact in inputs.get("artifacts", {}).values()
+        for instance in artifact["artifacts"]
+    ]
+
+
+def output_paths(executor_input: str) -> tuple[Path, dict[str, Path]]:
+    """Get the output metadata file and output artifact paths for a task."""
+    outputs = json.loads(executor_input)["outputs"]
+    artifact_paths = {
+        name: artifact_local_path(artifact["artifacts"][0]["uri"])
+        for name, artifact in outputs.get("artifacts", {}).items()
+    }
+    return Path(outputs["outputFile"]), artifact_paths
+
+
+def clear_outputs(executor_input: str) -> None:
+    """Remove a task's outputs, so it writes new files instead of through links.
+
+    Outputs restored from the cache (or shared with other runs) are links to files
+    that are stored elsewhere, which must never be modified in place.
+    """
+    output_file, artifact_paths = output_paths(executor_input)
+    for path in [output_file, *artifact_paths.values()]:
+        remove_path(path)
+
+
+def _write_outputs(
+    output_metadata: dict[str, Any],
+    artifact_sources: dict[str, Path],
+    executor_input: str,
+) -> None:
+    """Write a task's outputs to the locations in its executor input.
+
+    Artifact URIs recorded in the output metadata are rewritten to those in the
+    executor input, so outputs can be written to a different location from where
+    they were originally produced.
+    """
+    output_file, artifact_paths = output_paths(executor_input)
+    for name, path in artifact_paths.items():
+        link_tree(artifact_sources[name], path)
+
+    outputs = json.loads(executor_input)["outputs"].get("artifacts", {})
+    for name, artifact in output_metadata.get("artifacts", {}).items():
+        if name in outputs:
+            for instance in artifact["artifacts"]:
+                instance["uri"] = outputs[name]["artifacts"][0]["uri"]
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    output_file.write_text(json.dumps(output_metadata))
+
+
+def cached_outputs(
+    key: str, executor_input: str, cache_dir: str = CACHE_FOLDER
+) -> dict[str, Any] | None:
+    """Get the output metadata cached for a task, returning None on a cache miss.
+
+    Entries are only hits if they contain every output artifact in the executor
+    input. Nothing is restored, so this can be used to check for a hit.
+    """
+    entry = Path(cache_dir) / key
+    if not (entry / OUTPUT_METADATA_FILE).exists():
+        return None
+    _, artifact_paths = output_paths(executor_input)
+    if any(not (entry / "artifacts" / name).exists() for name in artifact_paths):
+        return None
+    return json.loads((entry / OUTPUT_METADATA_FILE).read_text())
+
+
+def restore_from_cache(
+    key: str, executor_input: str, cache_dir: str = CACHE_FOLDER
+) -> bool:
+    """Restore a task's outputs from the cache, returning False on a cache miss.
+
+    Artifacts are linked to the files in the cache instead of being copied. Artifact
+    URIs recorded in the cached output metadata are rewritten to those in the
+    executor input, so outputs can be restored to a different location.
+    """
+    output_metadata = cached_outputs(key, executor_input, cache_dir)
+    if output_metadata is None:
+        return False
+    entry = Path(cache_dir) / key
+    _, artifact_paths = output_paths(executor_input)
+    artifact_sources = {name: entry / "artifacts" / name for name in artifact_paths}
+    _write_outputs(output_metadata, artifact_sources, executor_input)
+    os.utime(entry)
+    return True
+
+
+def copy_task_outputs(source_input: str, executor_input: str) -> None:
+    """Copy the outputs of a task that has already run with the same inputs.
+
+    Artifacts are linked to the source task's files instead of being copied.
+
+    Args:
+    ----
+        source_input: Executor input of the task that produced the outputs.
+        executor_input: Executor input of the task to copy the outputs to.
+
+    Raises:
+    ------
+        FileNotFoundError: If any of the source task's outputs are missing.
+    """
+    source_file, artifact_sources = output_paths(source_input)
+    for path in [source_file, *artifact_sources.values()]:
+        if not path.exists():
+            raise FileNotFoundError(f"couldn't find task output {path}")
+    output_metadata = json.loads(source_file.read_text())
+    _write_outputs(output_metadata, artifact_sources, executor_input)
+
+
+def store_in_cache(
+    key: str, executor_input: str, cache_dir: str = CACHE_FOLDER
+) -> None:
+    """Store a completed task's outputs in the cache.
+
+    Output artifacts are added to a content-addressed store of blobs and linked into
+    the cache entry, so that the same content is only ever stored once - whether in
+    the cache or in any number of runs - and is never copied. Entries are assembled
+    in a temporary directory and then renamed into place, so concurrent writers and
+    readers never see a partially written entry. Tasks that did not write all of
+    their outputs are not cached.
+    """
+    output_file, artifact_paths = output_paths(executor_input)
+    if not output_file.exists() or not all(p.exists() for p in artifact_paths.values()):
+        return
+
+    entry = Path(cache_dir) / key
+    if entry.exists():
+        os.utime(entry)
+        return
+    tmp_entry = Path(cache_dir) / f".tmp-{key}-{uuid.uuid4().hex}"
+    blob_store = BlobStore(cache_dir)
+    try:
+        tmp_entry.mkdir(parents=True)
+        shutil.copy2(output_file, tmp_entry / OUTPUT_METADATA_FILE)
+        for name, path in artifact_paths.items():
+            blob_store.put_tree(path)
+            link_tree(path, tmp_entry / "artifacts" / name, reflink=False)
+        os.rename(tmp_entry, entry)
+    except OSError:
+        pass
+    finally:
+        shutil.rmtree(tmp_entry, ignore_errors=True)
+
+
+def _entry_files(entry: Path) -> dict[tuple[int, int], int]:
+    """Sizes of all files in a cache entry, keyed by device and inode."""
+    files = {}
+    for path in entry.rglob("*"):
+        if path.is_file():
+            st = path.stat()
+            files[(st.st_dev, st.st_ino)] = st.st_size
+    return files
+
+
+def prune_cache(
+    cache_dir: str = CACHE_FOLDER, max_size: int = DEFAULT_MAX_CACHE_SIZE
+) -> list[str]:
+    """Evict least-recently used cache entries until the cache fits within max_size.
+
+    Files that are linked to from more than one entry are only counted once, and
+    blobs that are no longer linked to from any entry (or run) are removed.
+
+    Args:
+    ----
+        cache_dir: Cache directory. Defaults to ".kfp-local-cache".
+        max_size: Maximum size of the cache in bytes. Defaults to 10GiB.
+
+    Returns:
+    -------
+        The keys of all evicted entries.
+    """
+    cache_path = Path(cache_dir)
+    if not cache_path.exists():
+        return []
+    entries = [
+        entry
+        for entry in cache_path.iterdir()
+        if entry.is_dir()
+        and not entry.name.startswith(".tmp-")
+        and entry.name != BLOBS_FOLDER
+    ]
+    entries.sort(key=lambda entry: entry.stat().st_mtime)
+    entry_files = {entry: _entry_files(entry) for entry in entries}
+    links: dict[tuple[int, int], int] = {}
+    sizes: dict[tuple[int, int], int] = {}
+    for files in entry_files.values():
+        for inode, size in files.items():
+            links[inode] = links.get(inode, 0) + 1
+            sizes[inode] = size
+    total_size = sum(sizes.values())
+
+    evicted: list[str] = []
+    for entry in entries:
+        if total_size <= max_size:
+            break
+        shutil.rmtree(entry, ignore_errors=True)
+        for inode in entry_files[entry]:
+            links[inode] -= 1
+            if links[inode] == 0:
+                total_size -= sizes[inode]
+        evicted.append(entry.name)
+    BlobStore(cache_dir).prune()
+    return evicted
+
+
+def parse_size(size: str) -> int:
+    """Parse a human readable size such as '500M' or '10GB' into bytes."""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMGT]?)I?B?\s*", size.upper())
+    if match is None:
+        raise ValueError(f"invalid size={size}")
+    number, unit = match.groups()
+    return int(float(number) * _SIZE_UNITS[unit])
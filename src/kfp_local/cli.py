@@ -0,0 +1,545 @@
+"""The kfpl command line interface.
+
+Importing kfp (and protobuf) takes far longer than anything else kfpl does at start
+up, so only the commands that load pipeline specs or execute tasks import the
+modules that depend on them - when they are run.
+"""
+import argparse
+import json
+import sys
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from kfp_local.cache import (
+    CACHE_FOLDER,
+    DEFAULT_MAX_CACHE_SIZE,
+    parse_size,
+    prune_cache,
+)
+from kfp_local.history import (
+    HISTORY_FILE,
+    format_comparison,
+    format_run,
+    format_runs,
+    get_run,
+    query_runs,
+)
+from kfp_local.runs import DEFAULT_KEEP_RUNS, LOCAL_FOLDER
+
+
+def _add_execution_args(parser: argparse.ArgumentParser) -> None:
+    """Add the arguments shared by every command that executes tasks."""
+    from kfp_local.environments import WHEELHOUSE_FOLDER
+
+    parser.add_argument(
+        "tasks",
+        nargs="*",
+        type=str,
+        help="task to run (upstream tasks are always run first)",
+    )
+    parser.add_argument(
+        "--pipeline",
+        type=str,
+        required=True,
+        help="path to compiled pipeline in JSON format",
+    )
+    parser.add_argument(
+        "--target",
+        action="append",
+        type=str,
+        default=None,
+        required=False,
+        help="task to run together with all the upstream tasks it needs (repeatable)",
+    )
+    parser.add_argument(
+        "--nox",
+        action="store_true",
+        default=False,
+        required=False,
+        help="use Nox for environment isolation",
+    )
+    parser.add_argument(
+        "--warm",
+        action="store_true",
+        default=False,
+        required=False,
+        help="execute tasks on a pool of warm worker processes",
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=None,
+        required=False,
+        help="maximum number of tasks to run concurrently (defaults to CPU count)",
+    )
+    parser.add_argument(
+        "--cpus",
+        type=float,
+        default=None,
+        required=False,
+        help="CPUs to pack tasks onto, by the CPUs they request (defaults to all)",
+    )
+    parser.add_argument(
+        "--memory",
+        type=parse_size,
+        default=None,
+        required=False,
+        help="memory to pack tasks into - e.g. 16G (defaults to physical memory)",
+    )
+    parser.add_argument(
+        "--agent",
+        action="append",
+        type=str,
+        default=None,
+        required=False,
+        help="HOST:PORT of an agent to execute tasks on, started with `kfpl agent`"
+        " (repeatable)",
+    )
+    parser.add_argument(
+        "--stream-artifacts",
+        action="store_true",
+        default=False,
+        required=False,
+        help="send artifacts to and from agents, instead of using a shared filesystem",
+    )
+    parser.add_argument(
+        "--wheelhouse",
+        type=str,
+        default=None,
+        required=False,
+        help="install packages from wheels built by `kfpl prefetch`, without using a"
+        f" package index (defaults to {WHEELHOUSE_FOLDER}, if it exists)",
+    )
+    parser.add_argument(
+        "--root",
+        type=str,
+        default=LOCAL_FOLDER,
+        required=False,
+        help=f"directory in which to store run outputs (defaults to {LOCAL_FOLDER})",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        default=False,
+        required=False,
+        help="always execute tasks instead of restoring outputs from the cache",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        default=CACHE_FOLDER,
+        required=False,
+        help=f"cache directory (defaults to {CACHE_FOLDER})",
+    )
+
+
+def _add_history_arg(parser: argparse.ArgumentParser) -> None:
+    """Add the argument for the history database that runs are recorded in."""
+    parser.add_argument(
+        "--history",
+        type=str,
+        default=HISTORY_FILE,
+        required=False,
+        help=f"history database (defaults to {HISTORY_FILE})",
+    )
+
+
+def _add_keep_runs_arg(parser: argparse.ArgumentParser) -> None:
+    """Add the argument for garbage collecting old runs."""
+    parser.add_argument(
+        "--keep-runs",
+        type=int,
+        default=DEFAULT_KEEP_RUNS,
+        required=False,
+        help=f"number of finished runs to keep (defaults to {DEFAULT_KEEP_RUNS})",
+    )
+
+
+def _add_run_id_args(parser: argparse.ArgumentParser) -> None:
+    """Add the arguments for running tasks within an existing run."""
+    parser.add_argument(
+        "--run-id",
+        type=str,
+        default=None,
+        required=False,
+        help="run tasks within an existing run, or a new run with this ID",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        default=False,
+        required=False,
+        help="resume --run-id (or the latest run), skipping tasks that succeeded",
+    )
+
+
+def _run_cli(argv: list[str]) -> None:
+    """Entrypoint for the `kfpl run` command."""
+    parser = argparse.ArgumentParser(
+        prog="kfpl run", description="Run Kubeflow Pipeline stages locally."
+    )
+    _add_execution_args(parser)
+    _add_history_arg(parser)
+    _add_keep_runs_arg(parser)
+    _add_run_id_args(parser)
+    args = parser.parse_args(argv)
+    if not args.tasks and not args.target:
+        parser.error("specify tasks to run and/or --target")
+
+    from kfp_local.pipelines import run_pipeline
+    from kfp_local.wheelhouse import find_wheelhouse
+
+    run_pipeline(
+        args.tasks,
+        args.pipeline,
+        use_nox=args.nox,
+        max_workers=args.max_workers,
+        use_cache=not args.no_cache,
+        cache_dir=args.cache_dir,
+        use_warm_pool=args.warm,
+        root=args.root,
+        run_id=args.run_id,
+        keep_runs=args.keep_runs,
+        resume=args.resume,
+        targets=args.target,
+        history=args.history,
+        cpus=args.cpus,
+        memory=args.memory,
+        agents=args.agent,
+        stream_artifacts=args.stream_artifacts,
+        wheelhouse=find_wheelhouse(args.wheelhouse),
+    )
+
+
+def _sweep_cli(argv: list[str]) -> None:
+    """Entrypoint for the `kfpl sweep` command."""
+    parser = argparse.ArgumentParser(
+        prog="kfpl sweep",
+        description="Run Kubeflow Pipeline stages for many sets of pipeline inputs.",
+    )
+    _add_execution_args(parser)
+    _add_history_arg(parser)
+    _add_keep_runs_arg(parser)
+    parser.add_argument(
+        "--params",
+        type=str,
+        required=True,
+        help="YAML file with a grid (or list) of pipeline input values to sweep over",
+    )
+    args = parser.parse_args(argv)
+    if not args.tasks and not args.target:
+        parser.error("specify tasks to run and/or --target")
+
+    from kfp_local.pipelines import run_sweep
+    from kfp_local.sweep import load_param_grid
+    from kfp_local.wheelhouse import find_wheelhouse
+
+    run_sweep(
+        args.tasks,
+        args.pipeline,
+        load_param_grid(args.params),
+        use_nox=args.nox,
+        max_workers=args.max_workers,
+        use_cache=not args.no_cache,
+        cache_dir=args.cache_dir,
+        use_warm_pool=args.warm,
+        root=args.root,
+        keep_runs=args.keep_runs,
+        targets=args.target,
+        history=args.history,
+        cpus=args.cpus,
+        memory=args.memory,
+        agents=args.agent,
+        stream_artifacts=args.stream_artifacts,
+        wheelhouse=find_wheelhouse(args.wheelhouse),
+    )
+
+
+def _plan_cli(argv: list[str]) -> None:
+    """Entrypoint for the `kfpl plan` command."""
+    parser = argparse.ArgumentParser(
+        prog="kfpl plan",
+        description="Resolve the inputs of Kubeflow Pipeline stages without running "
+        "them, and show what a run would do.",
+    )
+    _add_execution_args(parser)
+    _add_run_id_args(parser)
+    parser.add_argument(
+        "--json",
+        action="store_true",
+        default=False,
+        required=False,
+        help="print the plan as JSON, including the executor input for every task",
+    )
+    args = parser.parse_args(argv)
+    if not args.tasks and not args.target:
+        parser.error("specify tasks to run and/or --target")
+
+    from kfp_local.plan import format_plan, plan_pipeline
+
+    plan = plan_pipeline(
+        args.tasks,
+        args.pipeline,
+        use_nox=args.nox,
+        max_workers=args.max_workers,
+        use_cache=not args.no_cache,
+        use_warm_pool=args.warm,
+        root=args.root,
+        run_id=args.run_id,
+        resume=args.resume,
+        targets=args.target,
+        cache_dir=args.cache_dir,
+    )
+    if args.json:
+        print(json.dumps(plan.to_dict(), indent=2))
+    else:
+        print(format_plan(plan))
+    if plan.problems:
+        raise RuntimeError(f"found {len(plan.problems)} problems with the plan")
+
+
+def _load_pipeline_dict(compiled_pipeline_file: str) -> dict[str, Any]:
+    """Load a compiled pipeline as a plain dict, without parsing it into a spec."""
+    pipeline_file = Path(compiled_pipeline_file)
+    if not pipeline_file.exists():
+        raise FileNotFoundError(f"Can't find {pipeline_file.absolute()}")
+    content = pipeline_file.read_text()
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError:
+        import yaml
+
+        return next(yaml.safe_load_all(content))
+
+
+def _tasks_cli(argv: list[str]) -> None:
+    """Entrypoint for the `kfpl tasks` command."""
+    parser = argparse.ArgumentParser(
+        prog="kfpl tasks",
+        description="List the tasks in a compiled pipeline and their dependencies.",
+    )
+    parser.add_argument(
+        "--pipeline",
+        type=str,
+        required=True,
+        help="path to compiled pipeline in JSON format",
+    )
+    args = parser.parse_args(argv)
+    pipeline = _load_pipeline_dict(args.pipeline)
+    tasks = pipeline.get("root", {}).get("dag", {}).get("tasks", {})
+    for name, task in tasks.items():
+        upstream = task.get("dependentTasks", [])
+        print(f"{name} <- {', '.join(upstream)}" if upstream else name)
+
+
+def _runs_cli(argv: list[str]) -> None:
+    """Entrypoint for the `kfpl runs` command."""
+    parser = argparse.ArgumentParser(
+        prog="kfpl runs", description="Query the history of past runs."
+    )
+    _add_history_arg(parser)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    list_parser = subparsers.add_parser("list", help="list the most recent runs")
+    list_parser.add_argument(
+        "--pipeline",
+        type=str,
+        default=None,
+        required=False,
+        help="only list runs of this pipeline",
+    )
+    list_parser.add_argument(
+        "--task",
+        type=str,
+        default=None,
+        required=False,
+        help="only list runs that include this task, with its status and duration",
+    )
+    list_parser.add_argument(
+        "--limit",
+        type=int,
+        default=20,
+        required=False,
+        help="maximum number of runs to list (defaults to 20)",
+    )
+    show_parser = subparsers.add_parser("show", help="show a run and its tasks")
+    show_parser.add_argument("run_id", type=str, help="run to show")
+    compare_parser = subparsers.add_parser("compare", help="compare two runs")
+    compare_parser.add_argument("run_a", type=str, help="run to compare against")
+    compare_parser.add_argument("run_b", type=str, help="run to compare")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        runs = query_runs(args.pipeline, args.task, args.limit, args.history)
+        print(format_runs(runs) if runs else "no runs found")
+        return
+    run_ids = [args.run_id] if args.command == "show" else [args.run_a, args.run_b]
+    found_runs = []
+    for run_id in run_ids:
+        run = get_run(run_id, args.history)
+        if run is None:
+            raise RuntimeError(f"couldn't find run_id={run_id} in {args.history}")
+        found_runs.append(run)
+    if args.command == "show":
+        print(format_run(found_runs[0]))
+    else:
+        print(format_comparison(found_runs[0], found_runs[1]))
+
+
+def _cache_cli(argv: list[str]) -> None:
+    """Entrypoint for the `kfpl cache` command."""
+    parser = argparse.ArgumentParser(
+        prog="kfpl cache", description="Manage the local task output cache."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    prune_parser = subparsers.add_parser(
+        "prune", help="evict least-recently used entries"
+    )
+    prune_parser.add_argument(
+        "--max-size",
+        type=parse_size,
+        default=DEFAULT_MAX_CACHE_SIZE,
+        required=False,
+        help="maximum cache size - e.g. 500M or 10G (defaults to 10G)",
+    )
+    prune_parser.add_argument(
+        "--cache-dir",
+        type=str,
+        default=CACHE_FOLDER,
+        required=False,
+        help=f"cache directory (defaults to {CACHE_FOLDER})",
+    )
+    args = parser.parse_args(argv)
+    evicted = prune_cache(args.cache_dir, args.max_size)
+    print(f"evicted {len(evicted)} cache entries")
+
+
+def _prefetch_cli(argv: list[str]) -> None:
+    """Entrypoint for the `kfpl prefetch` command."""
+    from kfp_local.environments import WHEELHOUSE_FOLDER
+
+    parser = argparse.ArgumentParser(
+        prog="kfpl prefetch",
+        description="Build wheels for every package installed by the tasks in "
+        "Kubeflow Pipelines, so that runs can install them offline.",
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="append",
+        type=str,
+        required=True,
+        help="path to compiled pipeline in JSON format (repeatable)",
+    )
+    parser.add_argument(
+        "--wheelhouse",
+        type=str,
+        default=WHEELHOUSE_FOLDER,
+        required=False,
+        help=f"directory to build wheels in (defaults to {WHEELHOUSE_FOLDER})",
+    )
+    args = parser.parse_args(argv)
+
+    from kfp_local.pipelines import load_pipeline_spec
+    from kfp_local.wheelhouse import build_wheelhouse, pipeline_packages
+
+    packages = [
+        package
+        for pipeline in args.pipeline
+        for package in pipeline_packages(load_pipeline_spec(pipeline))
+    ]
+    packages = list(dict.fromkeys(packages))
+    print(f"building wheels for: {' '.join(packages)}")
+    build_wheelhouse(packages, args.wheelhouse)
+    n_wheels = len(list(Path(args.wheelhouse).glob("*.whl")))
+    print(f"{n_wheels} wheels in {args.wheelhouse}")
+
+
+def _agent_cli(argv: list[str]) -> None:
+    """Entrypoint for the `kfpl agent` command."""
+    from kfp_local.agents import DEFAULT_PORT, serve_agent
+
+    parser = argparse.ArgumentParser(
+        prog="kfpl agent",
+        description="Execute tasks sent by `kfpl run --agent` on other hosts.",
+    )
+    parser.add_argument(
+        "--host",
+        type=str,
+        default="127.0.0.1",
+        required=False,
+        help="address to listen on - only use trusted networks (defaults to "
+        "127.0.0.1)",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=DEFAULT_PORT,
+        required=False,
+        help=f"port to listen on (defaults to {DEFAULT_PORT})",
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=None,
+        required=False,
+        help="maximum number of tasks to run concurrently (defaults to CPU count)",
+    )
+    parser.add_argument(
+        "--workdir",
+        type=str,
+        default=None,
+        required=False,
+        help="directory to execute tasks in, shared with the driver unless it "
+        "streams artifacts (defaults to the current directory)",
+    )
+    args = parser.parse_args(argv)
+    serve_agent(args.host, args.port, args.max_workers, args.workdir)
+
+
+COMMANDS: dict[str, tuple[Callable[[list[str]], None], str]] = {
+    "run": (_run_cli, "run pipeline tasks locally (the default command)"),
+    "plan": (_plan_cli, "show what running pipeline tasks would do, without it"),
+    "sweep": (_sweep_cli, "run pipeline tasks for many sets of pipeline inputs"),
+    "tasks": (_tasks_cli, "list the tasks in a compiled pipeline"),
+    "runs": (_runs_cli, "query the history of past runs"),
+    "cache": (_cache_cli, "manage the local task output cache"),
+    "prefetch": (_prefetch_cli, "build wheels for the packages that tasks install"),
+    "agent": (_agent_cli, "execute tasks sent by kfpl run on other hosts"),
+}
+
+
+def _parser() -> argparse.ArgumentParser:
+    """Parser that describes the available commands, for `kfpl --help`."""
+    parser = argparse.ArgumentParser(
+        prog="kfpl",
+        description="Run Kubeflow Pipeline stages locally.",
+        epilog="`kfpl TASK ... --pipeline PIPELINE` is short for `kfpl run ...`, "
+        "unless TASK is the name of a command, in which case use `kfpl run TASK ...` "
+        "- use `kfpl COMMAND --help` for the options accepted by each command.",
+    )
+    subparsers = parser.add_subparsers(dest="command", metavar="COMMAND")
+    for name, (_, description) in COMMANDS.items():
+        subparsers.add_parser(name, help=description, add_help=False)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Entrypoint for use on the CLI."""
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ("-h", "--help"):
+        _parser().print_help()
+        sys.exit(0 if argv else 2)
+    command, command_argv = (
+        (argv[0], argv[1:]) if argv[0] in COMMANDS else ("run", argv)
+    )
+    try:
+        COMMANDS[command][0](command_argv)
+        sys.exit(0)
+    except Exception as e:
+        e_msg = str(e)
+        print(f"ERROR: {e_msg[:1].lower() + e_msg[1:]}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""Evaluating the trigger conditions that dsl.If, dsl.Elif and dsl.Else compile into.
+
+Conditions are CEL expressions that compare a task's input parameters - e.g.,
+`inputs.parameter_values['pipelinechannel--check-Output'] == 'pass'` - and only the
+subset of CEL that KFP compiles conditions into is supported: comparisons, `!`,
+`&&`, `||`, parentheses, the `int`, `double` and `string` conversions, and string,
+number and boolean literals.
+"""
+import re
+from collections.abc import Callable
+from typing import Any
+
+_TOKEN_PATTERN = re.compile(
+    r"""\s*(?:
+        (?P<param>inputs\.parameter_values\[(?P<name>'[^']*'|"[^"]*")\])
+        | (?P<number>\d+(?:\.\d*)?(?:[eE][-+]?\d+)?)
+        | (?P<string>'[^']*'|"[^"]*")
+        | (?P<ident>[A-Za-z_]\w*)
+        | (?P<op>==|!=|<=|>=|&&|\|\||[-<>!()])
+    )""",
+    re.VERBOSE,
+)
+
+_COMPARISONS = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+}
+
+_LITERALS = {"true": True, "false": False, "null": None}
+
+
+def _to_string(value: Any) -> str:
+    """Convert a value to a string, the way CEL does."""
+    if isinstance(value, bool):
+        return str(value).lower()
+    return str(value)
+
+
+_CONVERSIONS: dict[str, Callable[[Any], Any]] = {
+    "int": lambda value: int(float(value)) if isinstance(value, str) else int(value),
+    "double": float,
+    "string": _to_string,
+}
+
+
+def _tokenize(condition: str) -> list[tuple[str, str]]:
+    """Split a condition into (kind, text) tokens."""
+    tokens = []
+    position = 0
+    condition = condition.rstrip()
+    while position < len(condition):
+        match = _TOKEN_PATTERN.match(condition, position)
+        if match is None or match.end() == position:
+            raise RuntimeError(f"can't parse condition at: {condition[position:]}")
+        kind = str(match.lastgroup)
+        if kind == "param":
+            tokens.append((kind, match.group("name")[1:-1]))
+        else:
+            tokens.append((kind, match.group(kind)))
+        position = match.end()
+    return tokens
+
+
+class _Parser:
+    """Recursive descent parser that evaluates a condition as it is parsed."""
+
+    def __init__(self, condition: str, parameters: dict[str, Any]):
+        """Prepare to evaluate condition against parameters."""
+        self.condition = condition
+        self.tokens = _tokenize(condition)
+        self.position = 0
+        self.parameters = parameters
+
+    def _peek(self) -> str | None:
+        if self.position < len(self.tokens):
+            return self.tokens[self.position][1]
+        return None
+
+    def _take(self, expected: str | None = None) -> tuple[str, str]:
+        if self.position >= len(self.tokens):
+            raise RuntimeError(f"unexpected end of condition: {self.condition}")
+        token = self.tokens[self.position]
+        if expected is not None and token[1] != expected:
+            raise RuntimeError(f"expected '{expected}' in condition: {self.condition}")
+        self.position += 1
+        return token
+
+    def parse(self) -> Any:
+        value = self._or()
+        if self.position != len(self.tokens):
+            raise RuntimeError(f"unexpected '{self._peek()}' in: {self.condition}")
+        return value
+
+    def _or(self) -> Any:
+        value = self._and()
+        while self._peek() == "||":
+            self._take()
+            right = self._and()
+            value = value or right
+        return value
+
+    def _and(self) -> Any:
+        value = self._unary()
+        while self._peek() == "&&":
+            self._take()
+            right = self._unary()
+            value = value and right
+        return value
+
+    def _unary(self) -> Any:
+        if self._peek() == "!":
+            self._take()
+            return not self._unary()
+        return self._comparison()
+
+    def _comparison(self) -> Any:
+        left = self._operand()
+        operator = self._peek()
+        if operator not in _COMPARISONS:
+            return left
+        self._take()
+        right = self._operand()
+        try:
+            return _COMPARISONS[operator](left, right)
+        except TypeError:
+            msg = f"can't compare {left!r} {operator} {right!r} in: {self.condition}"
+            raise RuntimeError(msg)
+
+    def _operand(self) -> Any:
+        kind, text = self._take()
+        if text == "(":
+            value = self._or()
+            self._take(")")
+            return value
+        elif text == "-":
+            return -self._operand()
+        elif kind == "param":
+            if text not in self.parameters:
+                raise RuntimeError(f"condition refers to unknown input {text}")
+            return self.parameters[text]
+        elif kind == "number":
+            return float(text) if re.search("[.eE]", text) else int(text)
+        elif kind == "string":
+            return text[1:-1]
+        elif kind == "ident" and text in _LITERALS:
+            return _LITERALS[text]
+        elif kind == "ident" and text in _CONVERSIONS and self._peek() == "(":
+            self._take("(")
+            value = self._or()
+            self._take(")")
+            return _CONVERSIONS[text](value)
+        raise RuntimeError(f"unexpected '{text}' in condition: {self.condition}")
+
+
+def evaluate_condition(condition: str, parameters: dict[str, Any]) -> bool:
+    """Evaluate a trigger condition against the input parameters of a task.
+
+    Args:
+    ----
+        condition: CEL expression from the task's trigger policy.
+        parameters: The task's resolved input parameters, keyed by name.
+
+    Raises:
+    ------
+        RuntimeError: If the condition isn't supported, or refers to parameters that
+            aren't inputs to the task.
+    """
+    return bool(_Parser(condition, parameters).parse())
+
+
+def condition_inputs(condition: str) -> list[str]:
+    """Get the names of the input parameters that a condition refers to."""
+    return [text for kind, text in _tokenize(condition) if kind == "param"]
@@ -0,0 +1,107 @@
+"""Expanding sub-DAGs and ParallelFor loops into instances that can be executed."""
+import json
+import re
+from typing import Any, NamedTuple
+
+from kfp.pipeline_spec.pipeline_spec_pb2 import PipelineTaskSpec
+
+from kfp_local.spec import ROOT_DAG
+
+_SELECTOR_PATTERN = re.compile(r'parseJson\(string_value\)((?:\["[^"]*"\])+)')
+_SELECTOR_KEY_PATTERN = re.compile(r'\["([^"]*)"\]')
+
+
+class Scope(NamedTuple):
+    """An instance of a DAG within a run - the root DAG, a sub-DAG or an iteration.
+
+    The outputs of every task within a scope are stored in {run_dir}/{path}/{task},
+    and component inputs are resolved from the inputs passed to the DAG - except for
+    the root DAG, which reads pipeline inputs instead.
+    """
+
+    dag: str
+    path: str
+    parameters: dict[str, Any]
+    artifacts: dict[str, list[dict[str, Any]]]
+
+    def task_key(self, task: str) -> str:
+        """Key identifying a task instance within a run (also its output directory)."""
+        return f"{self.path}/{task}" if self.path else task
+
+
+ROOT_SCOPE = Scope(ROOT_DAG, "", {}, {})
+
+
+def apply_selector(value: Any, selector: str) -> Any:
+    """Select a field from a JSON value, using a KFP parameter expression selector.
+
+    Only selectors of the form `parseJson(string_value)["key"]...` are supported,
+    which is what KFP compiles references to fields of loop items into.
+
+    Args:
+    ----
+        value: The value to select from - JSON strings are parsed first.
+        selector: Parameter expression selector.
+
+    Raises:
+    ------
+        RuntimeError: If the selector isn't supported.
+    """
+    match = _SELECTOR_PATTERN.fullmatch(selector.strip())
+    if match is None:
+        raise RuntimeError(f"unsupported parameter expression selector {selector}")
+    if isinstance(value, str):
+        value = json.loads(value)
+    for key in _SELECTOR_KEY_PATTERN.findall(match.group(1)):
+        value = value[key]
+    return value
+
+
+def expand_dag_task(
+    task: PipelineTaskSpec,
+    task_key: str,
+    dag: str,
+    parameters: dict[str, Any],
+    artifacts: dict[str, list[dict[str, Any]]],
+) -> list[Scope]:
+    """Expand a task that runs a sub-DAG into the scopes that need to be executed.
+
+    Tasks that iterate over a list of parameters (i.e. ParallelFor loops) are
+    expanded into one scope per item, stored in {task_key}/{n}, where every item is
+    passed to the sub-DAG as the loop's item input. All other sub-DAGs are executed
+    once, in a scope stored in {task_key}.
+
+    Args:
+    ----
+        task: Task spec.
+        task_key: Key identifying the task instance.
+        dag: Name of the sub-DAG's component.
+        parameters: Input parameters passed to the sub-DAG.
+        artifacts: Input artifacts passed to the sub-DAG.
+
+    Raises:
+    ------
+        RuntimeError: If the task iterates over artifacts, or its items aren't a list.
+    """
+    if task.HasField("artifact_iterator"):
+        raise RuntimeError(
+            f"iterating over artifacts isn't supported (task={task_key})"
+        )
+    if not task.HasField("parameter_iterator"):
+        return [Scope(dag, task_key, parameters, artifacts)]
+
+    iterator = task.parameter_iterator
+    if iterator.items.WhichOneof("kind") == "raw":
+        items = json.loads(iterator.items.raw)
+    else:
+        items = parameters[iterator.items.input_parameter]
+    if isinstance(items, str):
+        items = json.loads(items)
+    if not isinstance(items, list):
+        raise RuntimeError(f"loop items for task={task_key} are not a list: {items}")
+    return [
+        Scope(
+            dag, f"{task_key}/{n}", {**parameters, iterator.item_input: item}, artifacts
+        )
+        for n, item in enumerate(items)
+    ]
@@ -0,0 +1,206 @@
+"""Pool of reusable virtual environments for executing tasks in isolation."""
+import hashlib
+import json
+import os
+import shlex
+import sys
+import threading
+from importlib.resources import files
+from pathlib import Path
+from typing import cast
+
+from kfp_local.launcher import ProcessUsage, TaskLog, preamble_command, run_process
+
+ENVS_FOLDER = ".nox"
+ENV_READY_FILE = ".kfpl-ready"
+PACKAGES_ENV_VAR = "KFPL_PACKAGES"
+WHEELHOUSE_FOLDER = ".kfpl-wheelhouse"
+
+_PIP_FLAGS_TO_IGNORE = {"--quiet", "--no-warn-script-location", "--no-deps"}
+
+
+def split_pip_preamble(cmd: list[str]) -> tuple[str | None, list[str]]:
+    """Split an executor command into its pip install preamble and the task command.
+
+    Components with `packages_to_install` are compiled into a command of the form,
+    `sh -c '<pip installs> && "$0" "$@"' sh -ec '<bootstrap>' <source>`, where the
+    preamble installs packages and then executes the rest of the command. The
+    preamble is returned as None for commands that don't have one.
+    """
+    if cmd[:2] == ["sh", "-c"] and len(cmd) > 3 and "pip install" in cmd[2]:
+        return cmd[2], cmd[3:]
+    return None, cmd
+
+
+def parse_packages(cmd: list[str]) -> list[str]:
+    """Extract the packages (and pip options) installed by an executor command."""
+    preamble, _ = split_pip_preamble(cmd)
+    if preamble is None:
+        return []
+    packages: list[str] = []
+    for statement in preamble.split("&&"):
+        tokens = shlex.split(statement)
+        for n in range(len(tokens) - 1):
+            if tokens[n : n + 2] == ["pip", "install"]:
+                args = tokens[n + 2 :]
+                packages += [arg for arg in args if arg not in _PIP_FLAGS_TO_IGNORE]
+                break
+    return packages
+
+
+def wheelhouse_env(
+    wheelhouse: str, env: dict[str, str] | None = None
+) -> dict[str, str]:
+    """Environment in which every pip install only installs from a wheelhouse.
+
+    Args:
+    ----
+        wheelhouse: Directory with wheels for every package to install (see the
+            wheelhouse module).
+        env: Environment to add pip's options to. Defaults to the current
+            environment.
+    """
+    env = dict(os.environ if env is None else env)
+    env["PIP_NO_INDEX"] = "1"
+    env["PIP_FIND_LINKS"] = str(Path(wheelhouse).absolute())
+    return env
+
+
+def environment_key(packages: list[str]) -> str:
+    """Compute a key that identifies the environment for a list of packages.
+
+    The key also covers the version of kfp installed into every environment and the
+    version of Python, so environments built before either changes aren't reused.
+    Environments are always built with this interpreter, as Nox is run using it and
+    the session doesn't pin another one.
+    """
+    from kfp_local.kfp_noxfile import KFP_VERSION
+
+    python_version = ".".join(str(part) for part in sys.version_info[:2])
+    spec = [f"python=={python_version}", f"kfp=={KFP_VERSION}", *packages]
+    return hashlib.sha256(json.dumps(spec).encode()).hexdigest()[:16]
+
+
+class EnvironmentPool:
+    """Nox-managed virtual environments, shared by all tasks needing the same packages.
+
+    Each environment is built once, with kfp and the packages parsed from a task's
+    pip preamble, and then reused by every subsequent task (and run) that needs the
+    same packages. Tasks executed in an environment skip their pip preamble.
+
+    Tasks that aren't executed in an environment of their own share the host's, so
+    their pip preambles are run once per distinct preamble, instead of once per task.
+    Packages are installed from the wheelhouse, when there is one.
+    """
+
+    def __init__(self, envs_dir: str | None = None, wheelhouse: str | None = None):
+        """Initialise pool that keeps environments in envs_dir (defaults to .nox).
+
+        Args:
+        ----
+            envs_dir: Directory to keep environments in. Defaults to .nox.
+            wheelhouse: Directory of wheels to install all packages from, without
+                using a package index. Defaults to None.
+        """
+        self.envs_dir = Path(envs_dir or Path.cwd() / ENVS_FOLDER)
+        self.wheelhouse = wheelhouse
+        self._locks: dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+        self._installed: set[str] = set()
+
+    def _env(self, env: dict[str, str] | None = None) -> dict[str, str]:
+        """Environment for installing packages, from the wheelhouse if there is one."""
+        env = dict(os.environ if env is None else env)
+        return wheelhouse_env(self.wheelhouse, env) if self.wheelhouse else env
+
+    @staticmethod
+    def _nox_cmd(env_dir: Path) -> list[str]:
+        """Nox command to run the task session in a specific environment.
+
+        Nox is run with this interpreter, so that it builds environments with it too.
+        """
+        noxfile_path = files("kfp_local") / "kfp_noxfile.py"
+        noxfile_path = cast(Path, noxfile_path)  # stop mypy error (likely bug)
+        return [
+            sys.executable,
+            "-m",
+            "nox",
+            "-s",
+            "run_pipeline_task",
+            "-f",
+            str(noxfile_path),
+            "--envdir",
+            str(env_dir),
+        ]
+
+    def _lock(self, key: str) -> threading.Lock:
+        """Get the lock used to guard building an environment."""
+        with self._locks_lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def is_ready(self, packages: list[str]) -> bool:
+        """Check if the environment for a list of packages has been built."""
+        return (self.envs_dir / environment_key(packages) / ENV_READY_FILE).exists()
+
+    def ensure(self, packages: list[str], log: TaskLog | None = None) -> Path:
+        """Build the environment for a list of packages, unless it already exists.
+
+        Args:
+        ----
+            packages: Packages (and pip options) to install into the environment.
+            log: Log to stream the output from building the environment to. Defaults
+                to None, in which case the output isn't captured.
+
+        Returns:
+        -------
+            Directory containing the environment.
+
+        Raises:
+        ------
+            RuntimeError: If the environment could not be built.
+        """
+        key = environment_key(packages)
+        env_dir = self.envs_dir / key
+        with self._lock(key):
+            if self.is_ready(packages):
+                return env_dir
+            env = self._env({**os.environ, PACKAGES_ENV_VAR: json.dumps(packages)})
+            build_cmd = [*self._nox_cmd(env_dir), "--install-only"]
+            if run_process(build_cmd, env, log).exit_code != 0:
+                raise RuntimeError(f"failed to build environment for {packages}")
+            (env_dir / ENV_READY_FILE).write_text(json.dumps(packages))
+        return env_dir
+
+    def task_command(self, cmd: list[str], args: list[str]) -> list[str]:
+        """Get the command that executes a task in its environment.
+
+        The environment will be built if it doesn't exist already.
+        """
+        packages = parse_packages(cmd)
+        env_dir = self.ensure(packages)
+        _, task_cmd = split_pip_preamble(cmd)
+        return [*self._nox_cmd(env_dir), "-R", "--", *task_cmd, *args]
+
+    def install_preamble(
+        self, preamble: str, log: TaskLog | None = None
+    ) -> ProcessUsage | None:
+        """Run a pip preamble in the host's environment, unless it already has been.
+
+        Args:
+        ----
+            preamble: Pip preamble of a task (see split_pip_preamble).
+            log: Log to stream pip's output to. Defaults to None, in which case the
+                output isn't captured.
+
+        Returns:
+        -------
+            Resources used by the preamble (including its exit code), or None if it
+            had already been run successfully.
+        """
+        with self._lock(preamble):
+            if preamble in self._installed:
+                return None
+            usage = run_process(preamble_command(preamble), self._env(), log)
+            if usage.exit_code == 0:
+                self._installed.add(preamble)
+        return usage
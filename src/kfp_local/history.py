@@ -0,0 +1,373 @@
+"""History of all runs, and the tasks within them, kept in a SQLite database."""
+import json
+import sqlite3
+from collections.abc import Iterable
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from kfp_local.cache import input_paths, path_digest
+
+if TYPE_CHECKING:
+    from kfp_local.report import TaskRecord
+
+HISTORY_FILE = ".kfp-local-history.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    pipeline_name TEXT NOT NULL,
+    root TEXT NOT NULL,
+    status TEXT NOT NULL,
+    params TEXT NOT NULL,
+    start_time REAL NOT NULL,
+    end_time REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_pipeline_time ON runs (pipeline_name, start_time);
+CREATE INDEX IF NOT EXISTS runs_time ON runs (start_time);
+CREATE TABLE IF NOT EXISTS tasks (
+    run_id TEXT NOT NULL REFERENCES runs (run_id) ON DELETE CASCADE,
+    task TEXT NOT NULL,
+    status TEXT NOT NULL,
+    exit_code INTEGER,
+    fingerprint TEXT,
+    parameters TEXT NOT NULL,
+    ready_time REAL NOT NULL,
+    start_time REAL NOT NULL,
+    end_time REAL NOT NULL,
+    setup_time REAL NOT NULL,
+    run_time REAL NOT NULL,
+    user_time REAL NOT NULL,
+    sys_time REAL NOT NULL,
+    max_rss INTEGER NOT NULL,
+    PRIMARY KEY (run_id, task)
+);
+CREATE INDEX IF NOT EXISTS tasks_task_time ON tasks (task, start_time);
+CREATE TABLE IF NOT EXISTS artifacts (
+    run_id TEXT NOT NULL,
+    task TEXT NOT NULL,
+    direction TEXT NOT NULL,
+    path TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    PRIMARY KEY (run_id, task, direction, path),
+    FOREIGN KEY (run_id, task) REFERENCES tasks (run_id, task) ON DELETE CASCADE
+);
+"""
+
+
+def connect(path: str = HISTORY_FILE) -> sqlite3.Connection:
+    """Open the history database, creating it if it doesn't exist.
+
+    The database uses write-ahead logging, so that concurrent runs (e.g. within a
+    sweep) can record their history while it's being queried.
+    """
+    connection = sqlite3.connect(path, timeout=30)
+    connection.row_factory = sqlite3.Row
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA foreign_keys=ON")
+    connection.executescript(_SCHEMA)
+    return connection
+
+
+def record_run(
+    run_id: str,
+    pipeline_name: str,
+    root: str,
+    status: str,
+    params: dict[str, Any],
+    records: Iterable["TaskRecord"],
+    manifest: dict[str, dict[str, Any]],
+    executor_inputs: dict[str, str],
+    path: str = HISTORY_FILE,
+) -> None:
+    """Record a run, together with every task that was part of it.
+
+    Runs that have been resumed (or extended using --target) are updated, with
+    tasks that were skipped keeping their record from the attempt that ran them.
+
+    Args:
+    ----
+        run_id: Run ID.
+        pipeline_name: Name of the pipeline.
+        root: Directory containing the run.
+        status: Status of the run.
+        params: Pipeline inputs that were overridden for the run.
+        records: Timings and resource usage for every task.
+        manifest: Fingerprints and output digests for every task, keyed by task -
+            as recorded in the run's manifest.
+        executor_inputs: Executor inputs for every task, keyed by task.
+        path: Path to the history database. Defaults to ".kfp-local-history.db".
+    """
+    task_rows: list[tuple[Any, ...]] = []
+    artifact_rows: list[tuple[str, ...]] = []
+    for r in records:
+        if r.status == "skipped":
+            continue
+        task = manifest.get(r.task, {})
+        executor_input = executor_inputs.get(r.task)
+        parameters = (
+            json.loads(executor_input)["inputs"].get("parameterValues", {})
+            if executor_input
+            else {}
+        )
+        task_rows.append(
+            (
+                run_id,
+                r.task,
+                r.status,
+                r.exit_code,
+                task.get("fingerprint"),
+                json.dumps(parameters),
+                r.ready,
+                r.start,
+                r.end,
+                r.setup_time,
+                r.run_time,
+                r.user_time,
+                r.sys_time,
+                r.max_rss,
+            )
+        )
+        for input_path in input_paths(executor_input) if executor_input else []:
+            if input_path.exists():
+                digest = path_digest(input_path)
+                artifact_rows.append((run_id, r.task, "input", str(input_path), digest))
+        for output_path, output in task.get("outputs", {}).items():
+            digest = output["digest"]
+            artifact_rows.append((run_id, r.task, "output", output_path, digest))
+
+    start = min((row[7] for row in task_rows), default=datetime.now().timestamp())
+    end = max((row[8] for row in task_rows), default=start)
+    with connect(path) as connection:
+        connection.execute(
+            """
+            INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (run_id) DO UPDATE SET
+                status = excluded.status,
+                start_time = min(start_time, excluded.start_time),
+                end_time = max(end_time, excluded.end_time)
+            """,
+            (run_id, pipeline_name, root, status, json.dumps(params), start, end),
+        )
+        connection.executemany(
+            "DELETE FROM artifacts WHERE run_id = ? AND task = ?",
+            [(run_id, row[1]) for row in task_rows],
+        )
+        connection.executemany(
+            f"INSERT OR REPLACE INTO tasks VALUES ({', '.join('?' * 14)})", task_rows
+        )
+        connection.executemany(
+            "INSERT OR REPLACE INTO artifacts VALUES (?, ?, ?, ?, ?)", artifact_rows
+        )
+    connection.close()
+
+
+def query_runs(
+    pipeline_name: str | None = None,
+    task: str | None = None,
+    limit: int = 20,
+    path: str = HISTORY_FILE,
+) -> list[dict[str, Any]]:
+    """Find the most recent runs, from newest to oldest.
+
+    Args:
+    ----
+        pipeline_name: Only find runs of this pipeline. Defaults to None.
+        task: Only find runs that include this task, together with the task's
+            status and duration. Defaults to None.
+        limit: Maximum number of runs to find. Defaults to 20.
+        path: Path to the history database. Defaults to ".kfp-local-history.db".
+    """
+    conditions, args = [], []
+    if pipeline_name:
+        conditions.append("runs.pipeline_name = ?")
+        args.append(pipeline_name)
+    if task:
+        conditions.append("tasks.task = ?")
+        args.append(task)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    task_columns = (
+        "tasks.status AS task_status, tasks.end_time - tasks.start_time AS task_time"
+        if task
+        else "NULL AS task_status, NULL AS task_time"
+    )
+    join = "JOIN tasks ON tasks.run_id = runs.run_id" if task else ""
+    query = f"""
+        SELECT runs.*, {task_columns},
+            (SELECT count(*) FROM tasks t WHERE t.run_id = runs.run_id) AS n_tasks
+        FROM runs {join} {where}
+        ORDER BY runs.start_time DESC
+        LIMIT ?
+    """
+    if not Path(path).exists():
+        return []
+    with connect(path) as connection:
+        rows = connection.execute(query, [*args, limit]).fetchall()
+    connection.close()
+    return [dict(row) for row in rows]
+
+
+def get_run(run_id: str, path: str = HISTORY_FILE) -> dict[str, Any] | None:
+    """Get a run, together with all of its tasks and their artifacts.
+
+    Args:
+    ----
+        run_id: Run ID.
+        path: Path to the history database. Defaults to ".kfp-local-history.db".
+
+    Returns:
+    -------
+        The run, or None if it isn't in the history.
+    """
+    if not Path(path).exists():
+        return None
+    with connect(path) as connection:
+        run = connection.execute(
+            "SELECT * FROM runs WHERE run_id = ?", (run_id,)
+        ).fetchone()
+        tasks = connection.execute(
+            "SELECT * FROM tasks WHERE run_id = ? ORDER BY start_time", (run_id,)
+        ).fetchall()
+        artifacts = connection.execute(
+            "SELECT * FROM artifacts WHERE run_id = ? ORDER BY task, direction, path",
+            (run_id,),
+        ).fetchall()
+    connection.close()
+    if run is None:
+        return None
+    task_artifacts: dict[str, list[dict[str, Any]]] = {}
+    for artifact in artifacts:
+        task_artifacts.setdefault(artifact["task"], []).append(dict(artifact))
+    return {
+        **dict(run),
+        "params": json.loads(run["params"]),
+        "tasks": [
+            {
+                **dict(task),
+                "parameters": json.loads(task["parameters"]),
+                "artifacts": task_artifacts.get(task["task"], []),
+            }
+            for task in tasks
+        ],
+    }
+
+
+def _time(timestamp: float) -> str:
+    """Format a timestamp for display."""
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _table(header: list[str], rows: list[list[str]]) -> str:
+    """Format rows of values as a table with aligned columns."""
+    widths = [max(len(row[n]) for row in [header, *rows]) for n in range(len(header))]
+    lines = ["  ".join(h.ljust(w) for h, w in zip(header, widths))]
+    lines.append("-" * len(lines[0]))
+    lines += ["  ".join(v.ljust(w) for v, w in zip(row, widths)) for row in rows]
+    return "\n".join(line.rstrip() for line in lines)
+
+
+def format_runs(runs: list[dict[str, Any]]) -> str:
+    """Format a list of runs as a table."""
+    with_task = any(run["task_status"] is not None for run in runs)
+    header = ["run_id", "pipeline", "status", "started", "duration", "tasks"]
+    if with_task:
+        header += ["task status", "task duration"]
+    rows = []
+    for run in runs:
+        row = [
+            run["run_id"],
+            run["pipeline_name"],
+            run["status"],
+            _time(run["start_time"]),
+            f"{run['end_time'] - run['start_time']:.2f}s",
+            str(run["n_tasks"]),
+        ]
+        if with_task:
+            row += [run["task_status"], f"{run['task_time']:.2f}s"]
+        rows.append(row)
+    return _table(header, rows)
+
+
+def format_run(run: dict[str, Any]) -> str:
+    """Format a run, with a table of all of its tasks and their artifacts."""
+    lines = [
+        f"run_id:   {run['run_id']}",
+        f"pipeline: {run['pipeline_name']}",
+        f"root:     {run['root']}",
+        f"status:   {run['status']}",
+        f"started:  {_time(run['start_time'])}",
+        f"duration: {run['end_time'] - run['start_time']:.2f}s",
+        f"params:   {json.dumps(run['params'])}",
+        "",
+    ]
+    header = ["task", "status", "exit", "duration", "setup", "run", "peak rss"]
+    rows = [
+        [
+            task["task"],
+            task["status"],
+            "-" if task["exit_code"] is None else str(task["exit_code"]),
+            f"{task['end_time'] - task['start_time']:.2f}s",
+            f"{task['setup_time']:.2f}s",
+            f"{task['run_time']:.2f}s",
+            f"{task['max_rss'] / 1024**2:.1f}MB",
+        ]
+        for task in run["tasks"]
+    ]
+    lines.append(_table(header, rows))
+    artifacts = [
+        [task["task"], a["direction"], a["path"], a["digest"][:12]]
+        for task in run["tasks"]
+        for a in task["artifacts"]
+    ]
+    if artifacts:
+        lines += ["", _table(["task", "direction", "path", "digest"], artifacts)]
+    return "\n".join(lines)
+
+
+def _compare_inputs(a: dict[str, Any] | None, b: dict[str, Any] | None) -> str:
+    """Describe whether two tasks were executed with the same inputs."""
+    if not a or not b or a["fingerprint"] is None or b["fingerprint"] is None:
+        return "-"
+    return "same" if a["fingerprint"] == b["fingerprint"] else "different"
+
+
+def format_comparison(run_a: dict[str, Any], run_b: dict[str, Any]) -> str:
+    """Format a comparison of the parameters and task durations of two runs."""
+    lines = [f"comparing run_id={run_a['run_id']} to run_id={run_b['run_id']}", ""]
+    param_names = sorted({*run_a["params"], *run_b["params"]})
+    changed_params = [
+        [
+            name,
+            json.dumps(run_a["params"].get(name, "-")),
+            json.dumps(run_b["params"].get(name, "-")),
+        ]
+        for name in param_names
+        if run_a["params"].get(name) != run_b["params"].get(name)
+    ]
+    if changed_params:
+        lines += [_table(["param", "a", "b"], changed_params), ""]
+
+    tasks_a = {task["task"]: task for task in run_a["tasks"]}
+    tasks_b = {task["task"]: task for task in run_b["tasks"]}
+    rows = []
+    for name in [*tasks_a, *(task for task in tasks_b if task not in tasks_a)]:
+        a, b = tasks_a.get(name), tasks_b.get(name)
+        time_a = a["end_time"] - a["start_time"] if a else None
+        time_b = b["end_time"] - b["start_time"] if b else None
+        change = "-"
+        if time_a and time_b is not None:
+            change = f"{(time_b - time_a) / time_a:+.1%}"
+        rows.append(
+            [
+                name,
+                a["status"] if a else "-",
+                b["status"] if b else "-",
+                "-" if time_a is None else f"{time_a:.2f}s",
+                "-" if time_b is None else f"{time_b:.2f}s",
+                change,
+                _compare_inputs(a, b),
+            ]
+        )
+    header = ["task", "status a", "status b", "time a", "time b", "change", "inputs"]
+    lines.append(_table(header, rows))
+    return "\n".join(lines)
@@ -1,17 +1,29 @@
 """Isolated KFP stage execution using Nox."""
+import json
+import os
+
 import nox
 
 KFP_VERSION = "2.4.0"
-KFP_MODULE_EDIT = (
-    ".nox/run_pipeline_task/lib/python3.10/site-packages/"
-    "kfp/dsl/types/artifact_types.py"
-)
+PACKAGES_ENV_VAR = "KFPL_PACKAGES"
 
 
 @nox.session()
 def run_pipeline_task(session: nox.Session):
-    """Run stage by passing command and args as nox posargs."""
+    """Run stage by passing command and args as nox posargs.
+
+    The session doesn't set a Python version, so environments are built with the
+    interpreter running Nox - kfp-local runs Nox with its own, which environment keys
+    depend on.
+
+    Packages are only installed when the environment is first created, so that it
+    can be reused by all stages that require the same packages (passed as a JSON
+    list in the KFPL_PACKAGES environment variable).
+    """
     session.chdir(session.invoked_from)
     session.install(f"kfp=={KFP_VERSION}")
-    session.run("sed", "-i.bak", r"s/\/gcs\///", KFP_MODULE_EDIT, external=True)
-    session.run(*session.posargs, external=True)
+    packages = json.loads(os.environ.get(PACKAGES_ENV_VAR, "[]"))
+    if packages:
+        session.install(*packages)
+    if session.posargs:
+        session.run(*session.posargs, external=True)
@@ -0,0 +1,217 @@
+"""Launching task processes, streaming their logs and measuring their resources."""
+import asyncio
+import os
+import resource
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import IO, NamedTuple, TextIO
+
+from kfp_local.resources import ProcessLimits, limit_command
+
+LOGS_FOLDER = "logs"
+EXECUTOR_INPUTS_FOLDER = "executor_inputs"
+EXECUTOR_INPUT_FILE_PREFIX = "@"
+# Linux limits every argument to 128KiB, and all of them together to ~2MB
+MAX_INLINE_EXECUTOR_INPUT = 64 * 1024
+RUNTIME_DIR = Path(__file__).parent / "_runtime"
+
+# lines longer than this are streamed in chunks, to bound memory used per stream
+_LINE_LIMIT = 64 * 1024
+
+# ru_maxrss is reported in bytes on macOS and in kilobytes everywhere else
+_MAX_RSS_UNITS = 1 if sys.platform == "darwin" else 1024
+
+
+def max_rss_bytes(rusage: resource.struct_rusage) -> int:
+    """Get the peak resident set size from resource usage, in bytes."""
+    return rusage.ru_maxrss * _MAX_RSS_UNITS
+
+
+def task_env(env: dict[str, str] | None = None) -> dict[str, str]:
+    """Environment for task processes, with kfp-local's runtime hook on the path.
+
+    The runtime hook is a sitecustomize module that maps artifact URIs onto local
+    paths when kfp is imported by the task (see _runtime/sitecustomize.py).
+
+    Args:
+    ----
+        env: Environment to add the runtime hook to. Defaults to the current
+            environment.
+    """
+    env = dict(os.environ if env is None else env)
+    python_path = [str(RUNTIME_DIR), *filter(None, [env.get("PYTHONPATH")])]
+    env["PYTHONPATH"] = os.pathsep.join(python_path)
+    return env
+
+
+def executor_input_arg(executor_input: str, input_file: Path) -> str:
+    """Get the argument that passes the executor input to a task.
+
+    Executor inputs are passed on the command line, unless they're larger than
+    MAX_INLINE_EXECUTOR_INPUT - e.g. because of large list or struct parameters -
+    in which case they're written to input_file and passed as `@input_file`. The
+    runtime hook reads the file back into the task's arguments before kfp's
+    executor parses them (see _runtime/sitecustomize.py), so large inputs never
+    hit the limits on the size of arguments, or get copied through every shell.
+    """
+    if len(executor_input.encode()) <= MAX_INLINE_EXECUTOR_INPUT:
+        return executor_input
+    input_file.parent.mkdir(parents=True, exist_ok=True)
+    input_file.write_text(executor_input)
+    return f"{EXECUTOR_INPUT_FILE_PREFIX}{input_file}"
+
+
+def executor_input_file(cmd: list[str]) -> Path | None:
+    """Get the file that a task's executor input is passed in, if it's in one."""
+    for flag, value in zip(cmd, cmd[1:]):
+        if flag == "--executor_input" and value.startswith(EXECUTOR_INPUT_FILE_PREFIX):
+            return Path(value[len(EXECUTOR_INPUT_FILE_PREFIX) :])
+    return None
+
+
+class TaskLog:
+    """Log for a task, streamed to the console and written to a file.
+
+    Every line is printed with the name of the task as a prefix, so that the output
+    from tasks running concurrently can be told apart. Lines are written to the log
+    file exactly as they were received, with stdout and stderr interleaved.
+    """
+
+    _console_lock = threading.Lock()
+
+    def __init__(self, name: str, log_file: Path):
+        """Create log_file (and its parent directories) for the task called name."""
+        self.name = name
+        self.log_file = log_file
+        log_file.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(log_file, "ab")
+        self._file_lock = threading.Lock()
+
+    def write_line(self, line: bytes, stream: TextIO) -> None:
+        """Write a line (or chunk of a long line) to the log file and the console."""
+        with self._file_lock:
+            self._file.write(line)
+        text = line.decode(errors="replace").rstrip("\r\n")
+        with self._console_lock:
+            print(f"[{self.name}] {text}", file=stream, flush=True)
+
+    def write(self, output: str, stream: TextIO) -> None:
+        """Write output that has already been captured, line by line."""
+        for line in output.splitlines(keepends=True):
+            self.write_line(line.encode(), stream)
+
+    def close(self) -> None:
+        """Close the log file."""
+        self._file.close()
+
+    def __enter__(self) -> "TaskLog":
+        """Use log as a context manager."""
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        """Close the log file when exiting the context."""
+        self.close()
+
+
+async def _stream_lines(pipe: IO[bytes], log: TaskLog, stream: TextIO) -> None:
+    """Stream lines from a pipe to a task's log until the pipe is closed."""
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader(limit=_LINE_LIMIT)
+    transport, _ = await loop.connect_read_pipe(
+        lambda: asyncio.StreamReaderProtocol(reader), pipe
+    )
+    try:
+        while True:
+            try:
+                line = await reader.readuntil(b"\n")
+            except asyncio.LimitOverrunError as e:
+                line = await reader.readexactly(e.consumed)
+            except asyncio.IncompleteReadError as e:
+                if e.partial:
+                    log.write_line(e.partial, stream)
+                break
+            log.write_line(line, stream)
+    finally:
+        transport.close()
+
+
+async def _stream_output(process: subprocess.Popen, log: TaskLog) -> None:
+    """Stream stdout and stderr from a process to a task's log, concurrently."""
+    await asyncio.gather(
+        _stream_lines(process.stdout, log, sys.stdout),  # type: ignore
+        _stream_lines(process.stderr, log, sys.stderr),  # type: ignore
+    )
+
+
+class ProcessUsage(NamedTuple):
+    """Exit code, wall-clock time, CPU time and peak memory used by a process."""
+
+    exit_code: int
+    wall_time: float
+    user_time: float
+    sys_time: float
+    max_rss: int
+
+
+def run_process(
+    cmd: list[str],
+    env: dict[str, str] | None = None,
+    log: TaskLog | None = None,
+    limits: ProcessLimits | None = None,
+    cwd: Path | None = None,
+) -> ProcessUsage:
+    """Run a command to completion and measure the resources it used.
+
+    The process is reaped using `os.wait4`, so the CPU times and peak resident set
+    size (in bytes) cover the process together with all of its descendants that it
+    waited for - e.g. the Python interpreter started by a component's shell command.
+
+    When a log is passed, stdout and stderr are read line by line as the process
+    writes them (using asyncio, so neither pipe can fill up and stall the process)
+    and streamed to the log, without ever holding more than one line in memory.
+
+    Args:
+    ----
+        cmd: Command to run.
+        env: Environment variables for the process. Defaults to the current
+            environment.
+        log: Log to stream the process's output to. Defaults to None, in which case
+            the process inherits stdout and stderr.
+        limits: CPU cores and memory to limit the process to, from before it's
+            executed. Defaults to None.
+        cwd: Directory to run the process in. Defaults to the current directory.
+    """
+    if limits:
+        cmd = limit_command(cmd, limits)
+    started = time.perf_counter()
+    pipe = subprocess.PIPE if log else None
+    process = subprocess.Popen(cmd, cwd=cwd, env=env, stdout=pipe, stderr=pipe)
+    try:
+        if log:
+            asyncio.run(_stream_output(process, log))
+        _, status, rusage = os.wait4(process.pid, 0)
+    except BaseException:
+        process.kill()
+        process.wait()
+        raise
+    wall_time = time.perf_counter() - started
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return ProcessUsage(
+        process.returncode,
+        wall_time,
+        rusage.ru_utime,
+        rusage.ru_stime,
+        max_rss_bytes(rusage),
+    )
+
+
+def preamble_command(preamble: str) -> list[str]:
+    """Command that runs a pip preamble on its own, without executing the task.
+
+    Preambles end by executing their positional arguments (`"$0" "$@"`), so passing
+    `true` as the only argument turns them into a standalone command.
+    """
+    return ["sh", "-c", preamble, "true"]
@@ -0,0 +1,110 @@
+"""Manifest recording the state and outputs of every task in a run."""
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any
+
+from kfp_local.cache import output_paths, path_digest
+
+MANIFEST_FILE = "manifest.json"
+
+PENDING = "pending"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+PRUNED = "pruned"
+
+
+def _signature(path: Path) -> list[Any]:
+    """Cheap signature that changes whenever a file, or any file in a dir, is modified.
+
+    The size and modification time of a directory itself don't change when the files
+    within it are modified in place, so directories are signed using those of every
+    file within them instead.
+    """
+    if path.is_dir():
+        files = sorted(p for p in path.rglob("*") if p.is_file())
+        return [[str(file.relative_to(path)), *_signature(file)] for file in files]
+    stat = path.stat()
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class RunManifest:
+    """Record of the state, input fingerprint and outputs of every task in a run.
+
+    The manifest is persisted to the run directory every time it's updated, so that
+    it survives the driver being killed part-way through a run.
+    """
+
+    def __init__(self, run_dir: Path):
+        """Load the manifest for a run, or start a new one."""
+        self.path = Path(run_dir) / MANIFEST_FILE
+        self._lock = threading.Lock()
+        if self.path.exists():
+            self.tasks: dict[str, dict[str, Any]] = json.loads(self.path.read_text())
+        else:
+            self.tasks = {}
+
+    def _save(self) -> None:
+        """Atomically write the manifest to disk."""
+        tmp_path = self.path.with_suffix(f".tmp-{threading.get_ident()}")
+        tmp_path.write_text(json.dumps(self.tasks, indent=2))
+        os.replace(tmp_path, self.path)
+
+    def state(self, task: str) -> str:
+        """Get the current state of a task."""
+        return self.tasks.get(task, {}).get("state", PENDING)
+
+    def record(
+        self,
+        task: str,
+        state: str,
+        fingerprint: str | None = None,
+        executor_input: str | None = None,
+    ) -> None:
+        """Record the state of a task.
+
+        Args:
+        ----
+            task: Task name.
+            state: New state of the task.
+            fingerprint: Fingerprint of the task's command and inputs.
+            executor_input: JSON-serialised executor input - used to locate outputs
+                for tasks that have succeeded, so they can be validated later on.
+        """
+        entry: dict[str, Any] = {"state": state, "fingerprint": fingerprint}
+        if state == SUCCEEDED and executor_input is not None:
+            output_file, artifact_paths = output_paths(executor_input)
+            entry["outputs"] = {
+                str(path): {"digest": path_digest(path), "signature": _signature(path)}
+                for path in [output_file, *artifact_paths.values()]
+                if path.exists()
+            }
+        with self._lock:
+            self.tasks[task] = entry
+            self._save()
+
+    def has_outputs(self, task: str) -> bool:
+        """Check if a task has succeeded and all of its outputs are still intact.
+
+        Outputs whose size and modification time (or those of every file within
+        them, for directories) haven't changed are assumed to be intact - all other
+        outputs are re-hashed and compared to their digest.
+        """
+        entry = self.tasks.get(task, {})
+        if entry.get("state") != SUCCEEDED:
+            return False
+        for output, recorded in entry.get("outputs", {}).items():
+            path = Path(output)
+            if not path.exists():
+                return False
+            if _signature(path) != recorded["signature"]:
+                if path_digest(path) != recorded["digest"]:
+                    return False
+        return True
+
+    def is_valid(self, task: str, fingerprint: str) -> bool:
+        """Check if a task succeeded with the same inputs and its outputs are intact."""
+        entry = self.tasks.get(task, {})
+        return entry.get("fingerprint") == fingerprint and self.has_outputs(task)
@@ -0,0 +1,70 @@
+"""Types of pipeline parameters, as defined by the KFP pipeline spec.
+
+These mirror `kfp.dsl.types.type_utils` (i.e. the values of the ParameterTypeEnum
+protobuf enum), so that they can be used without importing kfp.
+"""
+from typing import Any
+
+PARAMETER_TYPE_UNSPECIFIED = 0
+NUMBER_DOUBLE = 1
+NUMBER_INTEGER = 2
+STRING = 3
+BOOLEAN = 4
+LIST = 5
+STRUCT = 6
+
+TYPE_NAMES = {
+    PARAMETER_TYPE_UNSPECIFIED: "Any",
+    NUMBER_DOUBLE: "float",
+    NUMBER_INTEGER: "int",
+    STRING: "str",
+    BOOLEAN: "bool",
+    LIST: "list",
+    STRUCT: "dict",
+}
+
+
+class Placeholder(str):
+    """Stand-in for an output parameter that a task hasn't produced yet.
+
+    Placeholders are used in place of values when planning a run, and know the type
+    of the output they stand in for.
+    """
+
+    parameter_type: int
+
+    def __new__(cls, value: str, parameter_type: int = PARAMETER_TYPE_UNSPECIFIED):
+        """Create placeholder for an output of type parameter_type."""
+        placeholder = super().__new__(cls, value)
+        placeholder.parameter_type = parameter_type
+        return placeholder
+
+
+def matches_type(value: Any, parameter_type: int) -> bool:
+    """Check if a value (or placeholder) can be passed as a parameter of some type.
+
+    Integers are accepted as floats, and floats with integral values as integers,
+    because JSON doesn't tell the two apart.
+    """
+    if isinstance(value, Placeholder):
+        value_type = value.parameter_type
+        if PARAMETER_TYPE_UNSPECIFIED in (value_type, parameter_type):
+            return True
+        return value_type == parameter_type or (
+            value_type == NUMBER_INTEGER and parameter_type == NUMBER_DOUBLE
+        )
+    if parameter_type == NUMBER_DOUBLE:
+        return isinstance(value, int | float) and not isinstance(value, bool)
+    elif parameter_type == NUMBER_INTEGER:
+        if isinstance(value, float):
+            return value.is_integer()
+        return isinstance(value, int) and not isinstance(value, bool)
+    elif parameter_type == STRING:
+        return isinstance(value, str)
+    elif parameter_type == BOOLEAN:
+        return isinstance(value, bool)
+    elif parameter_type == LIST:
+        return isinstance(value, list)
+    elif parameter_type == STRUCT:
+        return isinstance(value, dict)
+    return True
@@ -1,27 +1,86 @@
 """Demonstrating how KFP can be used to work with compiled pipelines."""
-import argparse
 import json
-import os
-import shutil
-import subprocess
+import sqlite3
 import sys
-from importlib.resources import files
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Protocol, cast
+from typing import Any, NamedTuple, Protocol
 
-from google.protobuf.json_format import ParseDict
-from kfp.dsl import structures
-from kfp.dsl.types.type_utils import (
+from google.protobuf.struct_pb2 import ListValue, Struct
+from kfp.pipeline_spec.pipeline_spec_pb2 import PipelineSpec
+
+from kfp_local.agents import AgentPool
+from kfp_local.cache import (
+    CACHE_FOLDER,
+    clear_outputs,
+    copy_task_outputs,
+    input_paths,
+    prune_cache,
+    restore_from_cache,
+    store_in_cache,
+    task_fingerprint,
+)
+from kfp_local.conditions import evaluate_condition
+from kfp_local.dags import ROOT_SCOPE, Scope, apply_selector, expand_dag_task
+from kfp_local.environments import EnvironmentPool, parse_packages, split_pip_preamble
+from kfp_local.history import HISTORY_FILE, record_run
+from kfp_local.launcher import (
+    EXECUTOR_INPUTS_FOLDER,
+    LOGS_FOLDER,
+    ProcessUsage,
+    TaskLog,
+    executor_input_arg,
+    run_process,
+    task_env,
+)
+from kfp_local.manifest import (
+    FAILED,
+    PENDING,
+    PRUNED,
+    RUNNING,
+    SUCCEEDED,
+    RunManifest,
+)
+from kfp_local.param_types import (
     BOOLEAN,
     LIST,
     NUMBER_DOUBLE,
     NUMBER_INTEGER,
     STRING,
     STRUCT,
+    Placeholder,
 )
-from kfp.pipeline_spec.pipeline_spec_pb2 import PipelineSpec
+from kfp_local.report import (
+    TaskRecord,
+    critical_path,
+    format_summary,
+    task_record,
+    write_timings,
+    write_trace,
+)
+from kfp_local.resources import ResourcePool, TaskResources, parse_resources
+from kfp_local.runs import (
+    DEFAULT_KEEP_RUNS,
+    LOCAL_FOLDER,
+    create_run,
+    gc_runs,
+    latest_run,
+    new_run_id,
+    set_run_status,
+)
+from kfp_local.scheduler import (
+    build_task_graph,
+    downstream_depths,
+    run_dag,
+    upstream_closure,
+    upstream_tasks,
+)
+from kfp_local.spec import ROOT_DAG, get_index, load_pipeline_spec
+from kfp_local.store import modified_files, snapshot
+from kfp_local.sweep import SingleFlight
+from kfp_local.workers import WorkerPool, parse_component
 
-LOCAL_FOLDER = "object-storage-bucket"
 OUTPUT_METADATA_FILE = "output_metadata.json"
 SCHEMA_VERSION = "2.1.0"
 
@@ -39,33 +98,95 @@ class _HasTypeValueAttr(Protocol):
 _ParamType = int | float | str | bool | list | dict
 
 
-def load_pipeline_spec(compiled_pipeline_file: str) -> PipelineSpec:
-    """Load compiled pipeline JSON and parse into PipelineSpec object."""
-    pipeline_file = Path.cwd() / compiled_pipeline_file
-    if not pipeline_file.exists():
-        raise FileNotFoundError(f"Can't find {pipeline_file}")
-    try:
-        component_dict = structures.load_documents_from_yaml(pipeline_file.read_text())[
-            0
-        ]  # noqa
-        pipeline_spec = ParseDict(component_dict, PipelineSpec())
-    except Exception as e:
-        raise RuntimeError(f"{pipeline_file} is not a valid `PipelineSpec` - {e}")
-    return pipeline_spec
+class TaskPools(NamedTuple):
+    """Resources for executing tasks, which can be shared by concurrent runs.
+
+    Slots limit the number of tasks executing at once, and the CPUs and memory they
+    reserve, across all runs. Tasks with identical inputs are only executed once
+    when in_flight is set, and are sent to other hosts when agent_pool is set.
+    """
+
+    slots: ResourcePool
+    env_pool: EnvironmentPool
+    warm_pool: WorkerPool | None = None
+    in_flight: SingleFlight | None = None
+    agent_pool: AgentPool | None = None
+
+
+def task_pools(
+    max_workers: int | None = None,
+    use_warm_pool: bool = False,
+    share_outputs: bool = False,
+    cpus: float | None = None,
+    memory: int | None = None,
+    agents: list[str] | None = None,
+    stream_artifacts: bool = False,
+    wheelhouse: str | None = None,
+) -> TaskPools:
+    """Create the resources for executing tasks.
+
+    Args:
+    ----
+        max_workers: Maximum number of tasks to execute concurrently. Defaults to the
+            number of CPUs on the machine.
+        use_warm_pool: Start a pool of warm worker processes. Defaults to False.
+        share_outputs: Execute tasks with identical inputs once, sharing their
+            outputs. Defaults to False.
+        cpus: CPUs to pack tasks onto, using the CPUs their components request.
+            Defaults to all the cores available.
+        memory: Memory (in bytes) to pack tasks into, using the memory their
+            components request. Defaults to the host's physical memory.
+        agents: Addresses (HOST:PORT) of agents to execute tasks on, instead of
+            this host - in which case max_workers, cpus and memory default to the
+            totals across all the agents. Defaults to None.
+        stream_artifacts: Send artifacts to and from agents, instead of using a
+            filesystem shared with them. Defaults to False.
+        wheelhouse: Directory of wheels to install packages from, instead of using
+            a package index (see `kfpl prefetch`). Defaults to None.
+    """
+    agent_pool = AgentPool(agents, stream_artifacts) if agents else None
+    if agent_pool:
+        max_workers = max_workers or agent_pool.slots
+        cpus = cpus or agent_pool.cpus
+        memory = memory or agent_pool.memory
+    return TaskPools(
+        ResourcePool(max_workers, cpus, memory),
+        EnvironmentPool(wheelhouse=wheelhouse),
+        WorkerPool(max_workers) if use_warm_pool else None,
+        SingleFlight() if share_outputs else None,
+        agent_pool,
+    )
 
 
-def get_task_cmd_args(name: str, pipeline: PipelineSpec) -> tuple[list[str], list[str]]:
+def get_task_cmd_args(
+    name: str, pipeline: PipelineSpec, scope: Scope = ROOT_SCOPE
+) -> tuple[list[str], list[str]]:
     """Return the container command and args for a stage."""
-    executor_name = f"exec-{name}"
-    executors = pipeline.deployment_spec.fields["executors"].struct_value.fields
-    if executor_name not in executors:
+    index = get_index(pipeline)
+    executor_label = index.dags[scope.dag].task_executors.get(name)
+    if executor_label not in index.executors:
         raise ValueError(f"{name} not found in pipeline")
-    task = (
-        executors[f"exec-{name}"].struct_value.fields["container"].struct_value.fields
-    )
-    cmd = [cmd for cmd in task["command"].list_value]
-    args = [arg for arg in task["args"].list_value]
-    return cmd, args
+    cmd, args = index.executors[executor_label]
+    return list(cmd), list(args)
+
+
+def get_task_resources(
+    name: str, pipeline: PipelineSpec, scope: Scope = ROOT_SCOPE
+) -> TaskResources:
+    """Return the CPUs and memory requested by a stage, and its limits."""
+    index = get_index(pipeline)
+    executor_label = index.dags[scope.dag].task_executors.get(name)
+    return parse_resources(index.resources.get(executor_label or "", {}))
+
+
+def _to_python(value: Any) -> Any:
+    """Convert nested protobuf Struct and ListValue messages into dicts and lists."""
+    if isinstance(value, Struct):
+        return {k: _to_python(v) for k, v in value.items()}
+    elif isinstance(value, ListValue):
+        return [_to_python(e) for e in value]
+    else:
+        return value
 
 
 def _extract_value(param_obj: _HasTypeValueAttr, param_type: int) -> _ParamType:
@@ -79,21 +200,55 @@ def _extract_value(param_obj: _HasTypeValueAttr, param_type: int) -> _ParamType:
     elif param_type == STRING:
         return str(param_obj.string_value)
     elif param_type == LIST:
-        return [e for e in param_obj.list_value]
+        return [_to_python(e) for e in param_obj.list_value]
     elif param_type == STRUCT:
-        return dict(param_obj.struct_value)
+        return {k: _to_python(v) for k, v in dict(param_obj.struct_value).items()}
     else:
         raise RuntimeError("parameter has an unknown type.")
 
 
+def _read_output_metadata(
+    task_key: str, run_dir: str, outputs: dict[str, dict[str, Any]] | None = None
+) -> dict[str, Any]:
+    """Read a task's output_metadata.json file, unless its outputs are in outputs.
+
+    Files that are read are added to outputs, so that each file is only read and
+    parsed once - however many downstream tasks consume its outputs.
+    """
+    if outputs is not None and task_key in outputs:
+        return outputs[task_key]
+    output_metadata_file = Path.cwd() / run_dir / task_key / OUTPUT_METADATA_FILE
+    if not output_metadata_file.exists():
+        raise FileNotFoundError(f"couldn't find {output_metadata_file}")
+    with open(output_metadata_file, "rb") as file:
+        output_metadata = json.load(file)
+    if outputs is not None:
+        outputs[task_key] = output_metadata
+    return output_metadata
+
+
+def _ingest_outputs(
+    task_key: str, run_dir: str, outputs: dict[str, dict[str, Any]]
+) -> None:
+    """Read the outputs of a task that has completed into outputs, for downstream.
+
+    Outputs are replaced, in case they were read from a previous attempt.
+    """
+    outputs.pop(task_key, None)
+    try:
+        _read_output_metadata(task_key, run_dir, outputs)
+    except FileNotFoundError:
+        pass
+
+
 def _get_param_value_from_metadata_file(
-    task_name: str, output_key: str = "Output"
+    task_name: str,
+    output_key: str = "Output",
+    run_dir: str | None = None,
+    outputs: dict[str, dict[str, Any]] | None = None,
 ) -> _ParamType:
     """Get output parameter from output_metadata.json file."""
-    output_metadata_file = Path.cwd() / LOCAL_FOLDER / task_name / OUTPUT_METADATA_FILE
-    if not output_metadata_file.exists():
-        raise FileNotFoundError(f"couldn't find {output_metadata_file}")
-    output_metadata = json.loads(output_metadata_file.read_text())
+    output_metadata = _read_output_metadata(task_name, run_dir or LOCAL_FOLDER, outputs)
     try:
         output_value = output_metadata["parameterValues"][output_key]
     except KeyError:
@@ -105,66 +260,298 @@ def _get_param_value_from_pipeline_inputs(
     pipeline: PipelineSpec, param_name: str
 ) -> _ParamType:
     """Get pipeline input."""
-    pipeline_inputs = pipeline.root.input_definitions.parameters
-    param = pipeline_inputs[param_name]
-    if str(param) == "":
+    param = get_index(pipeline).pipeline_inputs.get(param_name)
+    if param is None:
         raise RuntimeError("couldn't find parameter in pipeline inputs")
+    if param.default_value is None:
+        raise RuntimeError(f"missing required pipeline inputs: {param_name}")
     return _extract_value(param.default_value, param.parameter_type)
 
 
+def _get_param_value_from_scope(scope: Scope, param_name: str) -> _ParamType:
+    """Get input parameter passed to a sub-DAG."""
+    if param_name not in scope.parameters:
+        raise RuntimeError(f"couldn't find parameter {param_name} in {scope.path}")
+    return scope.parameters[param_name]
+
+
 def _get_param_value(
-    pipeline: PipelineSpec, task_name: str, param_name: str
+    pipeline: PipelineSpec,
+    task_name: str,
+    param_name: str,
+    run_dir: str | None = None,
+    scope: Scope = ROOT_SCOPE,
+    outputs: dict[str, dict[str, Any]] | None = None,
 ) -> _ParamType:
     """Find parameter value for a task."""
-    component_name = f"comp-{task_name}"
-    component = pipeline.components[component_name]
-    task = pipeline.root.dag.tasks[task_name]
-    if str(component) == "" or str(task) == "":
+    dag = get_index(pipeline).dags[scope.dag]
+    if task_name not in dag.task_components:
         raise RuntimeError(f"{task_name} is not a task in the pipeline specification")
 
-    param_type = component.input_definitions.parameters[param_name].parameter_type
-    param = task.inputs.parameters[param_name]
-    if str(param_type) == "" or str(param) == "":
+    input_param = dag.input_params[task_name].get(param_name)
+    param = dag.tasks[task_name].inputs.parameters.get(param_name)
+    if input_param is None or (param is None and input_param.default_value is None):
         raise RuntimeError(f"Cannot find param={param_name} in task={task_name}")
+    param_type = input_param.parameter_type
 
-    if str(param.runtime_value):
+    param_kind = param.WhichOneof("kind") if param is not None else None
+    value: _ParamType
+    if param is None:
+        return _extract_value(input_param.default_value, param_type)
+    elif param_kind == "runtime_value":
         return _extract_value(param.runtime_value.constant, param_type)
-    elif str(param.task_output_parameter):
-        return _get_param_value_from_metadata_file(
-            param.task_output_parameter.producer_task,
+    elif param_kind == "task_output_parameter":
+        value = _get_param_value_from_metadata_file(
+            scope.task_key(param.task_output_parameter.producer_task),
             param.task_output_parameter.output_parameter_key,
+            run_dir,
+            outputs,
         )
-    elif str(param.component_input_parameter):
-        return _get_param_value_from_pipeline_inputs(
+    elif param_kind == "component_input_parameter" and (
+        scope.dag != ROOT_DAG or param.component_input_parameter in scope.parameters
+    ):
+        value = _get_param_value_from_scope(scope, param.component_input_parameter)
+    elif param_kind == "component_input_parameter":
+        value = _get_param_value_from_pipeline_inputs(
             pipeline, param.component_input_parameter
         )
     else:
-        if str(component.input_definitions.parameters[param_name].default_value):
-            param = component.input_definitions.parameters[param_name]
-            return _extract_value(param.default_value, param_type)
+        if input_param.default_value is not None:
+            return _extract_value(input_param.default_value, param_type)
         raise RuntimeError(f"Unsupported parameter type in task {task_name}")
 
+    if param.parameter_expression_selector and isinstance(value, Placeholder):
+        value = Placeholder(value)  # the type of the selected field isn't known
+    elif param.parameter_expression_selector:
+        value = apply_selector(value, param.parameter_expression_selector)
+    return value
+
+
+def _get_output_artifacts(
+    pipeline: PipelineSpec,
+    task_name: str,
+    output_key: str,
+    run_dir: str,
+    scope: Scope = ROOT_SCOPE,
+    outputs: dict[str, dict[str, Any]] | None = None,
+) -> list[dict[str, Any]]:
+    """Get the output artifacts produced by a task.
+
+    Artifacts produced by sub-DAGs (e.g. collected from all the iterations of a
+    loop) are read from the sub-DAG's output_metadata.json file. Metadata that tasks
+    record for their output artifacts is passed on with them.
+    """
+    task_key = scope.task_key(task_name)
+    if task_name not in get_index(pipeline).dags[scope.dag].sub_dags:
+        artifact: dict[str, Any] = {"uri": f"gs://{run_dir}/{task_key}/{output_key}"}
+        try:
+            output_metadata = _read_output_metadata(task_key, run_dir, outputs)
+            produced = output_metadata["artifacts"][output_key]["artifacts"][0]
+            if produced.get("metadata"):
+                artifact["metadata"] = produced["metadata"]
+        except (FileNotFoundError, KeyError, IndexError):
+            pass
+        return [artifact]
+    output_metadata = _read_output_metadata(task_key, run_dir, outputs)
+    try:
+        return output_metadata["artifacts"][output_key]["artifacts"]
+    except KeyError:
+        raise RuntimeError(f"couldn't find artifact output for task={task_name}")
+
+
+def _get_input_artifacts(
+    pipeline: PipelineSpec,
+    task_name: str,
+    artifact_name: str,
+    run_dir: str,
+    scope: Scope = ROOT_SCOPE,
+    outputs: dict[str, dict[str, Any]] | None = None,
+) -> list[dict[str, Any]]:
+    """Find the artifacts passed to a task as one of its inputs."""
+    task = get_index(pipeline).dags[scope.dag].tasks[task_name]
+    artifact = task.inputs.artifacts[artifact_name]
+    artifact_kind = artifact.WhichOneof("kind")
+    if artifact_kind == "task_output_artifact":
+        producer = artifact.task_output_artifact
+        return _get_output_artifacts(
+            pipeline,
+            producer.producer_task,
+            producer.output_artifact_key,
+            run_dir,
+            scope,
+            outputs,
+        )
+    elif artifact_kind == "component_input_artifact" and scope.dag != ROOT_DAG:
+        if artifact.component_input_artifact not in scope.artifacts:
+            msg = f"couldn't find artifact {artifact.component_input_artifact}"
+            raise RuntimeError(f"{msg} in {scope.path}")
+        return scope.artifacts[artifact.component_input_artifact]
+    else:
+        msg = f"Unsupported artifact input={artifact_name} in task {task_name}"
+        raise RuntimeError(msg)
+
+
+def _get_sub_dag_inputs(
+    pipeline: PipelineSpec,
+    task_name: str,
+    run_dir: str,
+    scope: Scope = ROOT_SCOPE,
+    outputs: dict[str, dict[str, Any]] | None = None,
+) -> tuple[dict[str, Any], dict[str, list[dict[str, Any]]]]:
+    """Find the parameters and artifacts that a task passes to its sub-DAG."""
+    task = get_index(pipeline).dags[scope.dag].tasks[task_name]
+    parameters = {
+        param: _get_param_value(pipeline, task_name, param, run_dir, scope, outputs)
+        for param in task.inputs.parameters
+    }
+    artifacts = {
+        artifact: _get_input_artifacts(
+            pipeline, task_name, artifact, run_dir, scope, outputs
+        )
+        for artifact in task.inputs.artifacts
+    }
+    return parameters, artifacts
+
 
-def _get_func_args(pipeline: PipelineSpec, task_name: str) -> str:
-    """Extract step args from pipeline config."""
-    component_name = f"comp-{task_name}"
-    component = pipeline.components[component_name]
+def _get_sub_dag_outputs(
+    pipeline: PipelineSpec,
+    task_name: str,
+    run_dir: str,
+    scope: Scope,
+    sub_scopes: list[Scope],
+    is_loop: bool,
+    outputs: dict[str, dict[str, Any]] | None = None,
+) -> dict[str, Any]:
+    """Collect the outputs of a sub-DAG into output metadata for the task running it.
+
+    The outputs of loops are collected from every iteration, so that parameters
+    become lists of values and artifacts become lists of artifacts. Outputs selected
+    from one of several conditional branches (i.e. dsl.OneOf) are taken from the
+    branch that ran.
+    """
+    component = get_index(pipeline).dags[scope.dag].task_components[task_name]
+    dag_outputs = component.dag.outputs
+
+    def ran(sub_scope: Scope, producer: str) -> bool:
+        key = sub_scope.task_key(producer)
+        output_metadata_file = Path.cwd() / run_dir / key / OUTPUT_METADATA_FILE
+        return (outputs is not None and key in outputs) or output_metadata_file.exists()
+
+    parameters: dict[str, Any] = {}
+    for key, output in dag_outputs.parameters.items():
+        output_kind = output.WhichOneof("kind")
+        if output_kind == "value_from_parameter":
+            selectors = [output.value_from_parameter]
+        elif output_kind == "value_from_oneof":
+            selectors = list(output.value_from_oneof.parameter_selectors)
+        else:
+            raise RuntimeError(f"Unsupported output={key} in task {task_name}")
+        values = []
+        for sub_scope in sub_scopes:
+            selector = next(
+                (s for s in selectors if ran(sub_scope, s.producer_subtask)),
+                selectors[0],
+            )
+            values.append(
+                _get_param_value_from_metadata_file(
+                    sub_scope.task_key(selector.producer_subtask),
+                    selector.output_parameter_key,
+                    run_dir,
+                    outputs,
+                )
+            )
+        parameters[key] = values if is_loop else values[0]
+
+    artifacts: dict[str, Any] = {}
+    for key, output in dag_outputs.artifacts.items():
+        oneof = len(output.artifact_selectors) > 1 and not is_loop
+        artifacts[key] = {
+            "artifacts": [
+                artifact
+                for sub_scope in sub_scopes
+                for selector in output.artifact_selectors
+                if not oneof or ran(sub_scope, selector.producer_subtask)
+                for artifact in _get_output_artifacts(
+                    pipeline,
+                    selector.producer_subtask,
+                    selector.output_artifact_key,
+                    run_dir,
+                    sub_scope,
+                    outputs,
+                )
+            ]
+        }
+    return {"parameterValues": parameters, "artifacts": artifacts}
+
+
+def _write_sub_dag_outputs(
+    pipeline: PipelineSpec,
+    task_name: str,
+    run_dir: str,
+    scope: Scope,
+    sub_scopes: list[Scope],
+    is_loop: bool,
+    outputs: dict[str, dict[str, Any]] | None = None,
+) -> None:
+    """Write the outputs of a sub-DAG to {run_dir}/{task_name}/output_metadata.json.
+
+    The outputs are also added to outputs, when it's set.
+    """
+    output_metadata = _get_sub_dag_outputs(
+        pipeline, task_name, run_dir, scope, sub_scopes, is_loop, outputs
+    )
+    task_key = scope.task_key(task_name)
+    output_file = Path.cwd() / run_dir / task_key / OUTPUT_METADATA_FILE
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    output_file.write_text(json.dumps(output_metadata))
+    if outputs is not None:
+        outputs[task_key] = output_metadata
+
+
+def _get_func_args(
+    pipeline: PipelineSpec,
+    task_name: str,
+    run_dir: str | None = None,
+    scope: Scope = ROOT_SCOPE,
+    outputs: dict[str, dict[str, Any]] | None = None,
+) -> str:
+    """Extract step args from pipeline config.
+
+    All outputs are written to {run_dir}/{task_name} (or to the task's directory
+    within the scope of a sub-DAG), with input artifacts read from the directories
+    of the tasks that produced them - or from outputs, when planning a run, which
+    maps tasks onto their output metadata.
+    """
+    run_dir = run_dir or LOCAL_FOLDER
+    dag = get_index(pipeline).dags[scope.dag]
+    if task_name not in dag.task_components:
+        raise RuntimeError(f"{task_name} is not a task in the pipeline specification")
+    component = dag.task_components[task_name]
+    task_dir = scope.task_key(task_name)
     input_parameters = [param for param in component.input_definitions.parameters]
     input_artifacts = [artifact for artifact in component.input_definitions.artifacts]
     output_artifacts = [artifact for artifact in component.output_definitions.artifacts]
 
     input_params_spec: dict[str, Any] = {}
     for param in input_parameters:
-        input_params_spec[param] = _get_param_value(pipeline, task_name, param)
+        input_params_spec[param] = _get_param_value(
+            pipeline, task_name, param, run_dir, scope, outputs
+        )
 
     input_artifacts_spec: dict[str, Any] = {}
     for artifact in input_artifacts:
-        uri = f"gs://{LOCAL_FOLDER}/{artifact}"
-        input_artifacts_spec[artifact] = {"name": artifact, "artifacts": [{"uri": uri}]}
+        artifact_type = component.input_definitions.artifacts[artifact].artifact_type
+        artifacts = [
+            {**runtime_artifact, "type": {"schemaTitle": artifact_type.schema_title}}
+            for runtime_artifact in _get_input_artifacts(
+                pipeline, task_name, artifact, run_dir, scope, outputs
+            )
+        ]
+        input_artifacts_spec[artifact] = {"name": artifact, "artifacts": artifacts}
 
     output_artifacts_spec: dict[str, Any] = {}
     for artifact in output_artifacts:
-        uri = f"gs://{LOCAL_FOLDER}/{artifact}"
+        uri = f"gs://{run_dir}/{task_dir}/{artifact}"
         output_artifacts_spec[artifact] = {
             "artifacts": [{"name": artifact, "uri": uri}]
         }
@@ -176,104 +563,590 @@ def _get_func_args(pipeline: PipelineSpec, task_name: str) -> str:
         },
         "outputs": {
             "artifacts": output_artifacts_spec,
-            "outputFile": f"{LOCAL_FOLDER}/{task_name}/output_metadata.json",
+            "outputFile": f"{run_dir}/{task_dir}/{OUTPUT_METADATA_FILE}",
         },
     }
     return json.dumps(executor_args)
 
 
-def run_pipeline(
-    dag: list[str], compiled_pipeline: str = "pipeline.json", *, use_nox: bool = False
-) -> None:
-    """Run a compiled pipeline with default parameter values.
-
-    Args:
-    ----
-        dag: List of tasks to run in serial (seperate tasks with a black space).
-        compiled_pipeline: Compiled Kubeflow pipeline in JSON format. Defaults to
-            "pipeline.json".
-        use_nox: Use Nox for executing stages in isolated virtual environments. Defaults
-            to False.
+def _check_params(pipeline: PipelineSpec, params: dict[str, Any]) -> None:
+    """Check that params are defined by the pipeline, and include every required input.
 
-    Raises:
-    ------
-        RuntimeError: If using an unsupported schema pipeline schema version.
-        RuntimeError: If task not found in compiled pipeline JSON.
-        RuntimeError: If task execution fails.
+    Pipeline inputs without a default value are required, so must be in params.
     """
-    pipeline = load_pipeline_spec(compiled_pipeline)
+    pipeline_inputs = get_index(pipeline).pipeline_inputs
+    unknown_params = [name for name in params if name not in pipeline_inputs]
+    if unknown_params:
+        msg = f"unknown pipeline inputs: {', '.join(unknown_params)}"
+        raise RuntimeError(msg)
+    missing_params = [
+        name
+        for name, param in pipeline_inputs.items()
+        if param.default_value is None and name not in params
+    ]
+    if missing_params:
+        msg = f"missing required pipeline inputs: {', '.join(missing_params)}"
+        raise RuntimeError(msg)
+
+
+def _check_schema_version(pipeline: PipelineSpec) -> None:
+    """Check that a pipeline was compiled using a supported schema version."""
     if pipeline.schema_version != SCHEMA_VERSION:
         msg = (
             f"schema_version={pipeline.schema_version} not supported - please revert to"
             " schema_version={SCHEMA_VERSION} "
         )
         raise RuntimeError(msg)
-    missing_task_defs = [task for task in dag if task not in pipeline.root.dag.tasks]
+
+
+def _get_run_id(root: str, run_id: str | None, resume: bool) -> str:
+    """Get the ID of the run to execute tasks in - a new run, unless resuming."""
+    if resume:
+        run_id = run_id or latest_run(root)
+        if run_id is None:
+            raise RuntimeError(f"couldn't find a run to resume in {root}")
+    return run_id or new_run_id()
+
+
+def _tasks_to_run(
+    pipeline: PipelineSpec,
+    dag: list[str],
+    targets: list[str] | None,
+    manifest: RunManifest,
+    run_id: str,
+) -> list[str]:
+    """Find every task to run, checking that all of their upstream outputs will exist.
+
+    Targets are added together with the upstream tasks they need, excluding those
+    that have already produced outputs within the run.
+    """
+    index = get_index(pipeline)
+    requested_tasks = [*dag, *(targets or [])]
+    missing_task_defs = [task for task in requested_tasks if task not in index.tasks]
     if missing_task_defs:
         msg = f"missing task defs in pipeline spec: {', '.join(missing_task_defs)}"
         raise RuntimeError(msg)
-    shutil.rmtree(LOCAL_FOLDER, ignore_errors=True)
-    for task in dag:
+    if targets:
+        closure = upstream_closure(pipeline, targets, manifest.has_outputs)
+        dag = [*dag, *(task for task in closure if task not in dag)]
+    missing_upstream = {
+        dep
+        for task in dag
+        for dep in upstream_tasks(pipeline, task)
+        if dep not in dag and not manifest.has_outputs(dep)
+    }
+    if missing_upstream:
+        msg = (
+            f"upstream tasks have no outputs in run={run_id} and aren't being run: "
+            f"{', '.join(sorted(missing_upstream))} - add them or use --target"
+        )
+        raise RuntimeError(msg)
+    return dag
+
+
+def run_pipeline(
+    dag: list[str],
+    compiled_pipeline: str | PipelineSpec = "pipeline.json",
+    *,
+    use_nox: bool = False,
+    max_workers: int | None = None,
+    use_cache: bool = True,
+    cache_dir: str = CACHE_FOLDER,
+    use_warm_pool: bool = False,
+    root: str | None = None,
+    run_id: str | None = None,
+    keep_runs: int | None = DEFAULT_KEEP_RUNS,
+    resume: bool = False,
+    targets: list[str] | None = None,
+    params: dict[str, Any] | None = None,
+    pools: TaskPools | None = None,
+    history: str | None = HISTORY_FILE,
+    cpus: float | None = None,
+    memory: int | None = None,
+    agents: list[str] | None = None,
+    stream_artifacts: bool = False,
+    wheelhouse: str | None = None,
+) -> str:
+    """Run a compiled pipeline.
+
+    Tasks are scheduled using the dependencies recorded in the pipeline spec, with
+    every task launched as soon as all of its upstream tasks have completed and
+    there are enough CPUs and memory free for the resources its component requests
+    (e.g. with set_cpu_limit or set_memory_request). When tasks are waiting for
+    resources, those with the longest chains of tasks downstream are started first.
+    Tasks executed as processes (i.e. not on warm workers) are pinned to CPU cores
+    when they set a CPU limit, and have their memory limited when they set a memory
+    limit. Tasks can also be executed on other hosts, by agents started with
+    `kfpl agent` (see the agents module). All outputs are kept in a directory
+    dedicated to the run, {root}/{run_id}, with the outputs for each task in
+    {root}/{run_id}/{task}.
+
+    Once the run has finished, a summary of the time and resources used by each task
+    is printed together with the critical path through the DAG, and written to
+    {root}/{run_id}/timings.json and {root}/{run_id}/trace.json (a Chrome trace).
+    The run is also recorded in the history database, which outlives the run's
+    directory.
+
+    Args:
+    ----
+        dag: List of tasks to run (seperate tasks with a black space).
+        compiled_pipeline: Compiled Kubeflow pipeline in JSON format, or a pipeline
+            spec that has already been loaded. Defaults to "pipeline.json".
+        use_nox: Use Nox for executing stages in isolated virtual environments. Each
+            environment is built once and then reused by all tasks that need the
+            same packages. Defaults to False.
+        max_workers: Maximum number of tasks to execute concurrently. Defaults to the
+            number of CPUs on the machine.
+        use_cache: Restore the outputs of tasks with caching enabled from the local
+            cache, if the same task has already been run with the same inputs.
+            Defaults to True.
+        cache_dir: Cache directory. Defaults to ".kfp-local-cache".
+        use_warm_pool: Execute Python function components on a pool of long-lived
+            worker processes that already have kfp imported, instead of starting a
+            new interpreter for every task. Components must only use packages that
+            are already installed. Defaults to False.
+        root: Directory in which to store the outputs of all runs. Defaults to
+            "object-storage-bucket".
+        run_id: ID of the run, which can be used to run tasks within an existing run
+            (e.g. to reuse outputs from upstream tasks). Defaults to a new run ID.
+        keep_runs: Number of finished runs to keep, with older runs deleted once this
+            run has finished. Set to None to keep all runs. Defaults to 10.
+        resume: Resume an existing run (run_id, or the most recent run if run_id is
+            not set), skipping all tasks that have already succeeded with the same
+            inputs and whose outputs are still intact. Defaults to False.
+        targets: Tasks to run together with all of the upstream tasks they need,
+            excluding upstream tasks that have already produced outputs within the
+            run. Defaults to None.
+        params: Values for pipeline inputs, overriding their defaults. Defaults to
+            None.
+        pools: Resources for executing tasks, to share with other runs - e.g. when
+            sweeping over pipeline inputs. Defaults to resources dedicated to this
+            run, created using max_workers and use_warm_pool.
+        history: Database in which to record the run, its tasks and their metrics.
+            Set to None to not record the run. Defaults to ".kfp-local-history.db".
+        cpus: CPUs to pack tasks onto. Defaults to all the cores available.
+        memory: Memory (in bytes) to pack tasks into. Defaults to the host's
+            physical memory.
+        agents: Addresses (HOST:PORT) of agents to execute tasks on, instead of
+            executing them on this host. Defaults to None.
+        stream_artifacts: Send artifacts to and from agents, instead of reading and
+            writing them on a filesystem shared with the agents. Defaults to False.
+        wheelhouse: Directory of wheels built by `kfpl prefetch`, to install the
+            packages that tasks need from, without using a package index. Defaults
+            to None.
+
+    Returns:
+    -------
+        The run ID.
+
+    Raises:
+    ------
+        ValueError: If use_nox and use_warm_pool are both set.
+        ValueError: If agents are used together with use_nox or use_warm_pool.
+        RuntimeError: If an agent can't be reached.
+        RuntimeError: If using an unsupported schema pipeline schema version.
+        RuntimeError: If task not found in compiled pipeline JSON.
+        RuntimeError: If params includes inputs that aren't defined by the pipeline.
+        RuntimeError: If a task depends on outputs that won't be available.
+        RuntimeError: If resuming and there are no runs to resume.
+        RuntimeError: If task execution fails.
+    """
+    if use_nox and use_warm_pool:
+        raise ValueError("use_nox and use_warm_pool can't be used together")
+    if agents and (use_nox or use_warm_pool):
+        raise ValueError("agents can't be used with use_nox or use_warm_pool")
+    if isinstance(compiled_pipeline, PipelineSpec):
+        pipeline = compiled_pipeline
+    else:
+        pipeline = load_pipeline_spec(compiled_pipeline)
+    _check_schema_version(pipeline)
+    _check_params(pipeline, params or {})
+    index = get_index(pipeline)
+    root_scope = Scope(ROOT_DAG, "", dict(params or {}), {})
+    root = root or LOCAL_FOLDER
+    run_id = _get_run_id(root, run_id, resume)
+    manifest = RunManifest(Path(root) / run_id)
+    dag = _tasks_to_run(pipeline, dag, targets, manifest, run_id)
+    run_path = create_run(root, run_id, pipeline.pipeline_info.name, params)
+    run_dir = str(run_path)
+    print(f"run_id={run_id}")
+
+    owns_pools = pools is None
+    pools = pools or task_pools(
+        max_workers,
+        use_warm_pool,
+        cpus=cpus,
+        memory=memory,
+        agents=agents,
+        stream_artifacts=stream_artifacts,
+        wheelhouse=wheelhouse,
+    )
+    env_pool, warm_pool, in_flight = pools.env_pool, pools.warm_pool, pools.in_flight
+    agent_pool = pools.agent_pool
+    records: dict[str, TaskRecord] = {}
+    # outputs of every task, read once when it completes and shared by all consumers
+    outputs: dict[str, dict[str, Any]] = {}
+    executor_inputs: dict[str, str] = {}
+
+    def run_task(task: str, scope: Scope, priority: int = 0) -> None:
+        if task in index.dags[scope.dag].sub_dags:
+            run_sub_dag(task, scope, priority)
+            return
+        key = scope.task_key(task)
+        ready = time.time()
+        resources = get_task_resources(task, pipeline, scope)
+        start = ready
+        status = PENDING
+        setup: list[ProcessUsage] = []
+        usage: list[ProcessUsage] = []
+        fingerprint = None
+        leads_flight = False
         try:
-            cmd, args = get_task_cmd_args(task, pipeline)
-            args[1] = _get_func_args(pipeline, task)
-            if use_nox:
-                noxfile_path = files("kfp_local") / "kfp_noxfile.py"
-                noxfile_path = cast(Path, noxfile_path)  # stop mypy error (likely bug)
-                subprocess.run(
-                    [
-                        "nox",
-                        "-s",
-                        "run_pipeline_task",
-                        "-f",
-                        noxfile_path,
-                        "--envdir",
-                        f"{os.getcwd()}/.nox",
-                        "--",
-                        *(cmd + args),
-                    ]
-                )
+            cmd, args = get_task_cmd_args(task, pipeline, scope)
+            executor_input = _get_func_args(pipeline, task, run_dir, scope, outputs)
+            executor_inputs[key] = executor_input
+            fingerprint = task_fingerprint(cmd, args, executor_input)
+            if resume and manifest.is_valid(key, fingerprint):
+                print(f"task={key} skipped - outputs from previous attempt are valid")
+                status = "skipped"
+                _ingest_outputs(key, run_dir, outputs)
+                return
+            manifest.record(key, RUNNING, fingerprint)
+
+            task_spec = index.dags[scope.dag].tasks[task]
+            use_task_cache = use_cache and task_spec.caching_options.enable_cache
+            flight = None
+            # tasks are claimed before reserving a slot, so that tasks waiting on an
+            # identical task in another run of a sweep never hold one
+            if in_flight and use_task_cache:
+                flight = in_flight.claim(fingerprint)
+                leads_flight = flight is None
+            if flight is not None:
+                source_run_id, source_input = flight.result()
+                copy_task_outputs(source_input, executor_input)
+                print(f"task={key} outputs shared from run={source_run_id}")
+                status = "shared"
+            elif use_task_cache and restore_from_cache(
+                fingerprint, executor_input, cache_dir
+            ):
+                print(f"task={key} outputs restored from cache")
+                status = "cached"
             else:
-                kfp_module = files("kfp.dsl.types") / "artifact_types.py"
-                kfp_module = cast(Path, kfp_module)  # stop mypy error (likely bug)
-                subprocess.run(["sed", "-i.bak", r"s/\/gcs\///", kfp_module])
-                subprocess.run(cmd + args)
+                with pools.slots.reserve(resources, priority) as limits:
+                    start = time.time()
+                    input_file = run_path / EXECUTOR_INPUTS_FOLDER / f"{key}.json"
+                    args[1] = executor_input_arg(executor_input, input_file)
+                    clear_outputs(executor_input)
+                    inputs_before = snapshot(input_paths(executor_input))
+                    log_file = run_path / LOGS_FOLDER / f"{key}.log"
+                    with TaskLog(key, log_file) as log:
+                        if use_nox:
+                            setup_start = time.perf_counter()
+                            env_pool.ensure(parse_packages(cmd), log)
+                            setup_time = time.perf_counter() - setup_start
+                            setup.append(ProcessUsage(0, setup_time, 0.0, 0.0, 0))
+                            nox_cmd = env_pool.task_command(cmd, args)
+                            usage.append(run_process(nox_cmd, task_env(), log, limits))
+                        elif agent_pool:
+                            task_args = cmd + args
+                            usage.append(
+                                agent_pool.run(
+                                    task_args, executor_input, log, resources
+                                )
+                            )
+                        elif warm_pool and parse_component(cmd, args):
+                            run_start = time.perf_counter()
+                            result = warm_pool.run(cmd, args, executor_input)
+                            run_time = time.perf_counter() - run_start
+                            log.write(result.stdout, sys.stdout)
+                            log.write(result.stderr, sys.stderr)
+                            usage.append(
+                                ProcessUsage(
+                                    result.exit_code,
+                                    run_time,
+                                    result.user_time,
+                                    result.sys_time,
+                                    result.max_rss,
+                                )
+                            )
+                        else:
+                            preamble, task_cmd = split_pip_preamble(cmd)
+                            installed = None
+                            if preamble is not None:
+                                installed = env_pool.install_preamble(preamble, log)
+                            if installed is not None:
+                                setup.append(installed)
+                                if setup[-1].exit_code != 0:
+                                    exit_code = setup[-1].exit_code
+                                    msg = f"pip install exit code {exit_code}"
+                                    raise RuntimeError(msg)
+                            task_args = task_cmd + args
+                            usage.append(
+                                run_process(task_args, task_env(), log, limits)
+                            )
+                    if usage[-1].exit_code != 0:
+                        raise RuntimeError(f"exit code {usage[-1].exit_code}")
+                    modified_inputs = modified_files(inputs_before)
+                    if modified_inputs:
+                        paths = ", ".join(str(path) for path in modified_inputs)
+                        raise RuntimeError(
+                            f"input artifacts modified in place: {paths}"
+                        )
+                    if use_task_cache:
+                        store_in_cache(fingerprint, executor_input, cache_dir)
+                    status = SUCCEEDED
+            if in_flight and leads_flight and fingerprint is not None:
+                in_flight.complete(fingerprint, (run_id, executor_input))
+                leads_flight = False
+            _ingest_outputs(key, run_dir, outputs)
+            manifest.record(key, SUCCEEDED, fingerprint, executor_input)
         except Exception as e:
-            raise RuntimeError(f"task={task} failed to execute - {e}")
+            status = FAILED
+            manifest.record(key, FAILED, fingerprint)
+            if in_flight and leads_flight and fingerprint is not None:
+                in_flight.fail(fingerprint, e)
+            raise RuntimeError(f"task={key} failed to execute - {e}")
+        finally:
+            end = time.time()
+            records[key] = task_record(key, status, ready, start, end, setup, usage)
 
+    def run_sub_dag(task: str, scope: Scope, priority: int) -> None:
+        key = scope.task_key(task)
+        start = time.time()
+        status = PENDING
+        try:
+            manifest.record(key, RUNNING)
+            parameters, artifacts = _get_sub_dag_inputs(
+                pipeline, task, run_dir, scope, outputs
+            )
+            task_spec = index.dags[scope.dag].tasks[task]
+            condition = task_spec.trigger_policy.condition
+            if condition and not evaluate_condition(condition, parameters):
+                print(f"task={key} pruned - condition is false: {condition}")
+                (run_path / key / OUTPUT_METADATA_FILE).unlink(missing_ok=True)
+                outputs.pop(key, None)
+                manifest.record(key, PRUNED)
+                status = PRUNED
+                return
+            sub_dag = index.dags[scope.dag].sub_dags[task]
+            sub_scopes = expand_dag_task(task_spec, key, sub_dag, parameters, artifacts)
+            sub_graph = build_task_graph(pipeline, index.dags[sub_dag].tasks, sub_dag)
 
-def _cli() -> None:
-    """Entrypoint for use on the CLI."""
-    parser = argparse.ArgumentParser(
-        description="Run Kubeflow Pipeline stages locally."
-    )
-    parser.add_argument(
-        "tasks",
-        nargs="+",
-        type=str,
-        help="task to run (in order)",
-    )
-    parser.add_argument(
-        "--pipeline",
-        type=str,
-        required=True,
-        help="path to compiled pipeline in JSON format",
-    )
-    parser.add_argument(
-        "--nox",
-        action="store_true",
-        default=False,
-        required=False,
-        help="use Nox for environment isolation",
+            # the tasks downstream of the sub-DAG also wait on the tasks within it
+            depths = downstream_depths(sub_graph)
+
+            def run_sub_scope(n: str) -> None:
+                sub_scope = sub_scopes[int(n)]
+                run_dag(
+                    sub_graph,
+                    lambda t: run_task(t, sub_scope, priority - 1 + depths[t]),
+                    len(sub_graph) or None,
+                )
+
+            # without a parallelism limit, every iteration is launched at once and
+            # the pool's slots limit how many of their tasks execute concurrently
+            run_dag(
+                {str(n): set() for n in range(len(sub_scopes))},
+                run_sub_scope,
+                task_spec.iterator_policy.parallelism_limit or len(sub_scopes) or None,
+            )
+            is_loop = task_spec.HasField("parameter_iterator")
+            _write_sub_dag_outputs(
+                pipeline, task, run_dir, scope, sub_scopes, is_loop, outputs
+            )
+            manifest.record(key, SUCCEEDED)
+            status = SUCCEEDED
+        except Exception as e:
+            status = FAILED
+            manifest.record(key, FAILED)
+            raise RuntimeError(f"task={key} failed to execute - {e}")
+        finally:
+            records[key] = task_record(key, status, start, start, time.time())
+
+    graph = build_task_graph(pipeline, dag)
+    depths = downstream_depths(graph)
+    run_status = "failed"
+    try:
+        run_dag(
+            graph,
+            lambda task: run_task(task, root_scope, depths[task]),
+            len(graph) or None,
+        )
+        run_status = "succeeded"
+    finally:
+        set_run_status(run_path, run_status)
+        if warm_pool and owns_pools:
+            warm_pool.shutdown()
+        if records:
+            path = critical_path(graph, records)
+            print(format_summary(records.values(), path))
+            write_timings(run_path, records.values(), path)
+            write_trace(run_path, records.values())
+        if history:
+            # history is best-effort, so failing to record a run never fails it
+            try:
+                record_run(
+                    run_id,
+                    pipeline.pipeline_info.name,
+                    root,
+                    run_status,
+                    params or {},
+                    records.values(),
+                    manifest.tasks,
+                    executor_inputs,
+                    history,
+                )
+            except (sqlite3.Error, OSError) as e:
+                print(f"WARNING: run_id={run_id} not recorded in history - {e}")
+        if keep_runs is not None:
+            gc_runs(root, keep_runs)
+    if use_cache:
+        prune_cache(cache_dir)
+    return run_id
+
+
+def run_sweep(
+    dag: list[str],
+    compiled_pipeline: str | PipelineSpec,
+    param_sets: list[dict[str, Any]],
+    *,
+    use_nox: bool = False,
+    max_workers: int | None = None,
+    use_cache: bool = True,
+    cache_dir: str = CACHE_FOLDER,
+    use_warm_pool: bool = False,
+    root: str | None = None,
+    keep_runs: int | None = DEFAULT_KEEP_RUNS,
+    targets: list[str] | None = None,
+    history: str | None = HISTORY_FILE,
+    cpus: float | None = None,
+    memory: int | None = None,
+    agents: list[str] | None = None,
+    stream_artifacts: bool = False,
+    wheelhouse: str | None = None,
+) -> list[str]:
+    """Run a pipeline once for every set of values for its inputs.
+
+    The pipeline spec is loaded once and every set of inputs is executed as a
+    separate run, concurrently, with all runs sharing the same workers (so at most
+    max_workers tasks execute at once). Tasks with caching enabled whose resolved
+    inputs are identical across runs - e.g. upstream data preparation that doesn't
+    depend on any of the inputs being swept over - are executed once, with their
+    outputs copied into every other run, unless use_cache is False.
+
+    Args:
+    ----
+        dag: List of tasks to run.
+        compiled_pipeline: Compiled Kubeflow pipeline in JSON format, or a pipeline
+            spec that has already been loaded.
+        param_sets: Values for pipeline inputs to use for each run.
+        use_nox: Use Nox for executing stages in isolated virtual environments.
+            Defaults to False.
+        max_workers: Maximum number of tasks to execute concurrently, across all
+            runs. Defaults to the number of CPUs on the machine.
+        use_cache: Restore the outputs of tasks with caching enabled from the local
+            cache. Defaults to True.
+        cache_dir: Cache directory. Defaults to ".kfp-local-cache".
+        use_warm_pool: Execute Python function components on a pool of warm worker
+            processes. Defaults to False.
+        root: Directory in which to store the outputs of all runs. Defaults to
+            "object-storage-bucket".
+        keep_runs: Number of finished runs to keep, which is never less than the
+            number of runs in the sweep. Set to None to keep all runs. Defaults to
+            10.
+        targets: Tasks to run together with all of the upstream tasks they need.
+            Defaults to None.
+        history: Database in which to record the runs. Set to None to not record
+            them. Defaults to ".kfp-local-history.db".
+        cpus: CPUs to pack tasks onto, across all runs. Defaults to all the cores
+            available.
+        memory: Memory (in bytes) to pack tasks into, across all runs. Defaults to
+            the host's physical memory.
+        agents: Addresses (HOST:PORT) of agents to execute tasks on, across all
+            runs. Defaults to None.
+        stream_artifacts: Send artifacts to and from agents, instead of using a
+            filesystem shared with them. Defaults to False.
+        wheelhouse: Directory of wheels to install packages from, without using a
+            package index. Defaults to None.
+
+    Returns:
+    -------
+        The run IDs, in the same order as param_sets.
+
+    Raises:
+    ------
+        ValueError: If use_nox and use_warm_pool are both set.
+        ValueError: If agents are used together with use_nox or use_warm_pool.
+        RuntimeError: If param_sets includes inputs not defined by the pipeline.
+        RuntimeError: If any of the runs fail.
+    """
+    if use_nox and use_warm_pool:
+        raise ValueError("use_nox and use_warm_pool can't be used together")
+    if agents and (use_nox or use_warm_pool):
+        raise ValueError("agents can't be used with use_nox or use_warm_pool")
+    if isinstance(compiled_pipeline, PipelineSpec):
+        pipeline = compiled_pipeline
+    else:
+        pipeline = load_pipeline_spec(compiled_pipeline)
+    for params in param_sets:
+        _check_params(pipeline, params)
+    root = root or LOCAL_FOLDER
+    run_ids = [new_run_id() for _ in param_sets]
+    pools = task_pools(
+        max_workers,
+        use_warm_pool,
+        True,
+        cpus,
+        memory,
+        agents,
+        stream_artifacts,
+        wheelhouse,
     )
-    args = parser.parse_args()
+
+    def run(n: int) -> None:
+        run_pipeline(
+            dag,
+            pipeline,
+            use_nox=use_nox,
+            use_cache=use_cache,
+            cache_dir=cache_dir,
+            root=root,
+            run_id=run_ids[n],
+            keep_runs=None,
+            targets=targets,
+            params=param_sets[n],
+            pools=pools,
+            history=history,
+        )
+
+    max_runs = pools.slots.max_workers
     try:
-        run_pipeline(args.tasks, args.pipeline, use_nox=args.nox)
-        sys.exit(0)
-    except Exception as e:
-        e_msg = str(e)
-        print(f"ERROR: {e_msg[:1].lower() + e_msg[1:]}")
-        sys.exit(1)
+        with ThreadPoolExecutor(min(len(param_sets), max_runs) or 1) as executor:
+            futures = [executor.submit(run, n) for n in range(len(param_sets))]
+        errors = [future.exception() for future in futures]
+    finally:
+        if pools.warm_pool:
+            pools.warm_pool.shutdown()
+        if keep_runs is not None:
+            gc_runs(root, max(keep_runs, len(run_ids)))
+
+    print(f"sweep of {len(run_ids)} runs:")
+    for run_id, params, error in zip(run_ids, param_sets, errors):
+        status = "failed" if error else "succeeded"
+        print(f"{run_id}  {status:<9}  {json.dumps(params)}")
+    failed_runs = [run_id for run_id, error in zip(run_ids, errors) if error]
+    if failed_runs:
+        n_failed = len(failed_runs)
+        msg = f"{n_failed} of {len(run_ids)} runs failed: {', '.join(failed_runs)}"
+        raise RuntimeError(msg)
+    return run_ids
+
+
+def _cli() -> None:
+    """Entrypoint for `python -m kfp_local.pipelines`, which is the same as `kfpl`."""
+    from kfp_local.cli import main
+
+    main()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,415 @@
+"""Planning runs - resolving the inputs of every task without executing any of them."""
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from kfp.pipeline_spec.pipeline_spec_pb2 import ComponentSpec, PipelineSpec
+
+from kfp_local.cache import (
+    CACHE_FOLDER,
+    artifact_local_path,
+    cached_outputs,
+    output_paths,
+    task_fingerprint,
+)
+from kfp_local.conditions import condition_inputs, evaluate_condition
+from kfp_local.dags import Scope, expand_dag_task
+from kfp_local.environments import (
+    EnvironmentPool,
+    environment_key,
+    parse_packages,
+    split_pip_preamble,
+)
+from kfp_local.manifest import RunManifest
+from kfp_local.param_types import TYPE_NAMES, Placeholder, matches_type
+from kfp_local.pipelines import (
+    _check_params,
+    _check_schema_version,
+    _get_func_args,
+    _get_run_id,
+    _get_sub_dag_inputs,
+    _get_sub_dag_outputs,
+    _tasks_to_run,
+    get_task_cmd_args,
+)
+from kfp_local.runs import LOCAL_FOLDER
+from kfp_local.scheduler import build_task_graph, topological_order
+from kfp_local.spec import ROOT_DAG, get_index, load_pipeline_spec
+from kfp_local.workers import parse_component
+
+EXECUTE = "execute"
+RESTORE = "restore"
+SKIP = "skip"
+EXPAND = "expand"
+PRUNE = "prune"
+INVALID = "invalid"
+
+_PLACEHOLDER_PATTERN = re.compile(r"\{\{tasks\.[^{}]+\.outputs\.[^{}]+\}\}")
+
+
+class TaskPlan(NamedTuple):
+    """What will happen to a task instance when a run is executed.
+
+    Tasks are executed, restored from the cache, skipped (when resuming a run and
+    their outputs are still valid) or - for sub-DAGs - expanded into the tasks
+    within them, or pruned when their condition is false. Tasks whose inputs can't
+    be resolved are invalid.
+    """
+
+    task: str
+    action: str
+    cache: str
+    runner: str
+    wave: int
+    executor_input: str | None
+    problems: list[str]
+
+
+class RunPlan(NamedTuple):
+    """Every task instance in a run, in the order they will be scheduled."""
+
+    run_id: str
+    tasks: list[TaskPlan]
+    max_workers: int
+    environments: dict[str, list[str]]
+
+    @property
+    def problems(self) -> list[str]:
+        """All problems found with tasks, prefixed with the task."""
+        return [f"{t.task}: {problem}" for t in self.tasks for problem in t.problems]
+
+    def waves(self) -> list[list[str]]:
+        """Group the tasks that take up a worker into waves that can run at once."""
+        waves: list[list[str]] = []
+        for task in self.tasks:
+            if task.action in (EXECUTE, RESTORE):
+                waves.extend([] for _ in range(task.wave + 1 - len(waves)))
+                waves[task.wave].append(task.task)
+        return [wave for wave in waves if wave]
+
+    def to_dict(self) -> dict[str, Any]:
+        """Convert the plan into a dict that can be serialised to JSON."""
+        tasks = [
+            {
+                **task._asdict(),
+                "executor_input": json.loads(task.executor_input)
+                if task.executor_input
+                else None,
+            }
+            for task in self.tasks
+        ]
+        return {
+            "run_id": self.run_id,
+            "tasks": tasks,
+            "waves": self.waves(),
+            "max_workers": self.max_workers,
+            "environments": self.environments,
+            "problems": self.problems,
+        }
+
+
+def _placeholder_outputs(
+    component: ComponentSpec, task_key: str, placeholders: dict[str, Placeholder]
+) -> dict[str, Any]:
+    """Output metadata for a task that hasn't run, with placeholders for values."""
+
+    def placeholder(name: str, parameter_type: int = 0) -> Placeholder:
+        value = Placeholder(f"{{{{tasks.{task_key}.outputs.{name}}}}}", parameter_type)
+        placeholders[value] = value
+        return value
+
+    outputs = component.output_definitions
+    return {
+        "parameterValues": {
+            name: placeholder(name, param.parameter_type)
+            for name, param in outputs.parameters.items()
+        },
+        "artifacts": {
+            name: {"artifacts": [{"uri": placeholder(name)}]}
+            for name in outputs.artifacts
+        },
+    }
+
+
+def _type_problems(
+    component: ComponentSpec, executor_input: str, placeholders: dict[str, Placeholder]
+) -> list[str]:
+    """Check resolved parameter values against the component's input definitions."""
+    values = json.loads(executor_input)["inputs"]["parameterValues"]
+    problems = []
+    for name, param in component.input_definitions.parameters.items():
+        value = values.get(name)
+        if value is None and param.is_optional:
+            continue
+        if isinstance(value, str):
+            value = placeholders.get(value, value)
+        if not matches_type(value, param.parameter_type):
+            expected = TYPE_NAMES.get(param.parameter_type, "?")
+            if isinstance(value, Placeholder):
+                actual = TYPE_NAMES.get(value.parameter_type, "?")
+                problems.append(
+                    f"input {name} expects {expected}, got {actual} {value}"
+                )
+            else:
+                problems.append(f"input {name} expects {expected}, got {value!r}")
+    return problems
+
+
+def _with_cached_inputs(executor_input: str, cached_artifacts: dict[Path, Path]) -> str:
+    """Point input artifacts that would be restored from the cache at the cache."""
+    executor_args = json.loads(executor_input)
+    for artifact in executor_args["inputs"].get("artifacts", {}).values():
+        for instance in artifact["artifacts"]:
+            path = artifact_local_path(instance["uri"])
+            if path in cached_artifacts:
+                instance["uri"] = str(cached_artifacts[path])
+    return json.dumps(executor_args)
+
+
+def plan_pipeline(
+    dag: list[str],
+    compiled_pipeline: str | PipelineSpec = "pipeline.json",
+    *,
+    use_nox: bool = False,
+    max_workers: int | None = None,
+    use_cache: bool = True,
+    use_warm_pool: bool = False,
+    root: str | None = None,
+    run_id: str | None = None,
+    resume: bool = False,
+    targets: list[str] | None = None,
+    params: dict[str, Any] | None = None,
+    cache_dir: str = CACHE_FOLDER,
+) -> RunPlan:
+    """Plan a run of a compiled pipeline, without executing any tasks.
+
+    The executor input for every task is resolved, using placeholders in place of
+    outputs from upstream tasks that will be executed (and outputs restored from the
+    cache for those that won't), and checked against the types of the component's
+    inputs. Tasks are then checked for cache hits, which are only known for tasks
+    that don't depend on outputs that will be produced by the run. Loops are
+    expanded into their iterations, unless they iterate over outputs that will be
+    produced by the run, and conditional branches are pruned if their conditions
+    are false - those that depend on outputs that will be produced by the run are
+    planned as if they will run. Nothing is written to disk.
+
+    Args:
+    ----
+        dag: List of tasks to run.
+        compiled_pipeline: Compiled Kubeflow pipeline in JSON format, or a pipeline
+            spec that has already been loaded. Defaults to "pipeline.json".
+        use_nox: Plan to use Nox environments. Defaults to False.
+        max_workers: Maximum number of tasks to execute concurrently. Defaults to the
+            number of CPUs on the machine.
+        use_cache: Check for task outputs in the cache. Defaults to True.
+        use_warm_pool: Plan to use a warm worker pool. Defaults to False.
+        root: Directory in which runs are stored. Defaults to "object-storage-bucket".
+        run_id: ID of the run to plan tasks within. Defaults to a new run ID.
+        resume: Plan to resume an existing run. Defaults to False.
+        targets: Tasks to run together with all of the upstream tasks they need.
+            Defaults to None.
+        params: Values for pipeline inputs, overriding their defaults. Defaults to
+            None.
+        cache_dir: Cache directory. Defaults to ".kfp-local-cache".
+
+    Raises:
+    ------
+        ValueError: If use_nox and use_warm_pool are both set.
+        RuntimeError: If the run can't be planned - i.e. when `run_pipeline` would
+            fail before executing any tasks.
+    """
+    if use_nox and use_warm_pool:
+        raise ValueError("use_nox and use_warm_pool can't be used together")
+    if isinstance(compiled_pipeline, PipelineSpec):
+        pipeline = compiled_pipeline
+    else:
+        pipeline = load_pipeline_spec(compiled_pipeline)
+    _check_schema_version(pipeline)
+    _check_params(pipeline, params or {})
+    index = get_index(pipeline)
+    root = root or LOCAL_FOLDER
+    run_id = _get_run_id(root, run_id, resume)
+    run_dir = str(Path(root) / run_id)
+    manifest = RunManifest(Path(run_dir))
+    dag = _tasks_to_run(pipeline, dag, targets, manifest, run_id)
+
+    env_pool = EnvironmentPool()
+    environments: dict[str, list[str]] = {}
+    outputs: dict[str, dict[str, Any]] = {}
+    placeholders: dict[str, Placeholder] = {}
+    cached_artifacts: dict[Path, Path] = {}
+    pending: set[str] = set()
+    plans: list[TaskPlan] = []
+
+    def runner(cmd: list[str], args: list[str]) -> str:
+        if use_nox:
+            packages = parse_packages(cmd)
+            key = environment_key(packages)
+            if env_pool.is_ready(packages):
+                return f"nox {key}"
+            environments[key] = packages
+            return f"nox {key} (build)"
+        elif use_warm_pool and parse_component(cmd, args):
+            return "warm"
+        elif split_pip_preamble(cmd)[0] is not None:
+            return "subprocess (pip)"
+        else:
+            return "subprocess"
+
+    def plan_task(task: str, scope: Scope, wave: int, inputs_pending: bool) -> int:
+        key = scope.task_key(task)
+        dag_index = index.dags[scope.dag]
+        component = dag_index.task_components[task]
+        upstream = {scope.task_key(dep) for dep in dag_index.upstream.get(task, ())}
+        inputs_pending = inputs_pending or bool(upstream & pending)
+        if task in dag_index.sub_dags:
+            return plan_sub_dag(task, scope, wave, inputs_pending)
+
+        try:
+            cmd, args = get_task_cmd_args(task, pipeline, scope)
+            executor_input = _get_func_args(pipeline, task, run_dir, scope, outputs)
+        except Exception as e:
+            pending.add(key)
+            outputs[key] = _placeholder_outputs(component, key, placeholders)
+            plans.append(TaskPlan(key, INVALID, "-", "-", wave, None, [str(e)]))
+            return wave
+
+        problems = _type_problems(component, executor_input, placeholders)
+        fingerprint = None
+        if not inputs_pending and not _PLACEHOLDER_PATTERN.search(executor_input):
+            try:
+                fingerprint = task_fingerprint(
+                    cmd, args, _with_cached_inputs(executor_input, cached_artifacts)
+                )
+            except FileNotFoundError as e:
+                problems.append(str(e))
+
+        caching = use_cache and dag_index.tasks[task].caching_options.enable_cache
+        if resume and fingerprint and manifest.is_valid(key, fingerprint):
+            action, cache, task_runner = SKIP, "-", "-"
+        elif caching and fingerprint:
+            cached = cached_outputs(fingerprint, executor_input, cache_dir)
+            if cached is not None:
+                outputs[key] = cached
+                _, artifact_paths = output_paths(executor_input)
+                for name, path in artifact_paths.items():
+                    entry = Path(cache_dir) / fingerprint / "artifacts" / name
+                    cached_artifacts[path] = entry
+                action, cache, task_runner = RESTORE, "hit", "-"
+            else:
+                action, cache, task_runner = EXECUTE, "miss", runner(cmd, args)
+        else:
+            cache = "unknown" if caching else "off"
+            action, task_runner = EXECUTE, runner(cmd, args)
+        if action == EXECUTE:
+            pending.add(key)
+            outputs[key] = _placeholder_outputs(component, key, placeholders)
+        plans.append(
+            TaskPlan(key, action, cache, task_runner, wave, executor_input, problems)
+        )
+        return wave
+
+    def plan_sub_dag(task: str, scope: Scope, wave: int, inputs_pending: bool) -> int:
+        key = scope.task_key(task)
+        dag_index = index.dags[scope.dag]
+        component = dag_index.task_components[task]
+        task_spec = dag_index.tasks[task]
+        sub_dag = dag_index.sub_dags[task]
+        outputs[key] = _placeholder_outputs(component, key, placeholders)
+        try:
+            parameters, artifacts = _get_sub_dag_inputs(
+                pipeline, task, run_dir, scope, outputs
+            )
+            iterator = task_spec.parameter_iterator
+            items = parameters.get(iterator.items.input_parameter)
+            if isinstance(items, Placeholder):
+                pending.add(key)
+                plan = TaskPlan(key, EXPAND, "-", "iterations unknown", wave, None, [])
+                plans.append(plan)
+                return wave
+            sub_scopes = expand_dag_task(task_spec, key, sub_dag, parameters, artifacts)
+            condition = task_spec.trigger_policy.condition
+            condition_known = not any(
+                isinstance(parameters.get(name), Placeholder)
+                for name in condition_inputs(condition)
+            )
+            if condition and condition_known:
+                if not evaluate_condition(condition, parameters):
+                    del outputs[key]
+                    plan = TaskPlan(key, PRUNE, "-", "condition false", wave, None, [])
+                    plans.append(plan)
+                    return wave
+        except Exception as e:
+            pending.add(key)
+            plans.append(TaskPlan(key, INVALID, "-", "-", wave, None, [str(e)]))
+            return wave
+
+        n = len(sub_scopes)
+        details = f"{n} iterations" if task_spec.HasField("parameter_iterator") else ""
+        if condition:
+            details = "condition true" if condition_known else "condition unknown"
+        plans.append(TaskPlan(key, EXPAND, "-", details, wave, None, []))
+        sub_graph = build_task_graph(pipeline, index.dags[sub_dag].tasks, sub_dag)
+        last_wave = max(
+            [
+                plan_dag(sub_graph, sub_scope, wave, inputs_pending)
+                for sub_scope in sub_scopes
+            ],
+            default=wave,
+        )
+        if not condition_known or any(t.startswith(f"{key}/") for t in pending):
+            pending.add(key)
+        else:
+            is_loop = task_spec.HasField("parameter_iterator")
+            outputs[key] = _get_sub_dag_outputs(
+                pipeline, task, run_dir, scope, sub_scopes, is_loop, outputs
+            )
+        return last_wave
+
+    def plan_dag(
+        graph: dict[str, set[str]], scope: Scope, wave: int, inputs_pending: bool
+    ) -> int:
+        last_waves: dict[str, int] = {}
+        for task in topological_order(graph):
+            task_wave = max((last_waves[dep] + 1 for dep in graph[task]), default=wave)
+            last_waves[task] = plan_task(task, scope, task_wave, inputs_pending)
+        return max(last_waves.values(), default=wave)
+
+    root_scope = Scope(ROOT_DAG, "", dict(params or {}), {})
+    plan_dag(build_task_graph(pipeline, dag), root_scope, 0, False)
+    return RunPlan(run_id, plans, max_workers or os.cpu_count() or 1, environments)
+
+
+def format_plan(plan: RunPlan) -> str:
+    """Format a plan as a table of tasks, followed by the schedule and any problems."""
+    header = ["task", "action", "cache", "runner"]
+    rows = [[t.task, t.action, t.cache, t.runner] for t in plan.tasks]
+    widths = [max(len(row[n]) for row in [header, *rows]) for n in range(len(header))]
+    lines = [f"plan for run_id={plan.run_id}"]
+    for row in [header, *rows]:
+        lines.append("  ".join(cell.ljust(w) for cell, w in zip(row, widths)).rstrip())
+
+    counts = {
+        action: sum(t.action == action for t in plan.tasks)
+        for action in (EXECUTE, RESTORE, SKIP, PRUNE)
+    }
+    lines.append(
+        f"{counts[EXECUTE]} tasks to execute, {counts[RESTORE]} to restore from the "
+        f"cache, {counts[SKIP]} to skip, {counts[PRUNE]} branches to prune"
+    )
+    waves = plan.waves()
+    if waves:
+        lines.append(f"schedule (max_workers={plan.max_workers}):")
+        for n, wave in enumerate(waves, start=1):
+            lines.append(f"  {n}: {', '.join(wave)}")
+        concurrency = max(min(len(wave), plan.max_workers) for wave in waves)
+        lines.append(f"peak concurrency: {concurrency}")
+    for key, packages in plan.environments.items():
+        lines.append(f"environment to build: {key} ({' '.join(packages) or 'kfp'})")
+    problems = plan.problems
+    if problems:
+        lines.append(f"{len(problems)} problems:")
+        lines += [f"  {problem}" for problem in problems]
+    return "\n".join(lines)
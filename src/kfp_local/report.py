@@ -0,0 +1,207 @@
+"""Per-task timing and resource usage reports for runs."""
+import json
+from collections.abc import Iterable
+from pathlib import Path
+from typing import NamedTuple
+
+from kfp_local.launcher import ProcessUsage
+from kfp_local.scheduler import TaskGraph, topological_order
+
+TIMINGS_FILE = "timings.json"
+TRACE_FILE = "trace.json"
+
+
+class TaskRecord(NamedTuple):
+    """Timings and resource usage of a task within a run.
+
+    Timestamps (ready, start and end) are seconds since the epoch. Setup time covers
+    the pip preamble (or building the task's environment when using Nox), while run
+    time covers executing the component itself. CPU times and peak RSS cover both.
+    """
+
+    task: str
+    status: str
+    exit_code: int | None
+    ready: float
+    start: float
+    end: float
+    setup_time: float
+    run_time: float
+    user_time: float
+    sys_time: float
+    max_rss: int
+
+    @property
+    def queue_time(self) -> float:
+        """Time spent waiting for a free worker after upstream tasks had finished."""
+        return self.start - self.ready
+
+    @property
+    def duration(self) -> float:
+        """Time from the task starting to it finishing."""
+        return self.end - self.start
+
+
+def task_record(
+    task: str,
+    status: str,
+    ready: float,
+    start: float,
+    end: float,
+    setup: Iterable[ProcessUsage] = (),
+    run: Iterable[ProcessUsage] = (),
+) -> TaskRecord:
+    """Combine the usage of all the processes launched by a task into one record."""
+    setup, run = list(setup), list(run)
+    processes = [*setup, *run]
+    return TaskRecord(
+        task,
+        status,
+        processes[-1].exit_code if processes else None,
+        ready,
+        start,
+        end,
+        sum(p.wall_time for p in setup),
+        sum(p.wall_time for p in run),
+        sum(p.user_time for p in processes),
+        sum(p.sys_time for p in processes),
+        max((p.max_rss for p in processes), default=0),
+    )
+
+
+def critical_path(graph: TaskGraph, records: dict[str, TaskRecord]) -> list[str]:
+    """Find the chain of dependent tasks with the longest total duration.
+
+    Tasks without records (e.g. tasks that never ran because of a failure upstream)
+    are ignored.
+
+    Args:
+    ----
+        graph: Mapping of each task onto the set of tasks it depends on.
+        records: Records of the tasks that ran, by task name.
+
+    Returns:
+    -------
+        Tasks on the critical path, from first to last.
+    """
+    finish: dict[str, float] = {}
+    previous: dict[str, str | None] = {}
+    for task in topological_order(graph):
+        if task not in records:
+            continue
+        upstream = [dep for dep in graph[task] if dep in finish]
+        slowest = max(upstream, key=finish.__getitem__, default=None)
+        previous[task] = slowest
+        finish[task] = records[task].duration + (finish[slowest] if slowest else 0.0)
+
+    if not finish:
+        return []
+    path = [max(finish, key=finish.__getitem__)]
+    while (upstream_task := previous[path[-1]]) is not None:
+        path.append(upstream_task)
+    return path[::-1]
+
+
+def _format_size(n_bytes: int) -> str:
+    """Format number of bytes in human-readable units."""
+    size = float(n_bytes)
+    for unit in ["B", "KB", "MB", "GB"]:
+        if size < 1024 or unit == "GB":
+            break
+        size /= 1024
+    return f"{size:.1f}{unit}"
+
+
+def format_summary(records: Iterable[TaskRecord], path: list[str]) -> str:
+    """Format task records and the critical path as a table for the terminal."""
+    records = list(records)
+    path_time = sum(r.duration for r in records if r.task in path)
+    header = ["task", "status", "queued", "setup", "run", "user", "sys", "peak rss"]
+    rows = [
+        [
+            r.task,
+            r.status,
+            f"{r.queue_time:.2f}s",
+            f"{r.setup_time:.2f}s",
+            f"{r.run_time:.2f}s",
+            f"{r.user_time:.2f}s",
+            f"{r.sys_time:.2f}s",
+            _format_size(r.max_rss),
+        ]
+        for r in sorted(records, key=lambda r: r.start)
+    ]
+    widths = [max(len(row[n]) for row in [header, *rows]) for n in range(len(header))]
+    lines = [
+        "  ".join(
+            cell.ljust(width) if n < 2 else cell.rjust(width)
+            for n, (cell, width) in enumerate(zip(row, widths))
+        )
+        for row in [header, *rows]
+    ]
+    lines.insert(1, "-" * len(lines[0]))
+    lines.append(f"critical path: {' -> '.join(path)} ({path_time:.2f}s)")
+    return "\n".join(lines)
+
+
+def write_timings(
+    run_dir: Path, records: Iterable[TaskRecord], path: list[str]
+) -> Path:
+    """Write task records and the critical path to a JSON file in the run directory."""
+    timings = {
+        "tasks": [{**r._asdict(), "queue_time": r.queue_time} for r in records],
+        "critical_path": path,
+    }
+    timings_file = Path(run_dir) / TIMINGS_FILE
+    timings_file.write_text(json.dumps(timings, indent=2))
+    return timings_file
+
+
+def write_trace(run_dir: Path, records: Iterable[TaskRecord]) -> Path:
+    """Write task records to a Chrome trace file in the run directory.
+
+    Concurrent tasks are placed on separate tracks, with each task's setup and
+    execution shown as nested slices. The trace can be opened using Perfetto or
+    chrome://tracing.
+    """
+    records = sorted(records, key=lambda r: r.ready)
+    t0 = min((r.ready for r in records), default=0.0)
+    lanes: list[float] = []
+    events: list[dict] = []
+
+    def add_slice(name: str, lane: int, start: float, duration: float, **args) -> None:
+        events.append(
+            {
+                "name": name,
+                "ph": "X",
+                "pid": 1,
+                "tid": lane,
+                "ts": (start - t0) * 1e6,
+                "dur": duration * 1e6,
+                "args": args,
+            }
+        )
+
+    for r in records:
+        lane = next((n for n, free in enumerate(lanes) if free <= r.ready), len(lanes))
+        lanes[lane : lane + 1] = [r.end]
+        if r.queue_time > 0:
+            add_slice("queued", lane, r.ready, r.queue_time)
+        add_slice(
+            r.task,
+            lane,
+            r.start,
+            r.duration,
+            status=r.status,
+            exit_code=r.exit_code,
+            user_time=r.user_time,
+            sys_time=r.sys_time,
+            max_rss=r.max_rss,
+        )
+        if r.setup_time > 0:
+            add_slice("setup", lane, r.start, r.setup_time)
+        if r.run_time > 0:
+            add_slice("run", lane, r.end - r.run_time, r.run_time)
+
+    trace_file = Path(run_dir) / TRACE_FILE
+    trace_file.write_text(json.dumps({"traceEvents": events}))
+    return trace_file
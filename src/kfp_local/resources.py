@@ -0,0 +1,226 @@
+"""Packing tasks onto the CPUs and memory of the host, and limiting what they use."""
+import itertools
+import math
+import os
+import resource
+import sys
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import NamedTuple
+
+# memory requests and limits are compiled into pipeline specs in units of 1e9 bytes
+_BYTES_PER_GB = 1_000_000_000
+
+
+class TaskResources(NamedTuple):
+    """CPUs and memory (in bytes) requested by a task, and the limits it must keep to.
+
+    Fields that aren't set by the task's component are zero.
+    """
+
+    cpu_request: float = 0.0
+    memory_request: int = 0
+    cpu_limit: float = 0.0
+    memory_limit: int = 0
+
+    @property
+    def cpus(self) -> float:
+        """CPUs to reserve for the task - its request, or else its limit."""
+        return self.cpu_request or self.cpu_limit
+
+    @property
+    def memory(self) -> int:
+        """Memory to reserve for the task - its request, or else its limit."""
+        return self.memory_request or self.memory_limit
+
+
+NO_RESOURCES = TaskResources()
+
+
+class ProcessLimits(NamedTuple):
+    """CPU cores to pin a task's processes to, and the most memory they can use."""
+
+    cores: list[int]
+    memory: int
+
+
+def parse_resources(spec: dict[str, float]) -> TaskResources:
+    """Parse the resources set on a container executor (e.g. with set_cpu_limit)."""
+    return TaskResources(
+        spec.get("cpuRequest", 0.0),
+        int(spec.get("memoryRequest", 0.0) * _BYTES_PER_GB),
+        spec.get("cpuLimit", 0.0),
+        int(spec.get("memoryLimit", 0.0) * _BYTES_PER_GB),
+    )
+
+
+def host_cores() -> list[int]:
+    """Get the CPU cores that this process (and so every task) can run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def host_memory() -> int:
+    """Get the physical memory of the host in bytes, or 0 if it can't be found."""
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (ValueError, OSError, AttributeError):
+        return 0
+
+
+# sets the limits passed as its first two arguments, then executes the rest of them
+_LIMIT_AND_EXEC = """
+import os, resource, sys
+cores, memory, *cmd = sys.argv[1:]
+if cores:
+    os.sched_setaffinity(0, [int(core) for core in cores.split(",")])
+if memory:
+    resource.setrlimit(resource.RLIMIT_DATA, (int(memory), int(memory)))
+os.execvp(cmd[0], cmd)
+"""
+
+
+def limit_command(cmd: list[str], limits: ProcessLimits) -> list[str]:
+    """Wrap a command so that it's pinned to CPU cores and limited in memory.
+
+    The limits are set by a small Python process that then replaces itself with the
+    command (using exec, so it keeps the same pid), so they're in place before the
+    command starts, and are inherited by every process that it starts - e.g. the
+    Python interpreter started by a component's shell command. Memory is limited
+    using RLIMIT_DATA, so allocations beyond the limit fail with a MemoryError,
+    rather than the process being killed. Limits are only applied on Linux, and the
+    command is returned unchanged elsewhere or if there aren't any to apply.
+    """
+    cores = limits.cores if hasattr(os, "sched_setaffinity") else []
+    memory = limits.memory if hasattr(resource, "prlimit") else 0
+    if not cores and not memory:
+        return cmd
+    return [
+        sys.executable,
+        "-I",
+        "-S",
+        "-c",
+        _LIMIT_AND_EXEC,
+        ",".join(str(core) for core in cores),
+        str(memory or ""),
+        *cmd,
+    ]
+
+
+class ResourcePool:
+    """Slots for executing tasks, packed onto a budget of CPUs and memory.
+
+    Tasks reserve the CPUs and memory they request (tasks that don't request any only
+    take up a slot), and are started as soon as enough of both are free - in order of
+    priority when there are more tasks waiting than can be started, with lower
+    priority tasks started in the meantime if the higher priority tasks don't fit.
+    Once a task has waited for longer than backfill_wait, lower priority tasks stop
+    being started ahead of it, so that large tasks can't be starved by a stream of
+    smaller ones - the resources they free up are held for it instead.
+    Requests larger than the whole budget are reduced to fit, so that they run on
+    their own instead of never being started.
+    """
+
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        cpus: float | None = None,
+        memory: int | None = None,
+        backfill_wait: float = 10.0,
+    ):
+        """Create pool for max_workers tasks, sharing cpus and memory (in bytes).
+
+        Args:
+        ----
+            max_workers: Maximum number of tasks to execute at once. Defaults to the
+                number of CPUs on the machine.
+            cpus: CPUs to share between tasks. Defaults to all cores available.
+            memory: Memory to share between tasks. Defaults to the host's physical
+                memory (or no limit if that isn't known).
+            backfill_wait: Seconds that a task can wait for resources while lower
+                priority tasks are started ahead of it. Defaults to 10.
+        """
+        self.cores = host_cores()
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.cpus = cpus or float(len(self.cores))
+        self.memory = memory or host_memory()
+        self.backfill_wait = backfill_wait
+        self._condition = threading.Condition()
+        self._tickets = itertools.count()
+        self._waiting: list[tuple[int, int, float, int, int, float]] = []
+        self._granted: dict[int, list[int]] = {}
+        self._running = 0
+        self._cpus_used = 0.0
+        self._memory_used = 0
+        self._core_load = {core: 0.0 for core in self.cores}
+
+    def _fits(self, cpus: float, memory: int) -> bool:
+        return (
+            self._running < self.max_workers
+            and self._cpus_used + cpus <= self.cpus + 1e-9
+            and (not self.memory or self._memory_used + memory <= self.memory)
+        )
+
+    def _grant(self) -> None:
+        """Start waiting tasks that fit, in order of priority."""
+        still_waiting = []
+        starved = False
+        now = time.monotonic()
+        for entry in sorted(self._waiting):
+            _, ticket, cpus, memory, n_cores, since = entry
+            if starved or not self._fits(cpus, memory):
+                still_waiting.append(entry)
+                starved = starved or now - since > self.backfill_wait
+                continue
+            cores = sorted(self.cores, key=self._core_load.__getitem__)[:n_cores]
+            for core in cores:
+                self._core_load[core] += cpus / n_cores
+            self._running += 1
+            self._cpus_used += cpus
+            self._memory_used += memory
+            self._granted[ticket] = sorted(cores)
+        self._waiting = still_waiting
+        self._condition.notify_all()
+
+    @contextmanager
+    def reserve(
+        self, resources: TaskResources = NO_RESOURCES, priority: int = 0
+    ) -> Iterator[ProcessLimits]:
+        """Wait for a slot with the resources a task needs, and hold it while in use.
+
+        Args:
+        ----
+            resources: Resources requested by the task.
+            priority: Tasks with higher priorities are started first - e.g. those
+                with longer chains of tasks waiting on them.
+
+        Yields:
+        ------
+            Limits to apply to the task's processes - pinned to CPU cores when the
+            task sets a CPU limit, and limited in memory when it sets a memory limit.
+        """
+        cpus = min(resources.cpus, self.cpus)
+        memory = min(resources.memory, self.memory) if self.memory else 0
+        n_cores = min(math.ceil(resources.cpu_limit or cpus), len(self.cores))
+        with self._condition:
+            ticket = next(self._tickets)
+            entry = (-priority, ticket, cpus, memory, n_cores, time.monotonic())
+            self._waiting.append(entry)
+            self._grant()
+            while ticket not in self._granted:
+                self._condition.wait()
+            cores = self._granted.pop(ticket)
+        try:
+            pinned = cores if resources.cpu_limit else []
+            yield ProcessLimits(pinned, resources.memory_limit)
+        finally:
+            with self._condition:
+                for core in cores:
+                    self._core_load[core] -= cpus / len(cores)
+                self._running -= 1
+                self._cpus_used -= cpus
+                self._memory_used -= memory
+                self._grant()
@@ -0,0 +1,108 @@
+"""Run-scoped storage for task outputs."""
+import json
+import os
+import shutil
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+DEFAULT_KEEP_RUNS = 10
+LOCAL_FOLDER = "object-storage-bucket"
+RUN_FILE = "run.json"
+
+
+def new_run_id() -> str:
+    """Generate a unique run ID that sorts in the order runs were created."""
+    return f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+
+def create_run(
+    root: str,
+    run_id: str,
+    pipeline_name: str,
+    params: dict[str, Any] | None = None,
+) -> Path:
+    """Create the directory for a run, or reuse it if the run already exists.
+
+    Args:
+    ----
+        root: Directory containing all runs.
+        run_id: Run ID.
+        pipeline_name: Name of the pipeline being run.
+        params: Pipeline inputs that were overridden for the run. Defaults to None.
+
+    Returns:
+    -------
+        Path to the run directory.
+    """
+    run_dir = Path(root) / run_id
+    run_dir.mkdir(parents=True, exist_ok=True)
+    run_file = run_dir / RUN_FILE
+    if run_file.exists():
+        run_info = json.loads(run_file.read_text())
+    else:
+        run_info = {
+            "run_id": run_id,
+            "pipeline_name": pipeline_name,
+            "created": datetime.now().isoformat(),
+        }
+    if params:
+        run_info["params"] = params
+    run_info["status"] = "running"
+    _write_run_file(run_file, run_info)
+    return run_dir
+
+
+def set_run_status(run_dir: Path, status: str) -> None:
+    """Record the status of a run - e.g. 'succeeded' or 'failed'."""
+    run_file = run_dir / RUN_FILE
+    run_info = json.loads(run_file.read_text())
+    run_info["status"] = status
+    _write_run_file(run_file, run_info)
+
+
+def _write_run_file(run_file: Path, run_info: dict[str, Any]) -> None:
+    """Atomically write a run's info, so that it's never read half-written."""
+    tmp_path = run_file.with_suffix(f".tmp-{uuid.uuid4().hex}")
+    tmp_path.write_text(json.dumps(run_info, indent=2))
+    os.replace(tmp_path, run_file)
+
+
+def list_runs(root: str) -> list[dict[str, Any]]:
+    """List all runs in a root directory, from oldest to newest.
+
+    Directories that weren't created by kfp-local are ignored, as are runs whose
+    info can't be read - e.g. because they're being deleted by another process.
+    """
+    root_dir = Path(root)
+    if not root_dir.exists():
+        return []
+    runs = []
+    for run_dir in root_dir.iterdir():
+        try:
+            runs.append(json.loads((run_dir / RUN_FILE).read_text()))
+        except (OSError, ValueError):
+            continue
+    return sorted(runs, key=lambda run: run["created"])
+
+
+def latest_run(root: str) -> str | None:
+    """Get the ID of the most recently created run, if there is one."""
+    runs = list_runs(root)
+    return runs[-1]["run_id"] if runs else None
+
+
+def gc_runs(root: str, keep: int = DEFAULT_KEEP_RUNS) -> list[str]:
+    """Delete the oldest finished runs, so that at most `keep` finished runs remain.
+
+    Runs that are still in progress are never deleted. Returns the IDs of all the
+    runs that were deleted.
+    """
+    finished_runs = [run for run in list_runs(root) if run["status"] != "running"]
+    n_to_delete = max(len(finished_runs) - keep, 0)
+    deleted: list[str] = []
+    for run in finished_runs[:n_to_delete]:
+        shutil.rmtree(Path(root) / run["run_id"], ignore_errors=True)
+        deleted.append(run["run_id"])
+    return deleted
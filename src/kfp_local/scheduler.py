@@ -0,0 +1,157 @@
+"""Scheduling pipeline tasks concurrently in dependency order."""
+from collections.abc import Callable, Iterable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+from kfp.pipeline_spec.pipeline_spec_pb2 import PipelineSpec
+
+from kfp_local.spec import ROOT_DAG, get_index
+
+TaskGraph = dict[str, set[str]]
+
+
+def upstream_tasks(pipeline: PipelineSpec, task: str, dag: str = ROOT_DAG) -> set[str]:
+    """Get the tasks that a task depends on, within the DAG that contains it.
+
+    This covers explicit dependencies, as well as the producers of all the task's
+    input parameters and input artifacts.
+    """
+    return set(get_index(pipeline).dags[dag].upstream.get(task, set()))
+
+
+def upstream_closure(
+    pipeline: PipelineSpec,
+    targets: Iterable[str],
+    is_materialised: Callable[[str], bool] = lambda task: False,
+) -> list[str]:
+    """Find the minimal set of tasks that need to be run to produce the targets.
+
+    Upstream tasks whose outputs have already been materialised are not included, and
+    neither are any of their upstream tasks (unless needed by some other task).
+
+    Args:
+    ----
+        pipeline: The pipeline spec.
+        targets: Tasks that need to be run.
+        is_materialised: Callable that checks if a task's outputs already exist.
+
+    Returns:
+    -------
+        Tasks to run, in the order they are defined in the pipeline spec.
+    """
+    closure: set[str] = set()
+    to_visit = list(targets)
+    while to_visit:
+        task = to_visit.pop()
+        if task in closure:
+            continue
+        closure.add(task)
+        for dep in upstream_tasks(pipeline, task):
+            if dep not in closure and not is_materialised(dep):
+                to_visit.append(dep)
+    return [task for task in get_index(pipeline).tasks if task in closure]
+
+
+def build_task_graph(
+    pipeline: PipelineSpec, tasks: Iterable[str], dag: str = ROOT_DAG
+) -> TaskGraph:
+    """Map every task onto the subset of its upstream tasks that are also being run.
+
+    Upstream tasks that are not being run are assumed to have been run already, so
+    they do not constrain the schedule.
+    """
+    tasks = list(tasks)
+    graph: TaskGraph = {}
+    for task in tasks:
+        upstream = upstream_tasks(pipeline, task, dag)
+        graph[task] = {dep for dep in upstream if dep in tasks}
+    return graph
+
+
+def topological_order(graph: TaskGraph) -> list[str]:
+    """Order tasks so that every task comes after all of its upstream tasks.
+
+    Ties are broken using the order in which tasks were added to the graph.
+    """
+    remaining = {task: len(upstream) for task, upstream in graph.items()}
+    downstream: dict[str, list[str]] = {task: [] for task in graph}
+    for task, upstream in graph.items():
+        for dep in upstream:
+            downstream[dep].append(task)
+
+    order = [task for task, n_deps in remaining.items() if n_deps == 0]
+    for task in order:
+        for child in downstream[task]:
+            remaining[child] -= 1
+            if remaining[child] == 0:
+                order.append(child)
+
+    if len(order) != len(graph):
+        cyclic = [task for task in graph if task not in order]
+        raise RuntimeError(f"cyclic dependencies between tasks: {', '.join(cyclic)}")
+    return order
+
+
+def downstream_depths(graph: TaskGraph) -> dict[str, int]:
+    """Find the length of the longest chain of tasks that starts at each task.
+
+    Tasks with longer chains of tasks waiting on them are on (or closer to) the
+    critical path through the DAG, so are started first when slots are scarce.
+    """
+    depths: dict[str, int] = {}
+    for task in reversed(topological_order(graph)):
+        depths.setdefault(task, 1)
+        for dep in graph[task]:
+            depths[dep] = max(depths.get(dep, 1), depths[task] + 1)
+    return depths
+
+
+def run_dag(
+    graph: TaskGraph,
+    run_task: Callable[[str], None],
+    max_workers: int | None = None,
+) -> None:
+    """Run tasks concurrently, launching each one as soon as its upstream tasks finish.
+
+    Args:
+    ----
+        graph: Mapping of each task onto the set of tasks it depends on.
+        run_task: Callable that executes a single task, raising on failure.
+        max_workers: Maximum number of tasks to run at once. Defaults to the number
+            of CPUs on the machine.
+
+    Raises:
+    ------
+        RuntimeError: If the graph contains cyclic dependencies.
+        Exception: The first exception raised by `run_task`, once all tasks that were
+            already running have finished. No new tasks are launched after a failure.
+    """
+    order = topological_order(graph)
+    priority = {task: n for n, task in enumerate(order)}
+    remaining = {task: set(upstream) for task, upstream in graph.items()}
+    ready = [task for task in order if not remaining[task]]
+    running: dict[Future, str] = {}
+    error: BaseException | None = None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while ready or running:
+            while ready and error is None:
+                task = ready.pop(0)
+                running[pool.submit(run_task, task)] = task
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                finished_task = running.pop(future)
+                if future.exception() is not None:
+                    error = error or future.exception()
+                    continue
+                for task, upstream in remaining.items():
+                    if finished_task in upstream:
+                        upstream.remove(finished_task)
+                        if not upstream:
+                            ready.append(task)
+            ready.sort(key=priority.__getitem__)
+
+    if error is not None:
+        raise error
@@ -0,0 +1,187 @@
+"""Loading, caching and indexing compiled pipeline specs."""
+import hashlib
+import json
+import os
+import uuid
+import weakref
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from google.protobuf.json_format import ParseDict
+from kfp.dsl import structures
+from kfp.pipeline_spec.pipeline_spec_pb2 import (
+    ComponentSpec,
+    DagSpec,
+    PipelineSpec,
+    PipelineTaskSpec,
+)
+
+SPEC_CACHE_SUFFIX = ".kfpl.pb"
+ROOT_DAG = "root"
+
+
+def _spec_cache_path(pipeline_file: Path, digest: str) -> Path:
+    """Location of the binary-serialised cache of a compiled pipeline."""
+    return (
+        pipeline_file.parent / f".{pipeline_file.name}.{digest[:16]}{SPEC_CACHE_SUFFIX}"
+    )
+
+
+def _parse_pipeline_file(content: str) -> PipelineSpec:
+    """Parse compiled pipeline JSON (or YAML) into PipelineSpec object."""
+    try:
+        component_dict = json.loads(content)
+    except json.JSONDecodeError:
+        component_dict = structures.load_documents_from_yaml(content)[0]
+    return ParseDict(component_dict, PipelineSpec())
+
+
+def load_pipeline_spec(compiled_pipeline_file: str) -> PipelineSpec:
+    """Load compiled pipeline JSON and parse into PipelineSpec object.
+
+    The parsed spec is cached in binary form next to the compiled pipeline, keyed by
+    a hash of the file's contents, so that subsequent loads can skip parsing.
+    """
+    pipeline_file = Path.cwd() / compiled_pipeline_file
+    if not pipeline_file.exists():
+        raise FileNotFoundError(f"Can't find {pipeline_file}")
+    content = pipeline_file.read_bytes()
+    cache_path = _spec_cache_path(pipeline_file, hashlib.sha256(content).hexdigest())
+    if cache_path.exists():
+        try:
+            return PipelineSpec.FromString(cache_path.read_bytes())
+        except Exception:
+            pass
+
+    try:
+        pipeline_spec = _parse_pipeline_file(content.decode())
+    except Exception as e:
+        raise RuntimeError(f"{pipeline_file} is not a valid `PipelineSpec` - {e}")
+    # the cache is written to a temporary file and renamed into place, so concurrent
+    # loads never read a partially written (and silently truncated) spec
+    tmp_path = cache_path.with_name(f"{cache_path.name}.tmp-{uuid.uuid4().hex}")
+    try:
+        for stale_cache in pipeline_file.parent.glob(
+            f".{pipeline_file.name}.*{SPEC_CACHE_SUFFIX}"
+        ):
+            if stale_cache != cache_path:
+                stale_cache.unlink(missing_ok=True)
+        tmp_path.write_bytes(pipeline_spec.SerializeToString())
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    return pipeline_spec
+
+
+class InputParam(NamedTuple):
+    """Type and default value (None if there isn't one) of an input parameter."""
+
+    parameter_type: int
+    default_value: Any
+
+
+class DagIndex:
+    """Index of the tasks within a single DAG - the root DAG or a sub-DAG component."""
+
+    def __init__(self, dag: DagSpec, components: dict[str, ComponentSpec]):
+        """Build index for the tasks in dag."""
+        self.tasks: dict[str, PipelineTaskSpec] = dict(dag.tasks)
+        self.task_components: dict[str, ComponentSpec] = {}
+        self.task_executors: dict[str, str] = {}
+        self.sub_dags: dict[str, str] = {}
+        self.input_params: dict[str, dict[str, InputParam]] = {}
+        self.upstream: dict[str, set[str]] = {}
+        for name, task in self.tasks.items():
+            component = components.get(task.component_ref.name)
+            if component is None:
+                continue
+            self.task_components[name] = component
+            if component.HasField("dag"):
+                self.sub_dags[name] = task.component_ref.name
+            else:
+                self.task_executors[name] = component.executor_label
+            self.input_params[name] = {
+                param_name: InputParam(
+                    param.parameter_type,
+                    param.default_value if param.HasField("default_value") else None,
+                )
+                for param_name, param in component.input_definitions.parameters.items()
+            }
+            upstream = set(task.dependent_tasks)
+            for param in task.inputs.parameters.values():
+                if param.task_output_parameter.producer_task:
+                    upstream.add(param.task_output_parameter.producer_task)
+            for artifact in task.inputs.artifacts.values():
+                if artifact.task_output_artifact.producer_task:
+                    upstream.add(artifact.task_output_artifact.producer_task)
+            self.upstream[name] = upstream
+
+
+class SpecIndex:
+    """Index of the tasks, components, executors and edges in a pipeline spec.
+
+    Built once per pipeline spec, so that resolving a task's inputs and command never
+    requires searching (or stringifying) protobuf messages. Pipeline specs must not
+    be modified once they have been indexed. Tasks in the root DAG are indexed in
+    the attributes of this class, with the tasks in every DAG (including the root
+    DAG, as ROOT_DAG) indexed by component name in dags.
+    """
+
+    def __init__(self, pipeline: PipelineSpec):
+        """Build index for pipeline."""
+        self.components: dict[str, ComponentSpec] = dict(pipeline.components)
+        self.pipeline_inputs: dict[str, InputParam] = {
+            name: InputParam(
+                param.parameter_type,
+                param.default_value if param.HasField("default_value") else None,
+            )
+            for name, param in pipeline.root.input_definitions.parameters.items()
+        }
+
+        executors = pipeline.deployment_spec.fields["executors"].struct_value.fields
+        self.executors: dict[str, tuple[list[str], list[str]]] = {}
+        self.resources: dict[str, dict[str, float]] = {}
+        for label, executor in executors.items():
+            container = executor.struct_value.fields["container"].struct_value.fields
+            cmd = [str(arg) for arg in container["command"].list_value]
+            args = [str(arg) for arg in container["args"].list_value]
+            self.executors[label] = (cmd, args)
+            resources = (
+                container["resources"].struct_value.fields
+                if "resources" in container
+                else {}
+            )
+            self.resources[label] = {
+                name: value.number_value
+                for name, value in resources.items()
+                if value.HasField("number_value")
+            }
+
+        self.dags: dict[str, DagIndex] = {
+            ROOT_DAG: DagIndex(pipeline.root.dag, self.components)
+        }
+        for name, component in self.components.items():
+            if component.HasField("dag"):
+                self.dags[name] = DagIndex(component.dag, self.components)
+
+        root = self.dags[ROOT_DAG]
+        self.tasks = root.tasks
+        self.task_components = root.task_components
+        self.task_executors = root.task_executors
+        self.input_params = root.input_params
+        self.upstream = root.upstream
+
+
+_indexes: dict[int, tuple[weakref.ref, SpecIndex]] = {}
+
+
+def get_index(pipeline: PipelineSpec) -> SpecIndex:
+    """Get the index for a pipeline spec, building it on first use."""
+    key = id(pipeline)
+    if key in _indexes and _indexes[key][0]() is pipeline:
+        return _indexes[key][1]
+    index = SpecIndex(pipeline)
+    _indexes[key] = (weakref.ref(pipeline, lambda _: _indexes.pop(key, None)), index)
+    return index
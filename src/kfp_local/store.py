@@ -0,0 +1,192 @@
+"""Content-addressed storage for artifacts, shared using links instead of copies."""
+import errno
+import fcntl
+import hashlib
+import os
+import shutil
+import stat
+import sys
+import threading
+import uuid
+from pathlib import Path
+
+BLOBS_FOLDER = "blobs"
+
+_CHUNK_SIZE = 1024**2
+_FICLONE = 0x40049409  # linux/fs.h - _IOW(0x94, 9, int)
+
+_digests: dict[tuple[int, ...], str] = {}
+_digests_lock = threading.Lock()
+
+
+def _stat_key(st: os.stat_result) -> tuple[int, ...]:
+    """Identify a version of a file's content, without reading it.
+
+    The change time is left out, as it's updated whenever a file is linked to.
+    """
+    return st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def file_digest(path: Path) -> str:
+    """Compute the SHA256 digest of a file's content.
+
+    Digests are remembered for as long as the file isn't modified, so that the same
+    file - or any of its hardlinks - is only hashed once per process.
+    """
+    key = _stat_key(path.stat())
+    with _digests_lock:
+        digest = _digests.get(key)
+    if digest is None:
+        hasher = hashlib.sha256()
+        with open(path, "rb") as f:
+            while chunk := f.read(_CHUNK_SIZE):
+                hasher.update(chunk)
+        digest = hasher.hexdigest()
+        with _digests_lock:
+            _digests[key] = digest
+    return digest
+
+
+def _reflink(src: Path, dest: Path) -> None:
+    """Clone a file using copy-on-write, raising OSError if it isn't supported."""
+    if sys.platform != "linux":
+        raise OSError(errno.ENOTSUP, "reflinks are only supported on Linux")
+    with open(src, "rb") as src_file, open(dest, "wb") as dest_file:
+        try:
+            fcntl.ioctl(dest_file.fileno(), _FICLONE, src_file.fileno())
+        except OSError:
+            dest_file.close()
+            dest.unlink()
+            raise
+
+
+def link_or_copy(src: Path, dest: Path, reflink: bool = True) -> None:
+    """Make a file available at a new path, without copying it if possible.
+
+    Files are cloned using a reflink where the filesystem supports them (so that
+    the new file shares storage with the original until either is modified), then
+    hardlinked (so that both paths share the same inode), and only copied as a last
+    resort - e.g. across filesystems. Anything already at dest is replaced.
+
+    Reflinked files are separate inodes, so files that must share the same inode
+    (e.g. links to blobs, which are counted to find unused blobs) are created with
+    reflink=False.
+    """
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp_dest = dest.with_name(f".tmp-{dest.name}-{uuid.uuid4().hex}")
+    try:
+        try:
+            if not reflink:
+                raise OSError(errno.ENOTSUP, "reflink not requested")
+            _reflink(src, tmp_dest)
+        except OSError:
+            try:
+                os.link(src, tmp_dest)
+            except OSError:
+                shutil.copy2(src, tmp_dest)
+        if dest.is_dir():
+            shutil.rmtree(dest)
+        os.replace(tmp_dest, dest)
+    finally:
+        tmp_dest.unlink(missing_ok=True)
+
+
+def link_tree(src: Path, dest: Path, reflink: bool = True) -> None:
+    """Make a file, or every file within a directory, available at a new path."""
+    if not src.is_dir():
+        link_or_copy(src, dest, reflink)
+        return
+    remove_path(dest)
+    dest.mkdir(parents=True)
+    for path in sorted(src.rglob("*")):
+        if path.is_dir():
+            (dest / path.relative_to(src)).mkdir(exist_ok=True)
+        else:
+            link_or_copy(path, dest / path.relative_to(src), reflink)
+
+
+def remove_path(path: Path) -> None:
+    """Remove a file or directory, if it exists."""
+    if path.is_dir():
+        shutil.rmtree(path)
+    else:
+        path.unlink(missing_ok=True)
+
+
+def make_read_only(path: Path) -> None:
+    """Remove write permissions from a file."""
+    mode = path.stat().st_mode
+    path.chmod(mode & ~(stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH))
+
+
+class BlobStore:
+    """Files stored by the digest of their content, so that each is only kept once.
+
+    Blobs are read-only and are shared with the rest of the filesystem using
+    hardlinks (never reflinks), so adding a file to the store never copies it unless
+    it's on a different filesystem, and a blob's link count tells whether anything
+    still links to it.
+    """
+
+    def __init__(self, root: str):
+        """Initialise store that keeps blobs in {root}/blobs."""
+        self.blobs_dir = Path(root) / BLOBS_FOLDER
+
+    def path(self, digest: str) -> Path:
+        """Path to the blob with a digest."""
+        return self.blobs_dir / digest[:2] / digest
+
+    def put(self, file: Path) -> str:
+        """Add a file to the store, returning its digest.
+
+        The file is replaced by a link to the blob, so that every copy of the same
+        content (e.g. in different runs) shares the same storage, and it's made
+        read-only to guard against it being modified in place.
+        """
+        digest = file_digest(file)
+        blob = self.path(digest)
+        if not blob.exists():
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            link_or_copy(file, blob, reflink=False)
+            make_read_only(blob)
+        if not blob.samefile(file):
+            link_or_copy(blob, file, reflink=False)
+        make_read_only(file)
+        return digest
+
+    def put_tree(self, src: Path) -> None:
+        """Add a file, or every file within a directory, to the store."""
+        files = [f for f in src.rglob("*") if f.is_file()] if src.is_dir() else [src]
+        for file in files:
+            self.put(file)
+
+    def prune(self) -> list[str]:
+        """Remove blobs that aren't linked to from anywhere else, returning digests."""
+        if not self.blobs_dir.exists():
+            return []
+        removed = []
+        for blob in self.blobs_dir.glob("*/*"):
+            if blob.is_file() and blob.stat().st_nlink == 1:
+                blob.unlink()
+                removed.append(blob.name)
+        return removed
+
+
+def snapshot(paths: list[Path]) -> dict[Path, tuple[int, ...]]:
+    """Record the version of every file within a list of files and directories."""
+    files = [
+        file
+        for path in paths
+        for file in (list(path.rglob("*")) if path.is_dir() else [path])
+        if file.is_file()
+    ]
+    return {file: _stat_key(file.stat()) for file in files}
+
+
+def modified_files(before: dict[Path, tuple[int, ...]]) -> list[Path]:
+    """Find files that have been modified or removed since a snapshot was taken."""
+    return [
+        file
+        for file, key in before.items()
+        if not file.exists() or _stat_key(file.stat()) != key
+    ]
@@ -0,0 +1,93 @@
+"""Parameter sweeps over the inputs to a pipeline."""
+import itertools
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any
+
+import yaml
+
+
+def param_combinations(grid: dict[str, Any]) -> list[dict[str, Any]]:
+    """Expand a grid of parameter values into every combination of them.
+
+    Args:
+    ----
+        grid: Mapping of pipeline input names to a list of values to sweep over -
+            any value that isn't a list is used in every combination.
+    """
+    names = list(grid)
+    values = [v if isinstance(v, list) else [v] for v in grid.values()]
+    return [dict(zip(names, combo)) for combo in itertools.product(*values)]
+
+
+def load_param_grid(path: str) -> list[dict[str, Any]]:
+    """Load the parameter combinations to sweep over from a YAML (or JSON) file.
+
+    The file either contains a mapping of pipeline input names to lists of values,
+    which is expanded into every combination of them (a grid), or a list of
+    mappings that each define one combination explicitly - e.g.,
+
+        learning_rate: [0.01, 0.1]
+        n_estimators: [100, 200]
+
+    Args:
+    ----
+        path: Path to the file.
+
+    Raises:
+    ------
+        FileNotFoundError: If the file doesn't exist.
+        ValueError: If the file doesn't define any parameter combinations.
+    """
+    params_file = Path(path)
+    if not params_file.exists():
+        raise FileNotFoundError(f"{path} not found")
+    grid = yaml.safe_load(params_file.read_text())
+    if isinstance(grid, dict):
+        combinations = param_combinations(grid)
+    elif isinstance(grid, list) and all(isinstance(combo, dict) for combo in grid):
+        combinations = grid
+    else:
+        raise ValueError(f"{path} must contain a mapping or a list of mappings")
+    if not combinations or combinations == [{}]:
+        raise ValueError(f"{path} doesn't define any parameter combinations")
+    return combinations
+
+
+class SingleFlight:
+    """Share the outputs of tasks that have identical inputs across runs.
+
+    The first task to claim a key (i.e. a task fingerprint) executes it, while all
+    other tasks claiming the same key wait for it to finish and then reuse its
+    outputs. Completed keys are remembered, so tasks claiming them later on reuse
+    the outputs immediately. Keys whose task failed are released, so the next task
+    to claim them tries again.
+    """
+
+    def __init__(self) -> None:
+        """Initialise with no keys claimed."""
+        self._flights: dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def claim(self, key: str) -> Future | None:
+        """Claim a key, returning None if the caller must execute the task.
+
+        Otherwise, a future is returned that resolves to the result passed to
+        `complete` by the task that claimed the key first.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                self._flights[key] = Future()
+            return flight
+
+    def complete(self, key: str, result: Any) -> None:
+        """Share the result of a task with every task waiting on the same key."""
+        with self._lock:
+            self._flights[key].set_result(result)
+
+    def fail(self, key: str, error: BaseException) -> None:
+        """Release a key whose task failed, passing the error on to waiting tasks."""
+        with self._lock:
+            self._flights.pop(key).set_exception(error)
@@ -0,0 +1,109 @@
+"""Prefetching the packages that tasks install into a local wheelhouse.
+
+Components with `packages_to_install` install them with pip whenever a task starts,
+which depends on the network and the latency of the package index. A wheelhouse
+built once by `kfpl prefetch` holds wheels for every package (and dependency) that
+the executors in a pipeline install, and tasks then install from it using pip's
+`--no-index` and `--find-links` options - passed as environment variables, so that
+they apply to every pip install in a pip preamble or Nox session without modifying
+any of the commands compiled into the pipeline.
+"""
+from pathlib import Path
+
+from kfp.pipeline_spec.pipeline_spec_pb2 import PipelineSpec
+
+from kfp_local.environments import WHEELHOUSE_FOLDER, parse_packages
+from kfp_local.launcher import ProcessUsage, TaskLog, run_process
+from kfp_local.spec import get_index
+
+# pip options that could be in a pip preamble, which take a value
+_PIP_OPTIONS_WITH_VALUES = {
+    "-i",
+    "--index-url",
+    "--extra-index-url",
+    "--trusted-host",
+    "-f",
+    "--find-links",
+}
+
+
+def _requirements(packages: list[str]) -> list[str]:
+    """Remove pip options (and their values) from packages parsed from a preamble."""
+    requirements = []
+    skip_value = False
+    for package in packages:
+        if skip_value:
+            skip_value = False
+        elif package in _PIP_OPTIONS_WITH_VALUES:
+            skip_value = True
+        elif not package.startswith("-"):
+            requirements.append(package)
+    return requirements
+
+
+def pipeline_packages(pipeline: PipelineSpec) -> list[str]:
+    """Get every package installed by the executors in a pipeline.
+
+    The version of kfp installed into Nox environments is included, together with
+    the packages installed by every executor's pip preamble, in the order they're
+    first found.
+    """
+    from kfp_local.kfp_noxfile import KFP_VERSION
+
+    packages = [f"kfp=={KFP_VERSION}"]
+    for cmd, _ in get_index(pipeline).executors.values():
+        packages += _requirements(parse_packages(list(cmd)))
+    return list(dict.fromkeys(packages))
+
+
+def build_wheelhouse(
+    packages: list[str], wheelhouse: str = WHEELHOUSE_FOLDER, log: TaskLog | None = None
+) -> ProcessUsage:
+    """Build wheels for packages, and all their dependencies, into wheelhouse.
+
+    Wheels are built using the same interpreter that tasks install packages with
+    (python3), so that they're compatible with it. Packages that already have wheels
+    in the wheelhouse aren't downloaded again.
+
+    Args:
+    ----
+        packages: Packages to build wheels for.
+        wheelhouse: Directory to build wheels into. Defaults to ".kfpl-wheelhouse".
+        log: Log to stream pip's output to. Defaults to None, in which case the
+            output isn't captured.
+
+    Returns:
+    -------
+        Resources used by pip.
+
+    Raises:
+    ------
+        RuntimeError: If any of the wheels can't be built.
+    """
+    Path(wheelhouse).mkdir(parents=True, exist_ok=True)
+    wheel_cmd = [
+        "python3",
+        "-m",
+        "pip",
+        "wheel",
+        "--wheel-dir",
+        wheelhouse,
+        "--find-links",
+        wheelhouse,
+        *packages,
+    ]
+    usage = run_process(wheel_cmd, log=log)
+    if usage.exit_code != 0:
+        raise RuntimeError(f"failed to build wheels - pip exit code {usage.exit_code}")
+    return usage
+
+
+def find_wheelhouse(wheelhouse: str | None = None) -> str | None:
+    """Get the wheelhouse to install packages from - wheelhouse, or the default one.
+
+    The default wheelhouse (.kfpl-wheelhouse) is used when it exists, so that runs
+    install packages from it once `kfpl prefetch` has built it.
+    """
+    if wheelhouse is not None:
+        return wheelhouse
+    return WHEELHOUSE_FOLDER if Path(WHEELHOUSE_FOLDER).is_dir() else None
@@ -0,0 +1,170 @@
+"""Pool of warm worker processes for executing tasks without starting interpreters."""
+import importlib.util
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import NamedTuple
+
+from kfp_local.environments import split_pip_preamble
+from kfp_local.launcher import RUNTIME_DIR, max_rss_bytes
+
+_LOGGING_FORMAT = "[KFP Executor %(asctime)s %(levelname)s]: %(message)s"
+
+
+class TaskResult(NamedTuple):
+    """Outcome of a task executed by a worker.
+
+    CPU times cover the task alone, while the peak RSS (in bytes) is the worker's,
+    which may include earlier tasks that were executed by the same worker.
+    """
+
+    exit_code: int
+    stdout: str
+    stderr: str
+    user_time: float = 0.0
+    sys_time: float = 0.0
+    max_rss: int = 0
+
+
+def parse_component(cmd: list[str], args: list[str]) -> tuple[str, str] | None:
+    """Extract the component source and function name from an executor command.
+
+    Returns None if the command doesn't execute a Python function component using the
+    standard KFP bootstrap, in which case it can't be executed by a worker.
+    """
+    _, task_cmd = split_pip_preamble(cmd)
+    if (
+        len(task_cmd) != 4
+        or task_cmd[:2] != ["sh", "-ec"]
+        or "kfp.dsl.executor_main" not in task_cmd[2]
+        or "--function_to_execute" not in args[:-1]
+    ):
+        return None
+    return task_cmd[3], args[args.index("--function_to_execute") + 1]
+
+
+def _init_worker() -> None:
+    """Import kfp and configure logging and local artifact paths, once per worker."""
+    from kfp.dsl import executor  # noqa: F401
+    from kfp.dsl.types import artifact_types
+
+    artifact_types._GCS_LOCAL_MOUNT_PREFIX = ""
+    sys.path.append(str(RUNTIME_DIR))
+    logging.basicConfig(stream=sys.stdout, format=_LOGGING_FORMAT, level=logging.INFO)
+
+
+def _execute_task(source: str, function_name: str, executor_input: str) -> TaskResult:
+    """Execute a component function within a worker process.
+
+    The component's source is loaded as a uniquely named module, which is removed
+    again once the task has finished. Everything written to stdout and stderr while
+    the task is running is captured separately, by temporarily redirecting the
+    worker's file descriptors to files.
+    """
+    from kfp.dsl.executor import Executor
+
+    usage_before = resource.getrusage(resource.RUSAGE_SELF)
+    module_name = f"ephemeral_component_{uuid.uuid4().hex}"
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        module_path = Path(tmp_dir) / f"{module_name}.py"
+        module_path.write_text(source)
+        stdout_path = Path(tmp_dir) / "stdout"
+        stderr_path = Path(tmp_dir) / "stderr"
+
+        sys.stdout.flush()
+        sys.stderr.flush()
+        original_fds = os.dup(1), os.dup(2)
+        with open(stdout_path, "wb") as stdout, open(stderr_path, "wb") as stderr:
+            os.dup2(stdout.fileno(), 1)
+            os.dup2(stderr.fileno(), 2)
+            try:
+                spec = importlib.util.spec_from_file_location(module_name, module_path)
+                module = importlib.util.module_from_spec(spec)  # type: ignore
+                sys.modules[module_name] = module
+                spec.loader.exec_module(module)  # type: ignore
+                logging.info(f"Got executor_input:\n{executor_input}")
+                executor = Executor(
+                    executor_input=json.loads(executor_input),
+                    function_to_execute=getattr(module, function_name),
+                )
+                output_file = executor.execute()
+                logging.info(f"Wrote executor output file to {output_file}.")
+                exit_code = 0
+            except BaseException:
+                traceback.print_exc()
+                exit_code = 1
+            finally:
+                sys.modules.pop(module_name, None)
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os.dup2(original_fds[0], 1)
+                os.dup2(original_fds[1], 2)
+                os.close(original_fds[0])
+                os.close(original_fds[1])
+        usage_after = resource.getrusage(resource.RUSAGE_SELF)
+        return TaskResult(
+            exit_code,
+            stdout_path.read_text(errors="replace"),
+            stderr_path.read_text(errors="replace"),
+            usage_after.ru_utime - usage_before.ru_utime,
+            usage_after.ru_stime - usage_before.ru_stime,
+            max_rss_bytes(usage_after),
+        )
+
+
+class WorkerPool:
+    """Long-lived worker processes with kfp already imported.
+
+    Tasks are executed in the same Python environment as kfp-local, so all of the
+    packages required by components must already be installed - the pip preamble in
+    each executor command is not run.
+    """
+
+    def __init__(self, max_workers: int | None = None):
+        """Start a pool of max_workers workers (defaults to the number of CPUs)."""
+        self._pool = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        )
+
+    def run(self, cmd: list[str], args: list[str], executor_input: str) -> TaskResult:
+        """Execute a task on the next available worker.
+
+        Args:
+        ----
+            cmd: Executor command.
+            args: Executor args.
+            executor_input: JSON-serialised executor input.
+
+        Raises:
+        ------
+            ValueError: If the task isn't a Python function component.
+        """
+        component = parse_component(cmd, args)
+        if component is None:
+            raise ValueError("only Python function components can run on workers")
+        source, function_name = component
+        return self._pool.submit(
+            _execute_task, source, function_name, executor_input
+        ).result()
+
+    def shutdown(self) -> None:
+        """Stop all worker processes."""
+        self._pool.shutdown()
+
+    def __enter__(self) -> "WorkerPool":
+        """Use pool as a context manager."""
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        """Stop all workers when exiting the context."""
+        self.shutdown()
@@ -0,0 +1,16 @@
+"""Fixtures shared by the tests."""
+from pathlib import Path
+
+from pytest import TempPathFactory, fixture
+
+
+@fixture
+def cache_dir(tmp_path_factory: TempPathFactory) -> str:
+    """Cache directory dedicated to a test, instead of the one in the cwd."""
+    return str(tmp_path_factory.mktemp("cache"))
+
+
+@fixture
+def history(tmp_path_factory: TempPathFactory) -> str:
+    """History database dedicated to a test, instead of the one in the cwd."""
+    return str(Path(tmp_path_factory.mktemp("history")) / "history.db")
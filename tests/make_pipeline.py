@@ -68,6 +68,103 @@ def pipeline(
     stage_3(aggs=stage_2_task.output)
 
 
+@dsl.component(base_image="python:3.9")
+def make_items(n: int) -> list:
+    """Make items to loop over."""
+    return [{"x": x, "label": f"item-{x}"} for x in range(n)]
+
+
+@dsl.component(base_image="python:3.9")
+def square(x: int, offset: int, data: dsl.Output[dsl.Dataset]) -> int:
+    """Square x and save the result."""
+    with open(data.path, "w") as file:
+        file.write(str(x * x + offset))
+    return x * x + offset
+
+
+@dsl.component(base_image="python:3.9")
+def total(xs: list) -> int:
+    """Sum the values collected from a loop."""
+    return sum(xs)
+
+
+@dsl.component(base_image="python:3.9")
+def read_all(data: dsl.Input[list[dsl.Dataset]]) -> int:
+    """Sum the values saved by a loop."""
+    values = []
+    for dataset in data:
+        with open(dataset.path) as file:
+            values.append(int(file.read()))
+    return sum(values)
+
+
+@dsl.component(base_image="python:3.9")
+def echo(label: str) -> str:
+    """Return a label."""
+    return label
+
+
+@dsl.pipeline(name="loops", pipeline_root=PIPELINE_ROOT_PATH)
+def loop_pipeline(offset: int = 1) -> None:
+    """Pipeline with ParallelFor loops over constants and task outputs."""
+    items_task = make_items(n=3)
+    with dsl.ParallelFor([1, 2, 3, 4], parallelism=2) as x:
+        square_task = square(x=x, offset=offset)
+    total_task = total(xs=dsl.Collected(square_task.outputs["Output"]))
+    total_task.set_cpu_limit("1").set_memory_limit("1G")
+    read_all(data=dsl.Collected(square_task.outputs["data"]))
+    with dsl.ParallelFor(items_task.output) as item:
+        echo(label=item.label)
+
+
+@dsl.component(base_image="python:3.9")
+def check_quality(score: float) -> str:
+    """Grade the quality of some data."""
+    return "pass" if score >= 0.5 else "fail"
+
+
+@dsl.component(base_image="python:3.9")
+def fit(label: str, model: dsl.Output[dsl.Model]) -> str:
+    """Fit a model."""
+    with open(model.path, "w") as file:
+        file.write(label)
+    return label
+
+
+@dsl.component(base_image="python:3.9")
+def describe(model: dsl.Input[dsl.Model]) -> str:
+    """Describe a model."""
+    with open(model.path) as file:
+        return file.read()
+
+
+@dsl.pipeline(name="conditions", pipeline_root=PIPELINE_ROOT_PATH)
+def condition_pipeline(score: float = 0.9, retrain: bool = False) -> str:
+    """Pipeline with branches that only run when their conditions are met."""
+    check_task = check_quality(score=score)
+    with dsl.If(check_task.output == "pass"):
+        full_task = fit(label="full")
+        with dsl.If(score > 0.95):
+            echo(label="excellent")
+    with dsl.Elif(check_task.output == "maybe"):
+        partial_task = fit(label="partial")
+    with dsl.Else():
+        fallback_task = fit(label="fallback")
+    model = dsl.OneOf(
+        full_task.outputs["model"],
+        partial_task.outputs["model"],
+        fallback_task.outputs["model"],
+    )
+    describe(model=model)
+    with dsl.If(retrain == True):  # noqa: E712
+        echo(label="retrain")
+    return dsl.OneOf(
+        full_task.outputs["Output"],
+        partial_task.outputs["Output"],
+        fallback_task.outputs["Output"],
+    )
+
+
 # example step used to create build artefacts in CI/CD pipeline
 if __name__ == "__main__":
     compiler.Compiler().compile(pipeline_func=pipeline, package_path="pipeline.json")
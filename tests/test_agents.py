@@ -0,0 +1,240 @@
+"""Tests for the agents module."""
+import io
+import json
+import sys
+import threading
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+from pytest import MonkeyPatch, fixture, raises
+
+from kfp_local import agents as agents_module
+from kfp_local.agents import (
+    Agent,
+    AgentPool,
+    _receive_files,
+    _send_files,
+    _write_chunk,
+    serve_agent,
+)
+from kfp_local.launcher import TaskLog, executor_input_arg
+from kfp_local.pipelines import run_pipeline
+
+TEST_CONFIG_FILE = "tests/resources/pipeline.json"
+
+
+def start_agents(n: int, workdir: str | None = None) -> list[Agent]:
+    """Start n agents on free localhost ports, each in a background thread."""
+    agents = []
+    for _ in range(n):
+        agent = Agent(("127.0.0.1", 0), max_workers=1, workdir=workdir)
+        threading.Thread(target=agent.serve_forever, daemon=True).start()
+        agents.append(agent)
+    return agents
+
+
+def addresses(agents: list[Agent]) -> list[str]:
+    """Get the HOST:PORT of each agent."""
+    return [f"127.0.0.1:{agent.server_address[1]}" for agent in agents]
+
+
+@fixture
+def agents() -> Iterator[list[Agent]]:
+    agents = start_agents(2)
+    yield agents
+    for agent in agents:
+        agent.shutdown()
+        agent.server_close()
+
+
+def test_files_are_sent_in_bounded_chunks(tmp_path: Path, monkeypatch: MonkeyPatch):
+    monkeypatch.setattr(agents_module, "_CHUNK_SIZE", 16)
+    (tmp_path / "src" / "dir").mkdir(parents=True)
+    (tmp_path / "src" / "dir" / "large").write_bytes(bytes(range(100)))
+    (tmp_path / "src" / "empty").write_bytes(b"")
+
+    stream = io.BytesIO()
+    _send_files(stream, [Path("dir"), Path("empty"), Path("missing")], tmp_path / "src")
+    lines = stream.getvalue().splitlines()
+    assert len(lines) == 9
+    assert all(len(line) < 128 for line in lines)
+
+    (tmp_path / "dest" / "dir").mkdir(parents=True)
+    (tmp_path / "dest" / "dir" / "large").write_bytes(b"stale" * 100)
+    stream.seek(0)
+    _receive_files(stream, tmp_path / "dest")
+    assert (tmp_path / "dest" / "dir" / "large").read_bytes() == bytes(range(100))
+    assert (tmp_path / "dest" / "empty").read_bytes() == b""
+
+
+def test_chunks_are_only_written_within_root_and_allowed_paths(tmp_path: Path):
+    def chunk(path: str) -> dict[str, Any]:
+        return {"type": "chunk", "path": path, "offset": 0, "data": ""}
+
+    root = tmp_path / "root"
+    for path in [str(tmp_path / "file"), "../file", "dir/../../file"]:
+        with raises(ValueError, match="refusing to write file"):
+            _write_chunk(chunk(path), root)
+    with raises(ValueError, match="refusing to write file"):
+        _write_chunk(chunk("run/other"), root, allowed=[Path("run/task")])
+    _write_chunk(chunk("run/task/model/weights"), root, allowed=[Path("run/task")])
+    assert (root / "run" / "task" / "model" / "weights").exists()
+    assert list(tmp_path.iterdir()) == [root]
+
+
+def test_agent_pool_registers_agents_and_their_capacity(agents: list[Agent]):
+    pool = AgentPool(addresses(agents))
+    assert [agent.port for agent in pool.agents] == [
+        agent.server_address[1] for agent in agents
+    ]
+    assert pool.slots == 2
+    assert pool.cpus == sum(agent.pool.cpus for agent in agents)
+
+
+def test_agent_pool_raises_error_if_agent_unreachable(agents: list[Agent]):
+    port = agents[0].server_address[1]
+    agents[0].shutdown()
+    agents[0].server_close()
+    with raises(RuntimeError, match=f"couldn't reach agent at 127.0.0.1:{port}"):
+        AgentPool(addresses(agents))
+
+
+def test_agent_pool_sends_tasks_to_least_busy_agent(agents: list[Agent]):
+    pool = AgentPool(addresses(agents))
+    assert {pool._acquire(), pool._acquire()} == {0, 1}
+    pool._release(1)
+    assert pool._acquire() == 1
+
+
+def test_agent_pool_runs_commands_and_streams_their_logs(
+    agents: list[Agent], tmp_path: Path, capsys
+):
+    code = "import sys; print('hello'); print('oops', file=sys.stderr); sys.exit(3)"
+    pool = AgentPool(addresses(agents))
+    with TaskLog("task", tmp_path / "task.log") as log:
+        usage = pool.run([sys.executable, "-c", code], "{}", log)
+    assert usage.exit_code == 3
+    assert usage.wall_time > 0
+    assert (tmp_path / "task.log").read_text().splitlines() == ["hello", "oops"]
+    stdout, stderr = capsys.readouterr()
+    assert "[task] hello" in stdout
+    assert "[task] oops" in stderr
+
+
+def test_agent_pool_keeps_quiet_tasks_alive_with_heartbeats(
+    agents: list[Agent], tmp_path: Path, monkeypatch: MonkeyPatch
+):
+    monkeypatch.setattr(agents_module, "_REPLY_TIMEOUT", 0.5)
+    monkeypatch.setattr(agents_module, "_HEARTBEAT_INTERVAL", 0.1)
+    pool = AgentPool(addresses(agents))
+    with TaskLog("task", tmp_path / "task.log") as log:
+        cmd = [sys.executable, "-c", "import time; time.sleep(1.5)"]
+        assert pool.run(cmd, "{}", log).exit_code == 0
+
+
+def test_agent_pool_fails_tasks_on_agents_that_stop_replying(
+    agents: list[Agent], tmp_path: Path, monkeypatch: MonkeyPatch
+):
+    monkeypatch.setattr(agents_module, "_REPLY_TIMEOUT", 0.5)
+    monkeypatch.setattr(Agent, "run_task", lambda *args: time.sleep(2))
+    pool = AgentPool(addresses(agents))
+    with TaskLog("task", tmp_path / "task.log") as log:
+        with raises(RuntimeError, match="agent at 127.0.0.1:.* failed - timed out"):
+            pool.run([sys.executable, "-c", "pass"], "{}", log)
+    assert pool._busy == [0, 0]
+
+
+def test_agent_pool_streams_executor_input_files(
+    tmp_path: Path, monkeypatch: MonkeyPatch
+):
+    (tmp_path / "agent").mkdir()
+    agents = start_agents(1, str(tmp_path / "agent"))
+    monkeypatch.chdir(tmp_path)
+    output_file = "run/task/output_metadata.json"
+    executor_input = json.dumps(
+        {
+            "inputs": {"parameterValues": {"padding": "x" * 1024 * 1024}},
+            "outputs": {"outputFile": output_file},
+        }
+    )
+    arg = executor_input_arg(executor_input, Path("run/executor_inputs/task.json"))
+    code = (
+        "import os, sys; os.makedirs('run/task'); "
+        f"open('{output_file}', 'w').write(sys.argv[2])"
+    )
+    try:
+        pool = AgentPool(addresses(agents), stream_artifacts=True)
+        with TaskLog("task", tmp_path / "task.log") as log:
+            cmd = [sys.executable, "-c", code, "--executor_input", arg]
+            usage = pool.run(cmd, executor_input, log)
+    finally:
+        agents[0].shutdown()
+        agents[0].server_close()
+    assert usage.exit_code == 0
+    assert (tmp_path / output_file).read_text() == executor_input
+
+
+def test_run_pipeline_executes_tasks_on_agents(
+    agents: list[Agent], tmp_path: Path, cache_dir: str
+):
+    dag = ["stage-0", "stage-1", "stage-2", "stage-3"]
+    run_id = run_pipeline(
+        dag,
+        TEST_CONFIG_FILE,
+        root=str(tmp_path),
+        use_cache=False,
+        history=None,
+        agents=addresses(agents),
+        cache_dir=cache_dir,
+    )
+    run_dir = tmp_path / run_id
+    assert (run_dir / "stage-1" / "data").exists()
+    assert (run_dir / "stage-3" / "output_metadata.json").exists()
+    assert "x_average=" in (run_dir / "logs" / "stage-3.log").read_text()
+
+
+def test_run_pipeline_streams_artifacts_to_agents(
+    tmp_path: Path, monkeypatch: MonkeyPatch, cache_dir: str
+):
+    pipeline = str(Path(TEST_CONFIG_FILE).absolute())
+    agent_dir = tmp_path / "agent"
+    agent_dir.mkdir()
+    agents = start_agents(2, str(agent_dir))
+    monkeypatch.chdir(tmp_path)
+    try:
+        run_id = run_pipeline(
+            ["stage-0", "stage-1", "stage-2"],
+            pipeline,
+            root="runs",
+            use_cache=False,
+            history=None,
+            agents=addresses(agents),
+            stream_artifacts=True,
+            cache_dir=cache_dir,
+        )
+    finally:
+        for agent in agents:
+            agent.shutdown()
+            agent.server_close()
+    run_dir = tmp_path / "runs" / run_id
+    assert (run_dir / "stage-1" / "data").stat().st_size > 0
+    metadata = json.loads((run_dir / "stage-2" / "output_metadata.json").read_text())
+    assert set(metadata["parameterValues"]["Output"]) == {"average", "std"}
+    assert list(agent_dir.iterdir()) == []
+
+
+def test_run_pipeline_raises_error_if_agents_used_with_warm_pool():
+    with raises(ValueError, match="agents can't be used"):
+        run_pipeline(
+            ["stage-0"], TEST_CONFIG_FILE, use_warm_pool=True, agents=["host:1234"]
+        )
+
+
+def test_serve_agent_reports_where_it_listens(monkeypatch: MonkeyPatch, capsys):
+    monkeypatch.setattr(Agent, "serve_forever", lambda self: None)
+    serve_agent(port=0, max_workers=3)
+    stdout = capsys.readouterr().out
+    assert "agent listening on 127.0.0.1:" in stdout
+    assert "executing up to 3 tasks" in stdout
@@ -0,0 +1,219 @@
+"""Tests for the cache module."""
+import json
+import os
+import shutil
+from pathlib import Path
+
+from pytest import MonkeyPatch, fixture, mark, raises
+
+from kfp_local.cache import (
+    clear_outputs,
+    copy_task_outputs,
+    parse_size,
+    path_digest,
+    prune_cache,
+    restore_from_cache,
+    store_in_cache,
+    task_fingerprint,
+)
+
+CMD = ["sh", "-c", "python3 -m kfp.dsl.executor_main"]
+ARGS = ["--executor_input", "{{$}}", "--function_to_execute", "stage_1"]
+
+
+def _executor_input(root: Path, task: str, seed: int = 42) -> str:
+    return json.dumps(
+        {
+            "inputs": {
+                "parameterValues": {"seed": seed},
+                "artifacts": {
+                    "raw": {"name": "raw", "artifacts": [{"uri": f"gs://{root}/raw"}]}
+                },
+            },
+            "outputs": {
+                "artifacts": {
+                    "data": {
+                        "artifacts": [
+                            {"name": "data", "uri": f"gs://{root}/{task}/data"}
+                        ]
+                    }
+                },
+                "outputFile": f"{root}/{task}/output_metadata.json",
+            },
+        }
+    )
+
+
+def _run_task(root: Path, task: str) -> None:
+    (root / task).mkdir(parents=True)
+    (root / task / "data").write_text("some data")
+    output_metadata = {
+        "artifacts": {
+            "data": {"artifacts": [{"name": "data", "uri": f"gs://{root}/{task}/data"}]}
+        },
+        "parameterValues": {"Output": 42},
+    }
+    (root / task / "output_metadata.json").write_text(json.dumps(output_metadata))
+
+
+@fixture(scope="function")
+def root(tmp_path: Path) -> Path:
+    (tmp_path / "raw").write_text("raw data")
+    return tmp_path
+
+
+def test_task_fingerprint_ignores_output_locations(root: Path):
+    key_a = task_fingerprint(CMD, ARGS, _executor_input(root, "task-a"))
+    key_b = task_fingerprint(CMD, ARGS, _executor_input(root, "task-b"))
+    assert key_a == key_b
+
+
+def test_task_fingerprint_changes_with_inputs(root: Path):
+    key = task_fingerprint(CMD, ARGS, _executor_input(root, "task"))
+    assert key != task_fingerprint(CMD, ARGS, _executor_input(root, "task", seed=0))
+    assert key != task_fingerprint(CMD + ["x"], ARGS, _executor_input(root, "task"))
+
+    (root / "raw").write_text("different raw data")
+    assert key != task_fingerprint(CMD, ARGS, _executor_input(root, "task"))
+
+
+def test_task_fingerprint_raises_error_if_input_artifact_missing(root: Path):
+    (root / "raw").unlink()
+    with raises(FileNotFoundError, match="couldn't find input artifact"):
+        task_fingerprint(CMD, ARGS, _executor_input(root, "task"))
+
+
+def test_path_digest_handles_directories(tmp_path: Path):
+    (tmp_path / "a").mkdir()
+    (tmp_path / "a" / "file").write_text("foo")
+    digest = path_digest(tmp_path / "a")
+    (tmp_path / "a" / "file").write_text("bar")
+    assert path_digest(tmp_path / "a") != digest
+
+
+def test_cached_outputs_can_be_restored_to_a_new_location(root: Path):
+    cache_dir = str(root / "cache")
+    executor_input = _executor_input(root, "task-a")
+    key = task_fingerprint(CMD, ARGS, executor_input)
+    assert not restore_from_cache(key, executor_input, cache_dir)
+
+    _run_task(root, "task-a")
+    store_in_cache(key, executor_input, cache_dir)
+    assert restore_from_cache(key, _executor_input(root, "task-b"), cache_dir)
+    assert (root / "task-b" / "data").read_text() == "some data"
+
+    output_metadata = json.loads((root / "task-b" / "output_metadata.json").read_text())
+    assert output_metadata["parameterValues"] == {"Output": 42}
+    restored_uri = output_metadata["artifacts"]["data"]["artifacts"][0]["uri"]
+    assert restored_uri == f"gs://{root}/task-b/data"
+
+
+def test_cached_outputs_are_linked_instead_of_copied(root: Path):
+    cache_dir = str(root / "cache")
+    executor_input = _executor_input(root, "task-a")
+    key = task_fingerprint(CMD, ARGS, executor_input)
+    _run_task(root, "task-a")
+    store_in_cache(key, executor_input, cache_dir)
+    assert restore_from_cache(key, _executor_input(root, "task-b"), cache_dir)
+
+    cached_data = Path(cache_dir) / key / "artifacts" / "data"
+    assert (root / "task-a" / "data").samefile(cached_data)
+    assert (root / "task-b" / "data").samefile(cached_data)
+    assert not cached_data.stat().st_mode & 0o222
+
+    clear_outputs(_executor_input(root, "task-b"))
+    assert not (root / "task-b" / "data").exists()
+    assert not (root / "task-b" / "output_metadata.json").exists()
+    assert cached_data.read_text() == "some data"
+
+
+def test_prune_cache_counts_linked_files_once(root: Path):
+    cache_dir = root / "cache"
+    for task, key in [("task-a", "old"), ("task-b", "new")]:
+        _run_task(root, task)
+        executor_input = _executor_input(root, task)
+        store_in_cache(key, executor_input, str(cache_dir))
+    metadata_size = {
+        key: (cache_dir / key / "output_metadata.json").stat().st_size
+        for key in ["old", "new"]
+    }
+    data_size = len("some data")
+    total_size = sum(metadata_size.values()) + data_size
+    assert prune_cache(str(cache_dir), max_size=total_size) == []
+
+    for task in ["task-a", "task-b"]:
+        (root / task / "data").unlink()
+    os.utime(cache_dir / "old", (0, 0))
+    max_size = metadata_size["new"] + data_size
+    assert prune_cache(str(cache_dir), max_size=max_size) == ["old"]
+    assert len(list((cache_dir / "blobs").rglob("*/*"))) == 1
+    assert prune_cache(str(cache_dir), max_size=0) == ["new"]
+    assert list((cache_dir / "blobs").rglob("*/*")) == []
+
+
+def test_prune_cache_keeps_blobs_on_filesystems_with_reflinks(
+    root: Path, monkeypatch: MonkeyPatch
+):
+    monkeypatch.setattr("kfp_local.store._reflink", shutil.copy2)
+    cache_dir = root / "cache"
+    for task, key in [("task-a", "old"), ("task-b", "new")]:
+        _run_task(root, task)
+        store_in_cache(key, _executor_input(root, task), str(cache_dir))
+    cached_data = cache_dir / "new" / "artifacts" / "data"
+    assert (root / "task-b" / "data").samefile(cached_data)
+    assert (cache_dir / "old" / "artifacts" / "data").samefile(cached_data)
+
+    assert prune_cache(str(cache_dir)) == []
+    assert len(list((cache_dir / "blobs").rglob("*/*"))) == 1
+    assert restore_from_cache("new", _executor_input(root, "task-c"), str(cache_dir))
+    assert not (root / "task-c" / "data").samefile(cached_data)
+
+
+def test_copy_task_outputs_copies_outputs_to_a_new_location(root: Path):
+    with raises(FileNotFoundError, match="couldn't find task output"):
+        copy_task_outputs(
+            _executor_input(root, "task-a"), _executor_input(root, "task-b")
+        )
+
+    _run_task(root, "task-a")
+    copy_task_outputs(_executor_input(root, "task-a"), _executor_input(root, "task-b"))
+    assert (root / "task-b" / "data").read_text() == "some data"
+    output_metadata = json.loads((root / "task-b" / "output_metadata.json").read_text())
+    assert output_metadata["parameterValues"] == {"Output": 42}
+    copied_uri = output_metadata["artifacts"]["data"]["artifacts"][0]["uri"]
+    assert copied_uri == f"gs://{root}/task-b/data"
+
+
+def test_store_in_cache_skips_tasks_with_missing_outputs(root: Path):
+    cache_dir = root / "cache"
+    executor_input = _executor_input(root, "task-a")
+    store_in_cache("key", executor_input, str(cache_dir))
+    assert not (cache_dir / "key").exists()
+
+
+def test_prune_cache_evicts_least_recently_used_entries(tmp_path: Path):
+    for n, key in enumerate(["old", "new", "newest"]):
+        (tmp_path / key).mkdir()
+        (tmp_path / key / "output_metadata.json").write_text("x" * 10)
+        os.utime(tmp_path / key, (n, n))
+
+    assert prune_cache(str(tmp_path), max_size=20) == ["old"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["new", "newest"]
+
+
+@mark.parametrize(
+    ["size", "expected"],
+    [
+        ("1024", 1024),
+        ("500M", 500 * 1024**2),
+        ("10GB", 10 * 1024**3),
+        ("1.5k", 1536),
+    ],
+)
+def test_parse_size(size: str, expected: int):
+    assert parse_size(size) == expected
+
+
+def test_parse_size_raises_error_for_invalid_sizes():
+    with raises(ValueError, match="invalid size"):
+        parse_size("lots")
@@ -0,0 +1,110 @@
+"""Tests for the cli module."""
+import json
+import sys
+from pathlib import Path
+from subprocess import run
+from unittest.mock import patch
+
+from pytest import CaptureFixture, mark, raises
+
+from kfp_local.cli import main
+from kfp_local.launcher import ProcessUsage
+
+TEST_CONFIG_FILE = "tests/resources/pipeline.json"
+
+SUCCESS = ProcessUsage(0, 0.0, 0.0, 0.0, 0)
+
+
+def _main(argv: list[str]) -> int:
+    with raises(SystemExit) as e:
+        main(argv)
+    return e.value.code  # type: ignore
+
+
+def test_cli_does_not_import_kfp_at_start_up():
+    check = (
+        "import sys; import kfp_local.cli; "
+        "heavy = [m for m in sys.modules if m.startswith(('kfp.', 'google.'))]; "
+        "heavy += [m for m in ['kfp_local.agents', 'asyncio'] if m in sys.modules]; "
+        "assert not heavy, heavy"
+    )
+    out = run([sys.executable, "-c", check], capture_output=True, text=True)
+    assert out.returncode == 0, out.stderr
+
+
+def test_help_lists_commands(capsys: CaptureFixture):
+    assert _main(["--help"]) == 0
+    stdout = capsys.readouterr().out
+    assert all(command in stdout for command in ["run", "sweep", "tasks", "runs"])
+    assert _main([]) == 2
+
+
+def test_pipelines_module_runs_the_cli():
+    cmd = [sys.executable, "-m", "kfp_local.pipelines", "--help"]
+    out = run(cmd, capture_output=True, text=True)
+    assert out.returncode == 0, out.stderr
+    assert "kfpl run TASK" in out.stdout
+
+
+@mark.parametrize("argv", [["run"], []])
+def test_run_command_is_the_default(
+    argv: list[str], tmp_path: Path, cache_dir: str, history: str
+):
+    root = str(tmp_path)
+    argv = [*argv, "stage-0", "--pipeline", TEST_CONFIG_FILE, "--root", root]
+    argv += ["--cache-dir", cache_dir, "--history", history]
+    with patch("kfp_local.pipelines.run_process", return_value=SUCCESS) as mock_run:
+        assert _main([*argv, "--no-cache"]) == 0
+    assert mock_run.called
+    run_dir = next(tmp_path.iterdir())
+    assert json.loads((run_dir / "run.json").read_text())["pipeline_name"]
+    assert Path(history).exists()
+
+
+def test_run_command_passes_agents_to_run_pipeline():
+    argv = ["stage-0", "--pipeline", TEST_CONFIG_FILE, "--agent", "a:1", "--agent", "b"]
+    with patch("kfp_local.pipelines.run_pipeline") as mock_run_pipeline:
+        assert _main([*argv, "--stream-artifacts"]) == 0
+    kwargs = mock_run_pipeline.call_args.kwargs
+    assert kwargs["agents"] == ["a:1", "b"]
+    assert kwargs["stream_artifacts"] is True
+
+
+def test_prefetch_command_builds_wheels_for_pipeline_packages(
+    tmp_path: Path, capsys: CaptureFixture
+):
+    wheelhouse = str(tmp_path / "wheels")
+    argv = ["prefetch", "--pipeline", TEST_CONFIG_FILE, "--wheelhouse", wheelhouse]
+    with patch("kfp_local.wheelhouse.build_wheelhouse") as mock_build:
+        assert _main(argv) == 0
+    packages, wheel_dir = mock_build.call_args.args
+    assert packages[0] == "kfp==2.4.0" and "numpy" in packages
+    assert wheel_dir == wheelhouse
+    assert f"0 wheels in {wheelhouse}" in capsys.readouterr().out
+
+
+def test_plan_command_prints_plan_as_json(
+    tmp_path: Path, cache_dir: str, capsys: CaptureFixture
+):
+    argv = ["plan", "stage-0", "--pipeline", TEST_CONFIG_FILE, "--root", str(tmp_path)]
+    assert _main([*argv, "--cache-dir", cache_dir, "--json"]) == 0
+    plan = json.loads(capsys.readouterr().out)
+    assert plan["tasks"][0]["task"] == "stage-0"
+    assert plan["tasks"][0]["executor_input"]["inputs"]["parameterValues"]
+    assert not list(tmp_path.iterdir())
+
+
+def test_tasks_command_lists_tasks_with_dependencies(capsys: CaptureFixture):
+    assert _main(["tasks", "--pipeline", TEST_CONFIG_FILE]) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert lines == [
+        "stage-0",
+        "stage-1 <- stage-0",
+        "stage-2 <- stage-1",
+        "stage-3 <- stage-2",
+    ]
+
+
+def test_commands_report_errors(capsys: CaptureFixture):
+    assert _main(["tasks", "--pipeline", "foo.json"]) == 1
+    assert capsys.readouterr().out.startswith("ERROR: can't find")
@@ -0,0 +1,48 @@
+"""Tests for the conditions module."""
+from pytest import mark, raises
+
+from kfp_local.conditions import condition_inputs, evaluate_condition
+
+CHECK = "inputs.parameter_values['pipelinechannel--check-Output']"
+
+
+@mark.parametrize(
+    "condition, expected",
+    [
+        (f"{CHECK} == 'pass'", True),
+        (f"{CHECK} != 'pass'", False),
+        (f"!({CHECK} == 'pass') && {CHECK} == 'maybe'", False),
+        (f"!({CHECK} == 'fail') && !({CHECK} == 'maybe')", True),
+        ("inputs.parameter_values['score'] > 0.95", False),
+        ("inputs.parameter_values['score'] >= inputs.parameter_values['min']", True),
+        ("int(inputs.parameter_values['n']) < 3 || false", True),
+        ("double(inputs.parameter_values['n']) == 2.0", True),
+        ("inputs.parameter_values['retrain'] == true", False),
+        ("-1e-05 < 0", True),
+    ],
+)
+def test_evaluate_condition_evaluates_compiled_conditions(condition, expected):
+    parameters = {
+        "pipelinechannel--check-Output": "pass",
+        "score": 0.9,
+        "min": 0.5,
+        "n": 2,
+        "retrain": False,
+    }
+    assert evaluate_condition(condition, parameters) is expected
+
+
+def test_evaluate_condition_raises_error_if_condition_unsupported():
+    with raises(RuntimeError, match="unknown input foo"):
+        evaluate_condition("inputs.parameter_values['foo'] == 1", {})
+    with raises(RuntimeError, match="unexpected end of condition"):
+        evaluate_condition("1 ==", {})
+    with raises(RuntimeError, match="unexpected 'size'"):
+        evaluate_condition("size('abc') == 3", {})
+    with raises(RuntimeError, match="can't compare"):
+        evaluate_condition("'a' < 1", {})
+
+
+def test_condition_inputs_lists_parameters_used():
+    condition = f"!({CHECK} == 'pass') && inputs.parameter_values['score'] > 0.5"
+    assert condition_inputs(condition) == ["pipelinechannel--check-Output", "score"]
@@ -0,0 +1,61 @@
+"""Tests for the dags module."""
+from kfp.pipeline_spec.pipeline_spec_pb2 import PipelineTaskSpec
+from pytest import raises
+
+from kfp_local.dags import ROOT_SCOPE, Scope, apply_selector, expand_dag_task
+from kfp_local.pipelines import load_pipeline_spec
+
+TEST_LOOP_CONFIG_FILE = "tests/resources/loop_pipeline.json"
+
+
+def test_scope_task_key_includes_path():
+    assert ROOT_SCOPE.task_key("foo") == "foo"
+    assert Scope("comp-bar", "bar/0", {}, {}).task_key("foo") == "bar/0/foo"
+
+
+def test_apply_selector_selects_fields_from_json():
+    assert apply_selector({"a": {"b": 1}}, 'parseJson(string_value)["a"]["b"]') == 1
+    assert apply_selector('{"a": "x"}', 'parseJson(string_value)["a"]') == "x"
+
+
+def test_apply_selector_raises_error_if_selector_unsupported():
+    with raises(RuntimeError, match="unsupported parameter expression selector"):
+        apply_selector({"a": 1}, "string_value.a")
+
+
+def test_expand_dag_task_expands_loops_over_raw_items():
+    pipeline = load_pipeline_spec(TEST_LOOP_CONFIG_FILE)
+    task = pipeline.root.dag.tasks["for-loop-2"]
+    scopes = expand_dag_task(task, "for-loop-2", "comp-for-loop-2", {"a": 1}, {})
+    assert [scope.path for scope in scopes] == [f"for-loop-2/{n}" for n in range(4)]
+    item_input = task.parameter_iterator.item_input
+    assert [scope.parameters[item_input] for scope in scopes] == [1, 2, 3, 4]
+    assert all(scope.parameters["a"] == 1 for scope in scopes)
+
+
+def test_expand_dag_task_expands_loops_over_input_parameters():
+    pipeline = load_pipeline_spec(TEST_LOOP_CONFIG_FILE)
+    task = pipeline.root.dag.tasks["for-loop-3"]
+    items_param = task.parameter_iterator.items.input_parameter
+    parameters = {items_param: '[{"label": "a"}, {"label": "b"}]'}
+    scopes = expand_dag_task(task, "for-loop-3", "comp-for-loop-3", parameters, {})
+    item_input = task.parameter_iterator.item_input
+    assert [s.parameters[item_input] for s in scopes] == [
+        {"label": "a"},
+        {"label": "b"},
+    ]
+
+    with raises(RuntimeError, match="loop items for task=for-loop-3 are not a list"):
+        expand_dag_task(task, "for-loop-3", "comp-for-loop-3", {items_param: 1}, {})
+
+
+def test_expand_dag_task_runs_other_sub_dags_once():
+    scopes = expand_dag_task(PipelineTaskSpec(), "foo", "comp-foo", {"a": 1}, {})
+    assert scopes == [Scope("comp-foo", "foo", {"a": 1}, {})]
+
+
+def test_expand_dag_task_raises_error_for_artifact_iterators():
+    task = PipelineTaskSpec()
+    task.artifact_iterator.item_input = "item"
+    with raises(RuntimeError, match="iterating over artifacts isn't supported"):
+        expand_dag_task(task, "foo", "comp-foo", {}, {})
@@ -0,0 +1,108 @@
+"""Tests for the environments module."""
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+from kfp_local.environments import (
+    ENV_READY_FILE,
+    EnvironmentPool,
+    environment_key,
+    parse_packages,
+    split_pip_preamble,
+    wheelhouse_env,
+)
+from kfp_local.launcher import ProcessUsage
+from kfp_local.pipelines import get_task_cmd_args, load_pipeline_spec
+
+TEST_CONFIG_FILE = "tests/resources/pipeline.json"
+
+
+def test_split_pip_preamble_separates_installs_from_task_command():
+    pipeline = load_pipeline_spec(TEST_CONFIG_FILE)
+    cmd, _ = get_task_cmd_args("stage-0", pipeline)
+    preamble, task_cmd = split_pip_preamble(cmd)
+    assert preamble is not None and "pip install" in preamble
+    assert task_cmd == cmd[3:]
+    assert task_cmd[:2] == ["sh", "-ec"]
+
+
+def test_split_pip_preamble_handles_commands_without_preamble():
+    cmd = ["python", "-m", "foo"]
+    assert split_pip_preamble(cmd) == (None, cmd)
+
+
+def test_parse_packages_extracts_packages_from_preamble():
+    pipeline = load_pipeline_spec(TEST_CONFIG_FILE)
+    cmd, _ = get_task_cmd_args("stage-0", pipeline)
+    assert parse_packages(cmd) == [
+        "kfp==2.4.0",
+        'typing-extensions>=3.7.4,<5; python_version<"3.9"',
+        "numpy",
+    ]
+
+
+def test_environment_key_depends_on_packages():
+    assert environment_key(["numpy"]) == environment_key(["numpy"])
+    assert environment_key(["numpy"]) != environment_key(["numpy", "pandas"])
+
+
+def test_environment_key_depends_on_kfp_and_python_versions():
+    key = environment_key(["numpy"])
+    with patch("kfp_local.kfp_noxfile.KFP_VERSION", "0.0.0"):
+        assert environment_key(["numpy"]) != key
+    with patch.object(sys, "version_info", (2, 7, 18)):
+        assert environment_key(["numpy"]) != key
+
+
+def test_environment_pool_builds_each_environment_once(tmp_path: Path):
+    pipeline = load_pipeline_spec(TEST_CONFIG_FILE)
+    pool = EnvironmentPool(str(tmp_path))
+
+    def build_env(nox_cmd: list[str], *args: object) -> ProcessUsage:
+        env_dir = Path(nox_cmd[nox_cmd.index("--envdir") + 1])
+        env_dir.mkdir(parents=True)
+        return ProcessUsage(0, 0.0, 0.0, 0.0, 0)
+
+    with patch("kfp_local.environments.run_process") as mock_run:
+        mock_run.side_effect = build_env
+        for task in ["stage-0", "stage-1"]:
+            cmd, args = get_task_cmd_args(task, pipeline)
+            task_cmd = pool.task_command(cmd, args)
+            assert task_cmd[task_cmd.index("--") + 1 :] == cmd[3:] + args
+            assert "-R" in task_cmd
+
+    assert mock_run.call_count == 1
+    assert "--install-only" in mock_run.call_args.args[0]
+    assert mock_run.call_args.args[0][:3] == [sys.executable, "-m", "nox"]
+    assert pool.is_ready(parse_packages(cmd))
+    env_dirs = list(tmp_path.iterdir())
+    assert len(env_dirs) == 1 and (env_dirs[0] / ENV_READY_FILE).exists()
+
+
+def test_environment_pool_runs_each_preamble_once(tmp_path: Path):
+    pipeline = load_pipeline_spec(TEST_CONFIG_FILE)
+    preamble, _ = split_pip_preamble(get_task_cmd_args("stage-0", pipeline)[0])
+    assert preamble is not None
+    pool = EnvironmentPool(str(tmp_path), wheelhouse=str(tmp_path / "wheels"))
+    failed = ProcessUsage(1, 0.0, 0.0, 0.0, 0)
+    succeeded = ProcessUsage(0, 0.0, 0.0, 0.0, 0)
+
+    with patch("kfp_local.environments.run_process") as mock_run:
+        mock_run.side_effect = [failed, succeeded]
+        assert pool.install_preamble(preamble) == failed
+        assert pool.install_preamble(preamble) == succeeded
+        assert pool.install_preamble(preamble) is None
+
+    assert mock_run.call_count == 2
+    env = mock_run.call_args.args[1]
+    assert env["PIP_NO_INDEX"] == "1"
+    assert env["PIP_FIND_LINKS"] == str(tmp_path / "wheels")
+
+
+def test_wheelhouse_env_installs_from_wheelhouse_only():
+    env = wheelhouse_env("wheels", {"PATH": "/bin"})
+    assert env == {
+        "PATH": "/bin",
+        "PIP_NO_INDEX": "1",
+        "PIP_FIND_LINKS": str(Path("wheels").absolute()),
+    }
@@ -0,0 +1,107 @@
+"""Tests for the history module."""
+from pathlib import Path
+from typing import Any
+
+from kfp_local.history import (
+    format_comparison,
+    format_run,
+    format_runs,
+    get_run,
+    query_runs,
+    record_run,
+)
+from kfp_local.report import TaskRecord
+
+
+def _record(task: str, start: float, end: float, status: str = "succeeded"):
+    return TaskRecord(task, status, 0, start, start, end, 0.1, end - start, 0.1, 0, 1)
+
+
+def _executor_input(seed: int) -> str:
+    return f'{{"inputs": {{"parameterValues": {{"seed": {seed}}}}}, "outputs": {{}}}}'
+
+
+def _record_run(history: str, run_id: str, pipeline: str, seed: int, t0: float):
+    records = [_record("stage-0", t0, t0 + 1.0), _record("stage-1", t0 + 1, t0 + 3)]
+    manifest: dict[str, dict[str, Any]] = {
+        "stage-0": {"fingerprint": "a", "outputs": {"out/data": {"digest": "123"}}},
+        "stage-1": {"fingerprint": f"b{seed}"},
+    }
+    executor_inputs = {task: _executor_input(seed) for task in manifest}
+    record_run(
+        run_id,
+        pipeline,
+        "root",
+        "succeeded",
+        {"seed": seed},
+        records,
+        manifest,
+        executor_inputs,
+        history,
+    )
+
+
+def test_record_run_stores_runs_tasks_and_artifacts(tmp_path: Path):
+    history = str(tmp_path / "history.db")
+    assert get_run("run-1", history) is None
+    _record_run(history, "run-1", "foo", 1, 100.0)
+
+    run = get_run("run-1", history)
+    assert run is not None
+    assert run["pipeline_name"] == "foo"
+    assert run["params"] == {"seed": 1}
+    assert run["end_time"] - run["start_time"] == 3.0
+    assert [task["task"] for task in run["tasks"]] == ["stage-0", "stage-1"]
+    assert run["tasks"][1]["parameters"] == {"seed": 1}
+    assert run["tasks"][1]["run_time"] == 2.0
+    assert run["tasks"][0]["artifacts"][0]["digest"] == "123"
+    assert "stage-1" in format_run(run)
+
+
+def test_record_run_updates_resumed_runs(tmp_path: Path):
+    history = str(tmp_path / "history.db")
+    _record_run(history, "run-1", "foo", 1, 100.0)
+    records = [
+        _record("stage-0", 200.0, 200.0, "skipped"),
+        _record("stage-1", 200.0, 205.0),
+    ]
+    record_run("run-1", "foo", "root", "failed", {}, records, {}, {}, history)
+
+    run = get_run("run-1", history)
+    assert run is not None
+    assert run["status"] == "failed"
+    assert run["end_time"] - run["start_time"] == 105.0
+    stage_0, stage_1 = run["tasks"]
+    assert stage_0["end_time"] == 101.0
+    assert stage_1["end_time"] == 205.0
+
+
+def test_query_runs_filters_by_pipeline_and_task(tmp_path: Path):
+    history = str(tmp_path / "history.db")
+    assert query_runs(path=history) == []
+    for n in range(5):
+        _record_run(history, f"run-{n}", "foo" if n % 2 else "bar", n, n * 10.0)
+
+    runs = query_runs(limit=3, path=history)
+    assert [run["run_id"] for run in runs] == ["run-4", "run-3", "run-2"]
+    assert all(run["n_tasks"] == 2 for run in runs)
+
+    runs = query_runs("foo", "stage-1", path=history)
+    assert [run["run_id"] for run in runs] == ["run-3", "run-1"]
+    assert [run["task_time"] for run in runs] == [2.0, 2.0]
+    assert "task duration" in format_runs(runs)
+
+
+def test_format_comparison_shows_changes_between_runs(tmp_path: Path):
+    history = str(tmp_path / "history.db")
+    _record_run(history, "run-1", "foo", 1, 100.0)
+    _record_run(history, "run-2", "foo", 2, 200.0)
+    comparison = format_comparison(
+        get_run("run-1", history), get_run("run-2", history)  # type: ignore
+    )
+    lines = comparison.splitlines()
+    assert any(line.split() == ["seed", "1", "2"] for line in lines)
+    stage_0 = next(line for line in lines if line.startswith("stage-0"))
+    stage_1 = next(line for line in lines if line.startswith("stage-1"))
+    assert stage_0.endswith("same")
+    assert stage_1.endswith("different")
@@ -0,0 +1,66 @@
+"""Tests for the kfpl_artifacts runtime module."""
+import hashlib
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from pytest import importorskip, raises
+
+from kfp_local._runtime.kfpl_artifacts import (
+    artifact_path,
+    describe_artifact,
+    iter_chunks,
+    map_array,
+    map_artifact,
+    write_array,
+)
+
+
+class Artifact(NamedTuple):
+    """Stand-in for a KFP artifact."""
+
+    path: str
+    metadata: dict[str, Any]
+
+
+def test_artifact_path_accepts_paths_and_artifacts(tmp_path: Path):
+    assert artifact_path(str(tmp_path)) == tmp_path
+    assert artifact_path(tmp_path) == tmp_path
+    assert artifact_path(Artifact(str(tmp_path / "data"), {})) == tmp_path / "data"
+
+
+def test_map_artifact_and_iter_chunks_read_files(tmp_path: Path):
+    data = tmp_path / "data"
+    data.write_bytes(b"0123456789")
+    with map_artifact(data) as mapped:
+        assert mapped[2:5] == b"234"
+        with raises(TypeError):
+            mapped[0] = 1  # type: ignore
+    assert list(iter_chunks(data, chunk_size=4)) == [b"0123", b"4567", b"89"]
+    assert describe_artifact(data) == {
+        "size": 10,
+        "sha256": hashlib.sha256(b"0123456789").hexdigest(),
+    }
+
+    data.write_bytes(b"")
+    with raises(ValueError, match="can't map empty artifact"):
+        map_artifact(data)
+
+
+def test_write_array_records_metadata_for_map_array(tmp_path: Path):
+    np = importorskip("numpy")
+    artifact = Artifact(str(tmp_path / "task" / "data"), {})
+    array = np.arange(12, dtype=np.float32).reshape(3, 4)
+    write_array(artifact, array)
+    assert artifact.metadata["dtype"] == "<f4"
+    assert artifact.metadata["shape"] == [3, 4]
+    assert artifact.metadata["size"] == 48
+
+    mapped = map_array(artifact)
+    assert isinstance(mapped, np.memmap)
+    assert mapped.shape == (3, 4)
+    assert not mapped.flags.writeable
+    assert (mapped == array).all()
+    assert map_array(artifact.path, dtype="<f4").shape == (12,)
+
+    with raises(ValueError, match="set dtype"):
+        map_array(artifact.path)
@@ -0,0 +1,106 @@
+"""Tests for the launcher module."""
+import os
+import sys
+from pathlib import Path
+
+from kfp_local.launcher import (
+    MAX_INLINE_EXECUTOR_INPUT,
+    TaskLog,
+    executor_input_arg,
+    executor_input_file,
+    preamble_command,
+    run_process,
+    task_env,
+)
+
+
+def test_run_process_measures_resource_usage():
+    code = "bytearray(64 * 1024 * 1024); sum(range(10**6))"
+    usage = run_process([sys.executable, "-c", code])
+    assert usage.exit_code == 0
+    assert usage.wall_time > 0
+    assert usage.user_time + usage.sys_time > 0
+    assert usage.max_rss > 64 * 1024 * 1024
+
+
+def test_run_process_returns_exit_code_of_failed_process():
+    usage = run_process([sys.executable, "-c", "import sys; sys.exit(3)"])
+    assert usage.exit_code == 3
+
+
+def test_run_process_streams_output_to_task_log(tmp_path: Path, capsys):
+    code = (
+        "import sys; "
+        "print('foo'); "
+        "print('bar', file=sys.stderr); "
+        "print('x' * 200_000); "
+        "print('no newline', end='')"
+    )
+    log_file = tmp_path / "logs" / "task.log"
+    with TaskLog("task", log_file) as log:
+        assert run_process([sys.executable, "-c", code], log=log).exit_code == 0
+
+    captured = capsys.readouterr()
+    assert "[task] foo\n" in captured.out
+    assert "[task] bar\n" in captured.err
+    assert "[task] no newline\n" in captured.out
+    stdout_lines = captured.out.splitlines()
+    assert all(line.startswith("[task] ") for line in stdout_lines)
+    assert "".join(line[7:] for line in stdout_lines).count("x") == 200_000
+
+    log_lines = log_file.read_text().splitlines()
+    assert sorted(log_lines) == sorted(["foo", "bar", "x" * 200_000, "no newline"])
+
+
+def test_task_log_writes_captured_output(tmp_path: Path, capsys):
+    log_file = tmp_path / "task.log"
+    with TaskLog("task", log_file) as log:
+        log.write("foo\nbar\n", sys.stdout)
+    assert capsys.readouterr().out == "[task] foo\n[task] bar\n"
+    assert log_file.read_text() == "foo\nbar\n"
+
+
+def test_preamble_command_runs_preamble_without_task():
+    preamble = 'echo preamble > /dev/null && "$0" "$@"'
+    assert run_process(preamble_command(preamble)).exit_code == 0
+    assert run_process(preamble_command('false && "$0" "$@"')).exit_code == 1
+
+
+def test_task_env_maps_artifact_uris_onto_local_paths(tmp_path: Path):
+    code = (
+        "from kfp.dsl import Dataset; "
+        "import sys; "
+        "sys.exit(Dataset(uri='gs://bucket/data').path != 'bucket/data')"
+    )
+    assert run_process([sys.executable, "-c", code], env=task_env()).exit_code == 0
+    assert run_process([sys.executable, "-c", code]).exit_code == 1
+
+
+def test_task_env_imports_shadowed_sitecustomize(tmp_path: Path):
+    (tmp_path / "sitecustomize.py").write_text("import os; os.environ['FOO'] = '1'")
+    env = task_env({**os.environ, "PYTHONPATH": str(tmp_path)})
+    assert env["PYTHONPATH"].endswith(str(tmp_path))
+    code = "import os, sys; sys.exit(os.environ.get('FOO') != '1')"
+    assert run_process([sys.executable, "-c", code], env=env).exit_code == 0
+
+
+def test_executor_input_arg_writes_large_inputs_to_file(tmp_path: Path):
+    input_file = tmp_path / "inputs" / "task.json"
+    assert executor_input_arg('{"inputs": {}}', input_file) == '{"inputs": {}}'
+    assert not input_file.exists()
+
+    executor_input = '{"inputs": "%s"}' % ("x" * MAX_INLINE_EXECUTOR_INPUT)
+    arg = executor_input_arg(executor_input, input_file)
+    assert arg == f"@{input_file}"
+    assert input_file.read_text() == executor_input
+    cmd = ["sh", "-c", "...", "--executor_input", arg, "--function_to_execute", "f"]
+    assert executor_input_file(cmd) == input_file
+    assert executor_input_file(["--executor_input", '{"inputs": {}}']) is None
+
+
+def test_task_env_reads_executor_input_from_file(tmp_path: Path):
+    executor_input = '{"inputs": "%s"}' % ("x" * 1024 * 1024)
+    arg = executor_input_arg(executor_input, tmp_path / "task.json")
+    code = "import sys; sys.exit(sys.argv[2] != open(sys.argv[3]).read())"
+    cmd = [sys.executable, "-c", code, "--executor_input", arg, arg[1:]]
+    assert run_process(cmd, env=task_env()).exit_code == 0
@@ -0,0 +1,82 @@
+"""Tests for the manifest module."""
+import json
+from pathlib import Path
+
+from kfp_local.manifest import (
+    FAILED,
+    PENDING,
+    RUNNING,
+    SUCCEEDED,
+    RunManifest,
+)
+
+
+def _executor_input(run_dir: Path) -> str:
+    return json.dumps(
+        {
+            "inputs": {},
+            "outputs": {
+                "artifacts": {
+                    "data": {
+                        "artifacts": [{"name": "data", "uri": f"gs://{run_dir}/t/data"}]
+                    }
+                },
+                "outputFile": f"{run_dir}/t/output_metadata.json",
+            },
+        }
+    )
+
+
+def _write_outputs(run_dir: Path) -> None:
+    (run_dir / "t").mkdir(exist_ok=True)
+    (run_dir / "t" / "data").write_text("data")
+    (run_dir / "t" / "output_metadata.json").write_text("{}")
+
+
+def test_run_manifest_records_task_states_and_persists_them(tmp_path: Path):
+    manifest = RunManifest(tmp_path)
+    assert manifest.state("t") == PENDING
+    manifest.record("t", RUNNING, "fp")
+    assert manifest.state("t") == RUNNING
+    manifest.record("t", FAILED, "fp")
+    assert RunManifest(tmp_path).state("t") == FAILED
+
+
+def test_run_manifest_validates_succeeded_tasks(tmp_path: Path):
+    _write_outputs(tmp_path)
+    manifest = RunManifest(tmp_path)
+    assert not manifest.is_valid("t", "fp")
+
+    manifest.record("t", SUCCEEDED, "fp", _executor_input(tmp_path))
+    manifest = RunManifest(tmp_path)
+    assert manifest.is_valid("t", "fp")
+    assert not manifest.is_valid("t", "different-inputs")
+
+
+def test_run_manifest_invalidates_tasks_with_modified_outputs(tmp_path: Path):
+    _write_outputs(tmp_path)
+    manifest = RunManifest(tmp_path)
+    manifest.record("t", SUCCEEDED, "fp", _executor_input(tmp_path))
+
+    (tmp_path / "t" / "data").write_text("data")
+    assert manifest.is_valid("t", "fp")
+
+    (tmp_path / "t" / "data").write_text("new data")
+    assert not manifest.is_valid("t", "fp")
+
+    (tmp_path / "t" / "data").unlink()
+    assert not manifest.is_valid("t", "fp")
+
+
+def test_run_manifest_invalidates_tasks_with_files_modified_in_output_dirs(
+    tmp_path: Path,
+):
+    (tmp_path / "t" / "data" / "weights").mkdir(parents=True)
+    (tmp_path / "t" / "data" / "weights" / "layer").write_text("data")
+    (tmp_path / "t" / "output_metadata.json").write_text("{}")
+    manifest = RunManifest(tmp_path)
+    manifest.record("t", SUCCEEDED, "fp", _executor_input(tmp_path))
+    assert manifest.is_valid("t", "fp")
+
+    (tmp_path / "t" / "data" / "weights" / "layer").write_text("atad")
+    assert not manifest.is_valid("t", "fp")
@@ -0,0 +1,45 @@
+"""Tests for the param_types module."""
+from kfp.dsl.types import type_utils
+from pytest import mark
+
+from kfp_local import param_types
+from kfp_local.param_types import (
+    BOOLEAN,
+    LIST,
+    NUMBER_DOUBLE,
+    NUMBER_INTEGER,
+    STRING,
+    STRUCT,
+    Placeholder,
+    matches_type,
+)
+
+
+def test_param_types_match_kfp():
+    names = ["NUMBER_DOUBLE", "NUMBER_INTEGER", "STRING", "BOOLEAN", "LIST", "STRUCT"]
+    for name in names:
+        assert getattr(param_types, name) == getattr(type_utils, name)
+
+
+@mark.parametrize(
+    "value, parameter_type, expected",
+    [
+        (1, NUMBER_INTEGER, True),
+        (1.0, NUMBER_INTEGER, True),
+        (1.5, NUMBER_INTEGER, False),
+        (True, NUMBER_INTEGER, False),
+        (1, NUMBER_DOUBLE, True),
+        ("1", NUMBER_DOUBLE, False),
+        ("foo", STRING, True),
+        (False, BOOLEAN, True),
+        (0, BOOLEAN, False),
+        ([1], LIST, True),
+        ({"a": 1}, STRUCT, True),
+        ({"a": 1}, LIST, False),
+        (Placeholder("{{x}}", NUMBER_INTEGER), NUMBER_DOUBLE, True),
+        (Placeholder("{{x}}", STRING), NUMBER_DOUBLE, False),
+        (Placeholder("{{x}}"), STRUCT, True),
+    ],
+)
+def test_matches_type(value, parameter_type, expected):
+    assert matches_type(value, parameter_type) == expected
@@ -1,11 +1,13 @@
 """Basic tests for run_pipeline module."""
 import json
-import shutil
+import sqlite3
 from pathlib import Path
 from subprocess import CalledProcessError, run
 from typing import Any
 from unittest.mock import patch
 
+from google.protobuf.struct_pb2 import Value
+from kfp.dsl.types import artifact_types
 from kfp.dsl.types.type_utils import (
     BOOLEAN,
     LIST,
@@ -17,8 +19,10 @@ from kfp.dsl.types.type_utils import (
 from kfp.pipeline_spec.pipeline_spec_pb2 import PipelineSpec
 from pytest import fixture, mark, raises
 
+from kfp_local.dags import ROOT_SCOPE, Scope
+from kfp_local.history import get_run, query_runs
+from kfp_local.launcher import ProcessUsage
 from kfp_local.pipelines import (
-    LOCAL_FOLDER,
     _extract_value,
     _get_func_args,
     _get_param_value,
@@ -27,9 +31,29 @@ from kfp_local.pipelines import (
     get_task_cmd_args,
     load_pipeline_spec,
     run_pipeline,
+    run_sweep,
 )
+from kfp_local.resources import ResourcePool
+from kfp_local.scheduler import run_dag
+from kfp_local.spec import get_index
 
 TEST_CONFIG_FILE = "tests/resources/pipeline.json"
+TEST_LOOP_CONFIG_FILE = "tests/resources/loop_pipeline.json"
+TEST_CONDITION_CONFIG_FILE = "tests/resources/condition_pipeline.json"
+
+SUCCESS = ProcessUsage(0, 0.0, 0.0, 0.0, 0)
+
+
+def _fail_on_stage_2(
+    pipeline: PipelineSpec,
+    task_name: str,
+    run_dir: str,
+    scope: Scope = ROOT_SCOPE,
+    outputs: dict[str, dict[str, Any]] | None = None,
+) -> str:
+    if task_name == "stage-2":
+        raise ValueError("stage-2 is broken")
+    return _get_func_args(pipeline, task_name, run_dir, scope, outputs)
 
 
 @fixture(scope="function")
@@ -96,6 +120,18 @@ def test_extract_value(param_type, expected_type):
     assert type(_extract_value(TestParamObj(), param_type)) == expected_type
 
 
+def test_extract_value_converts_nested_lists_and_structs():
+    param_obj = Value()
+    param_obj.struct_value.update({"a": [1, {"b": 2}], "c": {"d": ["e"]}})
+    value = _extract_value(param_obj, STRUCT)
+    assert value == {"a": [1, {"b": 2}], "c": {"d": ["e"]}}
+    json.dumps(value)
+
+    param_obj = Value()
+    param_obj.list_value.extend([[1, 2], {"a": "b"}])
+    assert _extract_value(param_obj, LIST) == [[1, 2], {"a": "b"}]
+
+
 def test_get_param_value_from_metadata_file_returns_correct_values():
     with patch("kfp_local.pipelines.LOCAL_FOLDER", new="tests/resources"):
         param = _get_param_value_from_metadata_file("stage-0")
@@ -168,7 +204,9 @@ def test__get_func_args(pipeline_spec: PipelineSpec):
         "outputs": {
             "artifacts": {
                 "data": {
-                    "artifacts": [{"name": "data", "uri": "gs://tests/resources/data"}]
+                    "artifacts": [
+                        {"name": "data", "uri": "gs://tests/resources/stage-1/data"}
+                    ]
                 }
             },
             "outputFile": "tests/resources/stage-1/output_metadata.json",
@@ -184,7 +222,12 @@ def test__get_func_args(pipeline_spec: PipelineSpec):
             "artifacts": {
                 "data": {
                     "name": "data",
-                    "artifacts": [{"uri": "gs://tests/resources/data"}],
+                    "artifacts": [
+                        {
+                            "uri": "gs://tests/resources/stage-1/data",
+                            "type": {"schemaTitle": "system.Dataset"},
+                        }
+                    ],
                 }
             },
         },
@@ -198,6 +241,37 @@ def test__get_func_args(pipeline_spec: PipelineSpec):
     assert s2_args == s2_args_expected
 
 
+def test__get_func_args_passes_on_artifact_metadata(
+    pipeline_spec: PipelineSpec, tmp_path: Path
+):
+    metadata = {"dtype": "<f8", "shape": [1000]}
+    output_metadata = {"artifacts": {"data": {"artifacts": [{"metadata": metadata}]}}}
+    (tmp_path / "stage-1").mkdir()
+    (tmp_path / "stage-1" / "output_metadata.json").write_text(
+        json.dumps(output_metadata)
+    )
+    s2_args = json.loads(_get_func_args(pipeline_spec, "stage-2", str(tmp_path)))
+    artifact = s2_args["inputs"]["artifacts"]["data"]["artifacts"][0]
+    assert artifact["metadata"] == metadata
+
+
+def test__read_output_metadata_reads_each_file_once(tmp_path: Path):
+    (tmp_path / "stage-0").mkdir()
+    output_metadata = {"parameterValues": {"Output": list(range(1000))}}
+    (tmp_path / "stage-0" / "output_metadata.json").write_text(
+        json.dumps(output_metadata)
+    )
+    outputs: dict[str, dict[str, Any]] = {}
+    with patch("kfp_local.pipelines.json.load", wraps=json.load) as mock_load:
+        for _ in range(3):
+            value = _get_param_value_from_metadata_file(
+                "stage-0", "Output", str(tmp_path), outputs
+            )
+            assert value == output_metadata["parameterValues"]["Output"]
+    assert mock_load.call_count == 1
+    assert outputs == {"stage-0": output_metadata}
+
+
 def test_run_pipeline_raises_error_if_pipeline_spec_schema_version_mismatch():
     with patch("kfp_local.pipelines.SCHEMA_VERSION", new="3.1.0"):
         with raises(RuntimeError, match="schema_version=2.1.0 not supported"):
@@ -209,49 +283,710 @@ def test_run_pipeline_raises_error_if_task_def_missing_from_pipeline_spec():
         run_pipeline(["some-stage"], TEST_CONFIG_FILE)
 
 
-def test_run_pipeline_raises_error_if_task_execution_fails():
+def test_run_pipeline_raises_error_if_task_execution_fails(
+    tmp_path: Path, cache_dir: str, history: str
+):
     with patch("kfp_local.pipelines._get_func_args") as mock__get_func_args:
         mock__get_func_args.side_effect = Exception()
         with raises(RuntimeError, match="task=stage-0 failed to execute"):
-            run_pipeline(["stage-0"], TEST_CONFIG_FILE)
+            run_pipeline(
+                ["stage-0"],
+                TEST_CONFIG_FILE,
+                root=str(tmp_path),
+                cache_dir=cache_dir,
+                history=history,
+            )
 
 
-def test_run_pipeline_end_to_end_with_dev_venv():
+def test_run_pipeline_end_to_end_with_dev_venv(
+    tmp_path: Path, cache_dir: str, history: str
+):
     dag = ["stage-0", "stage-1", "stage-2", "stage-3"]
-    try:
-        run_pipeline(dag, TEST_CONFIG_FILE, use_nox=False)
-        final_stage_output = Path(LOCAL_FOLDER) / "stage-3" / "output_metadata.json"
-        assert final_stage_output.exists()
-    except Exception:
-        assert False
-    finally:
-        shutil.rmtree(LOCAL_FOLDER, ignore_errors=True)
+    run_id = run_pipeline(
+        dag,
+        TEST_CONFIG_FILE,
+        use_nox=False,
+        use_cache=False,
+        root=str(tmp_path),
+        cache_dir=cache_dir,
+        history=history,
+    )
+    final_stage_output = tmp_path / run_id / "stage-3" / "output_metadata.json"
+    assert final_stage_output.exists()
+
+
+def test_run_pipeline_does_not_modify_installed_kfp(
+    tmp_path: Path, cache_dir: str, history: str
+):
+    kfp_module = Path(artifact_types.__file__)
+    kfp_module_source = kfp_module.read_text()
+    run_id = run_pipeline(
+        ["stage-0", "stage-1"],
+        TEST_CONFIG_FILE,
+        root=str(tmp_path),
+        cache_dir=cache_dir,
+        history=history,
+    )
+    assert (tmp_path / run_id / "stage-1" / "data").exists()
+    assert kfp_module.read_text() == kfp_module_source
+    assert not kfp_module.with_suffix(".py.bak").exists()
+
+
+def test_run_pipeline_end_to_end_with_nox(tmp_path: Path, cache_dir: str, history: str):
+    dag = ["stage-0", "stage-1", "stage-2", "stage-3"]
+    run_id = run_pipeline(
+        dag,
+        TEST_CONFIG_FILE,
+        use_nox=True,
+        use_cache=False,
+        root=str(tmp_path),
+        cache_dir=cache_dir,
+        history=history,
+    )
+    final_stage_output = tmp_path / run_id / "stage-3" / "output_metadata.json"
+    assert final_stage_output.exists()
+
+
+def test_run_pipeline_end_to_end_with_warm_pool(
+    tmp_path: Path, cache_dir: str, history: str
+):
+    dag = ["stage-0", "stage-1", "stage-2", "stage-3"]
+    run_id = run_pipeline(
+        dag,
+        TEST_CONFIG_FILE,
+        use_warm_pool=True,
+        use_cache=False,
+        root=str(tmp_path),
+        cache_dir=cache_dir,
+        history=history,
+    )
+    final_stage_output = tmp_path / run_id / "stage-3" / "output_metadata.json"
+    assert final_stage_output.exists()
+
+
+def test_run_pipeline_passes_large_executor_inputs_in_files(
+    tmp_path: Path, cache_dir: str, history: str
+):
+    config = {"seed_low": 0, "seed_high": 42, "padding": "x" * 256 * 1024}
+    run_id = run_pipeline(
+        ["stage-0"],
+        TEST_CONFIG_FILE,
+        root=str(tmp_path),
+        use_cache=False,
+        params={"config": config},
+        cache_dir=cache_dir,
+        history=history,
+    )
+    run_dir = tmp_path / run_id
+    executor_input = json.loads(
+        (run_dir / "executor_inputs" / "stage-0.json").read_text()
+    )
+    assert executor_input["inputs"]["parameterValues"]["config"] == config
+    assert (run_dir / "stage-0" / "output_metadata.json").exists()
+
+
+def test_run_pipeline_keeps_outputs_from_separate_runs_apart(
+    tmp_path: Path, cache_dir: str, history: str
+):
+    root = str(tmp_path)
+    with patch("kfp_local.pipelines.run_process", return_value=SUCCESS):
+        run_a = run_pipeline(
+            ["stage-0"],
+            TEST_CONFIG_FILE,
+            root=root,
+            use_cache=False,
+            cache_dir=cache_dir,
+            history=history,
+        )
+        run_b = run_pipeline(
+            ["stage-0"],
+            TEST_CONFIG_FILE,
+            root=root,
+            use_cache=False,
+            cache_dir=cache_dir,
+            history=history,
+        )
+    assert run_a != run_b
+    assert (tmp_path / run_a / "run.json").exists()
+    assert (tmp_path / run_b / "run.json").exists()
+
+    pipeline = load_pipeline_spec(TEST_CONFIG_FILE)
+    s2_args = json.loads(_get_func_args(pipeline, "stage-2", f"{root}/{run_a}"))
+    input_uri = s2_args["inputs"]["artifacts"]["data"]["artifacts"][0]["uri"]
+    assert input_uri == f"gs://{root}/{run_a}/stage-1/data"
+    output_file = s2_args["outputs"]["outputFile"]
+    assert output_file == f"{root}/{run_a}/stage-2/output_metadata.json"
 
 
-def test_run_pipeline_end_to_end_with_nox():
+def test_run_pipeline_garbage_collects_old_runs(
+    tmp_path: Path, cache_dir: str, history: str
+):
+    root = str(tmp_path)
+    with patch("kfp_local.pipelines.run_process", return_value=SUCCESS):
+        runs = [
+            run_pipeline(
+                ["stage-0"],
+                TEST_CONFIG_FILE,
+                root=root,
+                keep_runs=2,
+                cache_dir=cache_dir,
+                history=history,
+            )
+            for _ in range(3)
+        ]
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(runs[1:])
+
+
+def test_run_pipeline_resumes_from_first_failed_task(
+    tmp_path: Path, capsys, cache_dir: str, history: str
+):
     dag = ["stage-0", "stage-1", "stage-2", "stage-3"]
-    try:
-        run_pipeline(dag, TEST_CONFIG_FILE, use_nox=True)
-        final_stage_output = Path(LOCAL_FOLDER) / "stage-3" / "output_metadata.json"
-        assert final_stage_output.exists()
-    except Exception:
-        assert False
-    finally:
-        shutil.rmtree(LOCAL_FOLDER, ignore_errors=True)
+    root = str(tmp_path)
+    with patch("kfp_local.pipelines._get_func_args") as mock__get_func_args:
+        mock__get_func_args.side_effect = _fail_on_stage_2
+        with raises(RuntimeError, match="task=stage-2 failed"):
+            run_pipeline(
+                dag,
+                TEST_CONFIG_FILE,
+                root=root,
+                use_cache=False,
+                cache_dir=cache_dir,
+                history=history,
+            )
+
+    run_id = list(tmp_path.iterdir())[0].name
+    manifest = json.loads((tmp_path / run_id / "manifest.json").read_text())
+    assert manifest["stage-1"]["state"] == "succeeded"
+    assert manifest["stage-2"]["state"] == "failed"
+
+    capsys.readouterr()
+    resumed_run_id = run_pipeline(
+        dag,
+        TEST_CONFIG_FILE,
+        root=root,
+        use_cache=False,
+        resume=True,
+        cache_dir=cache_dir,
+        history=history,
+    )
+    stdout = capsys.readouterr().out
+    assert resumed_run_id == run_id
+    assert "task=stage-0 skipped" in stdout
+    assert "task=stage-1 skipped" in stdout
+    assert "task=stage-2 skipped" not in stdout
+    assert (tmp_path / run_id / "stage-3" / "output_metadata.json").exists()
+
+
+def test_run_pipeline_records_runs_in_history(tmp_path: Path, cache_dir: str):
+    history = str(tmp_path / "history.db")
+    dag = ["stage-0", "stage-1"]
+    root = str(tmp_path / "runs")
+    run_id = run_pipeline(
+        dag, TEST_CONFIG_FILE, root=root, history=history, cache_dir=cache_dir
+    )
+
+    recorded = get_run(run_id, history)
+    assert recorded is not None
+    assert recorded["status"] == "succeeded"
+    assert recorded["pipeline_name"] == "foo-then-bar"
+    assert [task["task"] for task in recorded["tasks"]] == dag
+    assert recorded["tasks"][0]["parameters"]["run_id"] == "001"
+    assert recorded["tasks"][1]["fingerprint"] is not None
+    assert query_runs(task="stage-1", path=history)[0]["run_id"] == run_id
+
+    out = run(
+        ["kfpl", "runs", "--history", history, "show", run_id],
+        capture_output=True,
+        text=True,
+    )
+    assert out.returncode == 0
+    assert "stage-1" in out.stdout
+
+
+def test_run_pipeline_succeeds_if_history_cannot_be_recorded(
+    tmp_path: Path, capsys, cache_dir: str, history: str
+):
+    locked = sqlite3.OperationalError("database is locked")
+    with patch("kfp_local.pipelines.record_run", side_effect=locked):
+        run_id = run_pipeline(
+            ["stage-0"],
+            TEST_CONFIG_FILE,
+            root=str(tmp_path),
+            keep_runs=0,
+            cache_dir=cache_dir,
+            history=history,
+        )
+    stdout = capsys.readouterr().out
+    assert f"WARNING: run_id={run_id} not recorded in history" in stdout
+    assert not (tmp_path / run_id).exists()
+
+
+def test_run_pipeline_raises_error_if_no_run_to_resume(
+    tmp_path: Path, cache_dir: str, history: str
+):
+    with raises(RuntimeError, match="couldn't find a run to resume"):
+        run_pipeline(
+            ["stage-0"],
+            TEST_CONFIG_FILE,
+            root=str(tmp_path),
+            resume=True,
+            cache_dir=cache_dir,
+            history=history,
+        )
+
+
+def test_run_pipeline_runs_targets_with_minimal_upstream_closure(
+    tmp_path: Path, cache_dir: str, history: str
+):
+    root = str(tmp_path)
+    run_id = run_pipeline(
+        [],
+        TEST_CONFIG_FILE,
+        root=root,
+        targets=["stage-1"],
+        cache_dir=cache_dir,
+        history=history,
+    )
+    manifest = json.loads((tmp_path / run_id / "manifest.json").read_text())
+    assert sorted(manifest) == ["stage-0", "stage-1"]
+
+    with patch("kfp_local.pipelines.run_process", return_value=SUCCESS) as mock_run:
+        run_pipeline(
+            [],
+            TEST_CONFIG_FILE,
+            root=root,
+            run_id=run_id,
+            targets=["stage-2"],
+            cache_dir=cache_dir,
+            history=history,
+        )
+    executed = [
+        call.args[0][-1]
+        for call in mock_run.call_args_list
+        if "--executor_input" in call.args[0]
+    ]
+    assert executed == ["stage_2"]
+
 
+def test_run_pipeline_reports_task_timings(
+    tmp_path: Path, capsys, cache_dir: str, history: str
+):
+    dag = ["stage-0", "stage-1"]
+    run_id = run_pipeline(
+        dag,
+        TEST_CONFIG_FILE,
+        root=str(tmp_path),
+        use_cache=False,
+        cache_dir=cache_dir,
+        history=history,
+    )
+    stdout = capsys.readouterr().out
+    assert "critical path: stage-0 -> stage-1" in stdout
+
+    timings = json.loads((tmp_path / run_id / "timings.json").read_text())
+    assert [task["task"] for task in timings["tasks"]] == dag
+    for task in timings["tasks"]:
+        assert task["status"] == "succeeded"
+        assert task["exit_code"] == 0
+        assert task["run_time"] > 0
+        assert task["max_rss"] > 0
+    # both tasks share a pip preamble, which is only run by the first of them
+    setup_times = [task["setup_time"] for task in timings["tasks"]]
+    assert setup_times[0] > 0 and setup_times[1] == 0
+    assert timings["critical_path"] == dag
+
+    assert "[stage-0] RUN_ID = 001" in stdout
+    stage_0_log = (tmp_path / run_id / "logs" / "stage-0.log").read_text()
+    assert "RUN_ID = 001" in stage_0_log
+    assert "[stage-0]" not in stage_0_log
+
+    trace = json.loads((tmp_path / run_id / "trace.json").read_text())
+    assert {"stage-0", "stage-1"} <= {event["name"] for event in trace["traceEvents"]}
+
+
+def test_run_pipeline_expands_parallel_for_loops(
+    tmp_path: Path, cache_dir: str, history: str
+):
+    tasks = ["make-items", "for-loop-2", "total", "read-all", "for-loop-3"]
+    run_id = run_pipeline(
+        tasks,
+        TEST_LOOP_CONFIG_FILE,
+        root=str(tmp_path),
+        use_warm_pool=True,
+        cache_dir=cache_dir,
+        history=history,
+    )
+    run_dir = tmp_path / run_id
+
+    def output(task: str) -> Any:
+        metadata = json.loads((run_dir / task / "output_metadata.json").read_text())
+        return metadata["parameterValues"]["Output"]
+
+    assert [output(f"for-loop-2/{n}/square") for n in range(4)] == [2, 5, 10, 17]
+    assert output("total") == 34
+    assert output("read-all") == 34
+    assert [output(f"for-loop-3/{n}/echo") for n in range(3)] == [
+        "item-0",
+        "item-1",
+        "item-2",
+    ]
+
+    manifest = json.loads((run_dir / "manifest.json").read_text())
+    assert manifest["for-loop-2"]["state"] == "succeeded"
+    assert manifest["for-loop-2/3/square"]["state"] == "succeeded"
+
+    timings = json.loads((run_dir / "timings.json").read_text())
+    loop_tasks = [
+        task for task in timings["tasks"] if task["task"].startswith("for-loop-2/")
+    ]
+    assert len(loop_tasks) == 4
+    for task in loop_tasks:
+        running = [t for t in loop_tasks if t["start"] <= task["start"] < t["end"]]
+        assert len(running) <= 2
+
+
+def test_run_pipeline_launches_every_iteration_of_unlimited_loops(
+    tmp_path: Path, cache_dir: str
+):
+    tasks = ["make-items", "for-loop-3"]
+    with patch("kfp_local.pipelines.run_dag", wraps=run_dag) as mock_run_dag:
+        run_pipeline(
+            tasks,
+            TEST_LOOP_CONFIG_FILE,
+            root=str(tmp_path),
+            use_cache=False,
+            history=None,
+            use_warm_pool=True,
+            max_workers=1,
+            cache_dir=cache_dir,
+        )
+    loop_calls = [call for call in mock_run_dag.call_args_list if "0" in call.args[0]]
+    assert [call.args[2] for call in loop_calls] == [3]
+
+
+def test_run_pipeline_reads_the_outputs_of_each_task_once(
+    tmp_path: Path, cache_dir: str, history: str
+):
+    tasks = ["make-items", "for-loop-2", "total", "read-all", "for-loop-3"]
+    with patch("kfp_local.pipelines.json.load", wraps=json.load) as mock_load:
+        run_id = run_pipeline(
+            tasks,
+            TEST_LOOP_CONFIG_FILE,
+            root=str(tmp_path),
+            use_warm_pool=True,
+            cache_dir=cache_dir,
+            history=history,
+        )
+    files_read = [
+        Path(call.args[0].name).parent.relative_to(tmp_path / run_id).as_posix()
+        for call in mock_load.call_args_list
+    ]
+    assert sorted(files_read) == sorted(set(files_read))
+    assert {"make-items", "for-loop-2/0/square", "total"} <= set(files_read)
+    assert "for-loop-2" not in files_read
+
+
+def test_run_pipeline_prunes_branches_with_false_conditions(
+    tmp_path: Path, capsys, cache_dir: str
+):
+    run_id = run_pipeline(
+        [],
+        TEST_CONDITION_CONFIG_FILE,
+        root=str(tmp_path),
+        use_warm_pool=True,
+        targets=["describe", "condition-6"],
+        params={"score": 0.2, "retrain": True},
+        history=None,
+        cache_dir=cache_dir,
+    )
+    run_dir = tmp_path / run_id
+
+    def output(task: str) -> Any:
+        metadata = json.loads((run_dir / task / "output_metadata.json").read_text())
+        return metadata["parameterValues"]["Output"]
+
+    manifest = json.loads((run_dir / "manifest.json").read_text())
+    assert manifest["condition-branches-1/condition-3"]["state"] == "pruned"
+    assert manifest["condition-branches-1/condition-4"]["state"] == "pruned"
+    assert "condition-branches-1/condition-3/fit" not in manifest
+    assert output("condition-branches-1/condition-5/fit-3") == "fallback"
+    assert output("describe") == "fallback"
+    assert output("condition-6/echo-2") == "retrain"
+
+    branches = json.loads(
+        (run_dir / "condition-branches-1" / "output_metadata.json").read_text()
+    )
+    assert list(branches["parameterValues"].values()) == ["fallback"]
+    assert "task=condition-branches-1/condition-3 pruned" in capsys.readouterr().out
+
+
+def test_run_pipeline_overrides_pipeline_inputs(
+    tmp_path: Path, cache_dir: str, history: str
+):
+    run_id = run_pipeline(
+        ["stage-0"],
+        TEST_CONFIG_FILE,
+        root=str(tmp_path),
+        params={"run_id": "007"},
+        cache_dir=cache_dir,
+        history=history,
+    )
+    run_info = json.loads((tmp_path / run_id / "run.json").read_text())
+    assert run_info["params"] == {"run_id": "007"}
+
+    pipeline = load_pipeline_spec(TEST_CONFIG_FILE)
+    scope = Scope(ROOT_SCOPE.dag, "", {"run_id": "007"}, {})
+    assert _get_param_value(pipeline, "stage-0", "run_id", None, scope) == "007"
+    assert _get_param_value(pipeline, "stage-0", "run_id") == "001"
+
+    with raises(RuntimeError, match="unknown pipeline inputs: foo"):
+        run_pipeline(
+            ["stage-0"],
+            TEST_CONFIG_FILE,
+            params={"foo": 1},
+            root=str(tmp_path),
+            cache_dir=cache_dir,
+            history=history,
+        )
+
+
+def test_run_pipeline_requires_pipeline_inputs_without_defaults(
+    tmp_path: Path, cache_dir: str, history: str
+):
+    spec = json.loads(Path(TEST_CONFIG_FILE).read_text())
+    run_id_input = spec["root"]["inputDefinitions"]["parameters"]["run_id"]
+    del run_id_input["defaultValue"]
+    run_id_input["isOptional"] = False
+    pipeline_file = tmp_path / "pipeline.json"
+    pipeline_file.write_text(json.dumps(spec))
+
+    pipeline = load_pipeline_spec(str(pipeline_file))
+    assert get_index(pipeline).pipeline_inputs["run_id"].default_value is None
+    with raises(RuntimeError, match="missing required pipeline inputs: run_id"):
+        run_pipeline(
+            ["stage-0"],
+            str(pipeline_file),
+            root=str(tmp_path / "runs"),
+            cache_dir=cache_dir,
+            history=history,
+        )
+
+    run_id = run_pipeline(
+        ["stage-0"],
+        str(pipeline_file),
+        root=str(tmp_path / "runs"),
+        use_cache=False,
+        history=None,
+        params={"run_id": "007"},
+        cache_dir=cache_dir,
+    )
+    log = (tmp_path / "runs" / run_id / "logs" / "stage-0.log").read_text()
+    assert "RUN_ID = 007" in log
+
+
+def test_run_sweep_shares_tasks_with_identical_inputs(
+    tmp_path: Path, capsys, cache_dir: str, history: str
+):
+    tasks = ["make-items", "for-loop-2", "total"]
+    param_sets = [{"offset": 0}, {"offset": 10}]
+    run_ids = run_sweep(
+        tasks,
+        TEST_LOOP_CONFIG_FILE,
+        param_sets,
+        root=str(tmp_path),
+        use_warm_pool=True,
+        keep_runs=1,
+        cache_dir=cache_dir,
+        history=history,
+    )
+    stdout = capsys.readouterr().out
+    assert len(run_ids) == 2
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(run_ids)
+    assert stdout.count("task=make-items outputs shared from run=") == 1
+    assert "task=for-loop-2/0/square outputs shared" not in stdout
+
+    def output(run_id: str, task: str) -> Any:
+        output_file = tmp_path / run_id / task / "output_metadata.json"
+        return json.loads(output_file.read_text())["parameterValues"]["Output"]
+
+    assert output(run_ids[0], "total") == 30
+    assert output(run_ids[1], "total") == 70
+    assert output(run_ids[0], "make-items") == output(run_ids[1], "make-items")
+
+
+def test_run_sweep_executes_every_task_without_caching(
+    tmp_path: Path, capsys, cache_dir: str, history: str
+):
+    run_ids = run_sweep(
+        ["make-items", "for-loop-2", "total"],
+        TEST_LOOP_CONFIG_FILE,
+        [{"offset": 0}, {"offset": 10}],
+        root=str(tmp_path),
+        use_cache=False,
+        use_warm_pool=True,
+        cache_dir=cache_dir,
+        history=history,
+    )
+    stdout = capsys.readouterr().out
+    assert len(run_ids) == 2
+    assert "outputs shared" not in stdout
+
+
+def test_run_sweep_shared_tasks_wait_without_holding_a_worker(
+    tmp_path: Path, cache_dir: str, history: str
+):
+    def reservations(use_cache: bool) -> int:
+        with patch.object(
+            ResourcePool, "reserve", autospec=True, side_effect=ResourcePool.reserve
+        ) as mock_reserve:
+            run_sweep(
+                ["make-items", "for-loop-2", "total"],
+                TEST_LOOP_CONFIG_FILE,
+                [{"offset": 0}, {"offset": 10}],
+                root=str(tmp_path),
+                use_cache=use_cache,
+                use_warm_pool=True,
+                cache_dir=cache_dir,
+                history=history,
+            )
+        return mock_reserve.call_count
+
+    assert reservations(use_cache=True) == reservations(use_cache=False) - 1
+
+
+def test_run_sweep_raises_error_if_runs_fail(
+    tmp_path: Path, cache_dir: str, history: str
+):
+    with raises(RuntimeError, match="unknown pipeline inputs: foo"):
+        run_sweep(
+            ["stage-0"],
+            TEST_CONFIG_FILE,
+            [{"foo": 1}],
+            root=str(tmp_path),
+            cache_dir=cache_dir,
+            history=history,
+        )
+
+    def fail_for_run_b(
+        pipeline: PipelineSpec,
+        task_name: str,
+        run_dir: str,
+        scope: Scope,
+        outputs: dict[str, dict[str, Any]],
+    ) -> str:
+        if scope.parameters["run_id"] == "b":
+            raise ValueError("run b is broken")
+        return _get_func_args(pipeline, task_name, run_dir, scope, outputs)
+
+    with patch("kfp_local.pipelines._get_func_args") as mock__get_func_args:
+        mock__get_func_args.side_effect = fail_for_run_b
+        with patch("kfp_local.pipelines.run_process", return_value=SUCCESS):
+            with raises(RuntimeError, match="1 of 2 runs failed"):
+                run_sweep(
+                    ["stage-0"],
+                    TEST_CONFIG_FILE,
+                    [{"run_id": "a"}, {"run_id": "b"}],
+                    root=str(tmp_path),
+                    use_cache=False,
+                    cache_dir=cache_dir,
+                    history=history,
+                )
+
+
+def test_run_pipeline_fails_tasks_that_modify_input_artifacts(
+    tmp_path: Path, cache_dir: str, history: str
+):
+    root = str(tmp_path)
+    run_id = run_pipeline(
+        ["stage-0", "stage-1"],
+        TEST_CONFIG_FILE,
+        root=root,
+        cache_dir=cache_dir,
+        history=history,
+    )
+    input_artifact = tmp_path / run_id / "stage-1" / "data"
+
+    def modify_input(cmd: list[str], *args: Any, **kwargs: Any) -> ProcessUsage:
+        if "--executor_input" in cmd:
+            with open(input_artifact, "ab") as file:
+                file.write(b"more data")
+        return SUCCESS
+
+    with patch("kfp_local.pipelines.run_process") as mock_run:
+        mock_run.side_effect = modify_input
+        with raises(RuntimeError, match="input artifacts modified in place.*data"):
+            run_pipeline(
+                ["stage-2"],
+                TEST_CONFIG_FILE,
+                root=root,
+                run_id=run_id,
+                cache_dir=cache_dir,
+                history=history,
+            )
+
+
+def test_run_pipeline_raises_error_if_upstream_outputs_missing(
+    tmp_path: Path, cache_dir: str, history: str
+):
+    with raises(RuntimeError, match="upstream tasks have no outputs.*: stage-1"):
+        run_pipeline(
+            ["stage-2", "stage-3"],
+            TEST_CONFIG_FILE,
+            root=str(tmp_path),
+            cache_dir=cache_dir,
+            history=history,
+        )
+    assert list(tmp_path.iterdir()) == []
 
-def test_cli():
+
+def test_run_pipeline_raises_error_if_nox_and_warm_pool_both_used():
+    with raises(ValueError, match="can't be used together"):
+        run_pipeline(["stage-0"], TEST_CONFIG_FILE, use_nox=True, use_warm_pool=True)
+
+
+def test_run_pipeline_restores_cached_task_outputs(
+    tmp_path: Path, cache_dir: str, history: str
+):
+    root = str(tmp_path)
+    run_id = run_pipeline(
+        ["stage-0"], TEST_CONFIG_FILE, root=root, cache_dir=cache_dir, history=history
+    )
+    output = (tmp_path / run_id / "stage-0" / "output_metadata.json").read_text()
+    with patch("kfp_local.pipelines.run_process") as mock_run:
+        new_run_id = run_pipeline(
+            ["stage-0"],
+            TEST_CONFIG_FILE,
+            root=root,
+            cache_dir=cache_dir,
+            history=history,
+        )
+        assert not mock_run.called
+    new_output_dir = tmp_path / new_run_id / "stage-0"
+    assert (new_output_dir / "output_metadata.json").read_text() == output
+
+    with patch("kfp_local.pipelines.run_process", return_value=SUCCESS) as mock_run:
+        run_pipeline(
+            ["stage-0"],
+            TEST_CONFIG_FILE,
+            use_cache=False,
+            root=root,
+            cache_dir=cache_dir,
+            history=history,
+        )
+        assert mock_run.called
+
+
+def test_cli(tmp_path: Path, cache_dir: str, history: str):
+    cmd = ["kfpl", "stage-0", "stage-1", "--pipeline", TEST_CONFIG_FILE]
+    cmd += ["--root", str(tmp_path), "--cache-dir", cache_dir, "--history", history]
     try:
-        run(["kfpl", "stage-0", "stage-1", "--pipeline", TEST_CONFIG_FILE], check=True)
+        run(cmd, check=True)
         assert True
     except CalledProcessError:
         assert False
 
     try:
-        run(
-            ["kfpl", "stage-0", "stage-1", "--pipeline", TEST_CONFIG_FILE, "--nox"],
-            check=True,
-        )
+        run([*cmd, "--nox"], check=True)
         assert True
     except CalledProcessError:
         assert False
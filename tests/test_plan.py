@@ -0,0 +1,145 @@
+"""Tests for the plan module."""
+import json
+from pathlib import Path
+
+from pytest import raises
+
+from kfp_local.pipelines import run_pipeline
+from kfp_local.plan import (
+    EXECUTE,
+    EXPAND,
+    PRUNE,
+    RESTORE,
+    SKIP,
+    format_plan,
+    plan_pipeline,
+)
+
+TEST_CONFIG_FILE = "tests/resources/pipeline.json"
+TEST_LOOP_CONFIG_FILE = "tests/resources/loop_pipeline.json"
+TEST_CONDITION_CONFIG_FILE = "tests/resources/condition_pipeline.json"
+DAG = ["stage-0", "stage-1", "stage-2", "stage-3"]
+
+
+def test_plan_pipeline_resolves_inputs_using_placeholders(tmp_path: Path):
+    plan = plan_pipeline(
+        DAG, TEST_CONFIG_FILE, root=str(tmp_path), cache_dir=str(tmp_path / "cache")
+    )
+    assert [t.task for t in plan.tasks] == DAG
+    assert [t.action for t in plan.tasks] == [EXECUTE] * 4
+    assert [t.cache for t in plan.tasks] == ["miss", "unknown", "unknown", "unknown"]
+    assert plan.waves() == [[task] for task in DAG]
+    assert plan.problems == []
+    assert not list(tmp_path.iterdir())
+
+    stage_1_input = json.loads(plan.tasks[1].executor_input)  # type: ignore
+    seed = stage_1_input["inputs"]["parameterValues"]["seed"]
+    assert seed == "{{tasks.stage-0.outputs.Output}}"
+    assert f"run_id={plan.run_id}" in format_plan(plan)
+
+
+def test_plan_pipeline_reports_cache_hits_and_resumable_tasks(
+    tmp_path: Path, cache_dir: str
+):
+    root = str(tmp_path)
+    run_id = run_pipeline(
+        DAG[:2], TEST_CONFIG_FILE, root=root, history=None, cache_dir=cache_dir
+    )
+    plan = plan_pipeline(DAG, TEST_CONFIG_FILE, root=root, cache_dir=cache_dir)
+    assert [t.action for t in plan.tasks] == [RESTORE, RESTORE, EXECUTE, EXECUTE]
+    assert [t.cache for t in plan.tasks] == ["hit", "hit", "miss", "unknown"]
+
+    plan = plan_pipeline(
+        DAG, TEST_CONFIG_FILE, root=root, resume=True, cache_dir=cache_dir
+    )
+    assert plan.run_id == run_id
+    assert [t.action for t in plan.tasks] == [SKIP, SKIP, EXECUTE, EXECUTE]
+
+
+def test_plan_pipeline_checks_parameter_types(tmp_path: Path, cache_dir: str):
+    plan = plan_pipeline(
+        ["stage-0"],
+        TEST_CONFIG_FILE,
+        root=str(tmp_path),
+        params={"run_id": 7},
+        cache_dir=cache_dir,
+    )
+    assert plan.problems == ["stage-0: input run_id expects str, got 7"]
+    assert "1 problems:" in format_plan(plan)
+
+
+def test_plan_pipeline_expands_loops_with_known_items(tmp_path: Path, cache_dir: str):
+    plan = plan_pipeline(
+        [],
+        TEST_LOOP_CONFIG_FILE,
+        root=str(tmp_path),
+        targets=["total", "read-all", "for-loop-3"],
+        max_workers=2,
+        cache_dir=cache_dir,
+    )
+    tasks = {t.task: t for t in plan.tasks}
+    assert tasks["for-loop-2"].action == EXPAND
+    assert tasks["for-loop-2"].runner == "4 iterations"
+    assert [f"for-loop-2/{n}/square" in tasks for n in range(4)] == [True] * 4
+    assert tasks["for-loop-3"].runner == "iterations unknown"
+    assert tasks["total"].cache == "unknown"
+    assert sorted(plan.waves()[0]) == [
+        *(f"for-loop-2/{n}/square" for n in range(4)),
+        "make-items",
+    ]
+    assert plan.problems == []
+
+
+def test_plan_pipeline_prunes_branches_with_known_conditions(
+    tmp_path: Path, cache_dir: str, history: str
+):
+    root = str(tmp_path)
+    targets = ["describe", "condition-6"]
+    plan = plan_pipeline(
+        [],
+        TEST_CONDITION_CONFIG_FILE,
+        root=root,
+        targets=targets,
+        cache_dir=cache_dir,
+    )
+    tasks = {t.task: t for t in plan.tasks}
+    assert tasks["condition-6"].action == PRUNE
+    assert tasks["condition-branches-1/condition-4"].runner == "condition unknown"
+    assert tasks["condition-branches-1/condition-4/fit-2"].action == EXECUTE
+    assert "2 branches to prune" in format_plan(plan)
+
+    run_pipeline(
+        ["check-quality"],
+        TEST_CONDITION_CONFIG_FILE,
+        root=root,
+        cache_dir=cache_dir,
+        history=history,
+    )
+    plan = plan_pipeline(
+        [],
+        TEST_CONDITION_CONFIG_FILE,
+        root=root,
+        targets=targets,
+        cache_dir=cache_dir,
+    )
+    tasks = {t.task: t for t in plan.tasks}
+    assert tasks["check-quality"].action == RESTORE
+    assert tasks["condition-branches-1/condition-3"].runner == "condition true"
+    assert tasks["condition-branches-1/condition-4"].action == PRUNE
+    assert tasks["condition-branches-1/condition-5"].action == PRUNE
+    assert "condition-branches-1/condition-5/fit-3" not in tasks
+    assert plan.waves() == [
+        ["check-quality"],
+        ["condition-branches-1/condition-3/fit"],
+        ["describe"],
+    ]
+    assert plan.problems == []
+
+
+def test_plan_pipeline_raises_error_if_upstream_outputs_missing(
+    tmp_path: Path, cache_dir: str
+):
+    with raises(RuntimeError, match="upstream tasks have no outputs"):
+        plan_pipeline(
+            ["stage-1"], TEST_CONFIG_FILE, root=str(tmp_path), cache_dir=cache_dir
+        )
@@ -0,0 +1,78 @@
+"""Tests for the report module."""
+import json
+from pathlib import Path
+
+from kfp_local.launcher import ProcessUsage
+from kfp_local.report import (
+    TaskRecord,
+    critical_path,
+    format_summary,
+    task_record,
+    write_timings,
+    write_trace,
+)
+
+
+def _record(task: str, ready: float, start: float, end: float) -> TaskRecord:
+    return task_record(task, "succeeded", ready, start, end)
+
+
+def test_task_record_combines_setup_and_run_usage():
+    setup = [ProcessUsage(0, 2.0, 1.0, 0.5, 100)]
+    run = [ProcessUsage(0, 3.0, 2.0, 0.25, 300)]
+    record = task_record("a", "succeeded", 0.0, 1.0, 6.0, setup, run)
+    assert record.exit_code == 0
+    assert record.queue_time == 1.0
+    assert record.setup_time == 2.0
+    assert record.run_time == 3.0
+    assert record.user_time == 3.0
+    assert record.sys_time == 0.75
+    assert record.max_rss == 300
+
+
+def test_critical_path_follows_slowest_chain_of_tasks():
+    graph = {"a": set(), "b": {"a"}, "c": {"a"}, "d": {"b", "c"}}
+    records = {
+        "a": _record("a", 0.0, 0.0, 1.0),
+        "b": _record("b", 1.0, 1.0, 2.0),
+        "c": _record("c", 1.0, 1.0, 5.0),
+        "d": _record("d", 5.0, 5.0, 6.0),
+    }
+    assert critical_path(graph, records) == ["a", "c", "d"]
+    del records["d"]
+    assert critical_path(graph, records) == ["a", "c"]
+    assert critical_path(graph, {}) == []
+
+
+def test_format_summary_lists_tasks_and_critical_path():
+    records = [_record("b", 1.0, 1.5, 2.0), _record("a", 0.0, 0.0, 1.0)]
+    summary = format_summary(records, ["a", "b"]).splitlines()
+    assert summary[0].split() == [
+        "task", "status", "queued", "setup", "run", "user", "sys", "peak", "rss"
+    ]  # fmt: skip
+    assert summary[2].startswith("a ")
+    assert summary[3].split()[:3] == ["b", "succeeded", "0.50s"]
+    assert summary[-1] == "critical path: a -> b (1.50s)"
+
+
+def test_write_timings_and_trace(tmp_path: Path):
+    records = [
+        _record("a", 0.0, 0.0, 2.0),
+        _record("b", 0.0, 0.5, 1.0),
+        _record("c", 2.0, 2.0, 3.0),
+    ]
+    timings_file = write_timings(tmp_path, records, ["a", "c"])
+    timings = json.loads(timings_file.read_text())
+    assert [task["task"] for task in timings["tasks"]] == ["a", "b", "c"]
+    assert timings["tasks"][1]["queue_time"] == 0.5
+    assert timings["critical_path"] == ["a", "c"]
+
+    trace_file = write_trace(tmp_path, records)
+    events = json.loads(trace_file.read_text())["traceEvents"]
+    lanes = {
+        event["name"]: event["tid"] for event in events if event["name"] != "queued"
+    }
+    assert lanes["a"] != lanes["b"]
+    assert lanes["c"] in (lanes["a"], lanes["b"])
+    queued = [event for event in events if event["name"] == "queued"]
+    assert len(queued) == 1 and queued[0]["dur"] == 0.5e6
@@ -0,0 +1,156 @@
+"""Tests for the resources module."""
+import subprocess
+import sys
+import threading
+import time
+
+from pytest import mark
+
+from kfp_local.launcher import run_process
+from kfp_local.pipelines import get_task_resources, load_pipeline_spec
+from kfp_local.resources import (
+    NO_RESOURCES,
+    ProcessLimits,
+    ResourcePool,
+    TaskResources,
+    host_cores,
+    limit_command,
+    parse_resources,
+)
+
+TEST_LOOP_CONFIG_FILE = "tests/resources/loop_pipeline.json"
+
+GB = 1_000_000_000
+
+
+def test_parse_resources_converts_memory_to_bytes():
+    resources = parse_resources({"cpuLimit": 2.0, "memoryRequest": 0.5})
+    assert resources == TaskResources(0.0, GB // 2, 2.0, 0)
+    assert resources.cpus == 2.0
+    assert resources.memory == GB // 2
+    assert parse_resources({}) == NO_RESOURCES
+
+
+def test_get_task_resources_reads_executor_resources():
+    pipeline = load_pipeline_spec(TEST_LOOP_CONFIG_FILE)
+    assert get_task_resources("total", pipeline) == TaskResources(0.0, 0, 1.0, GB)
+    assert get_task_resources("make-items", pipeline) == NO_RESOURCES
+
+
+def _run_concurrently(pool: ResourcePool, tasks: dict[str, TaskResources]) -> int:
+    """Run tasks on a pool, returning the most that ran at once."""
+    lock = threading.Lock()
+    n_running = 0
+    max_running = 0
+
+    def run_task(resources: TaskResources) -> None:
+        nonlocal n_running, max_running
+        with pool.reserve(resources):
+            with lock:
+                n_running += 1
+                max_running = max(max_running, n_running)
+            time.sleep(0.05)
+            with lock:
+                n_running -= 1
+
+    threads = [threading.Thread(target=run_task, args=(r,)) for r in tasks.values()]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return max_running
+
+
+def test_resource_pool_packs_tasks_onto_cpus_and_memory():
+    pool = ResourcePool(max_workers=8, cpus=4, memory=4 * GB)
+    two_cpus = TaskResources(cpu_request=2.0)
+    assert _run_concurrently(pool, {t: two_cpus for t in "abcd"}) == 2
+
+    three_gb = TaskResources(memory_request=3 * GB)
+    assert _run_concurrently(pool, {t: three_gb for t in "abc"}) == 1
+    assert _run_concurrently(pool, {t: NO_RESOURCES for t in "abcd"}) == 4
+
+    too_big = TaskResources(cpu_request=64.0, memory_request=64 * GB)
+    assert _run_concurrently(pool, {"a": too_big, "b": too_big}) == 1
+
+
+def test_resource_pool_starts_highest_priority_tasks_first():
+    pool = ResourcePool(max_workers=1)
+    started: list[int] = []
+
+    def run_task(priority: int) -> None:
+        with pool.reserve(priority=priority):
+            started.append(priority)
+
+    threads = [threading.Thread(target=run_task, args=(p,)) for p in (1, 3, 2)]
+    with pool.reserve():
+        for thread in threads:
+            thread.start()
+        while len(pool._waiting) < len(threads):
+            time.sleep(0.01)
+    for thread in threads:
+        thread.join()
+    assert started == [3, 2, 1]
+
+
+def test_resource_pool_stops_backfilling_once_a_task_has_waited_too_long():
+    pool = ResourcePool(max_workers=8, cpus=4, backfill_wait=0.2)
+    stop = threading.Event()
+
+    def run_small_tasks() -> None:
+        while not stop.is_set():
+            with pool.reserve(TaskResources(cpu_request=1.0)):
+                time.sleep(0.05)
+
+    threads = [threading.Thread(target=run_small_tasks) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    try:
+        time.sleep(0.1)
+        started = time.monotonic()
+        with pool.reserve(TaskResources(cpu_request=4.0), priority=10):
+            waited = time.monotonic() - started
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    assert waited < 2.0
+
+
+def test_resource_pool_pins_tasks_with_cpu_limits_to_cores():
+    pool = ResourcePool(max_workers=2)
+    with pool.reserve(TaskResources(cpu_limit=1.0, memory_limit=GB)) as limits:
+        assert len(limits.cores) == 1
+        assert limits.cores[0] in host_cores()
+        assert limits.memory == GB
+    with pool.reserve(TaskResources(cpu_request=1.0)) as limits:
+        assert limits == ProcessLimits([], 0)
+
+
+@mark.skipif(sys.platform != "linux", reason="limits are only applied on Linux")
+def test_run_process_applies_limits():
+    code = (
+        "import os, resource, sys; "
+        "assert os.sched_getaffinity(0) == {%d}; "
+        "assert resource.getrlimit(resource.RLIMIT_DATA)[0] == %d; "
+        "bytearray(%d)"
+    )
+    core = host_cores()[-1]
+    limits = ProcessLimits([core], 512 * 1024**2)
+    within_limits = code % (core, limits.memory, 0)
+    assert (
+        run_process([sys.executable, "-c", within_limits], limits=limits).exit_code == 0
+    )
+    too_much = code % (core, limits.memory, limits.memory)
+    assert run_process([sys.executable, "-c", too_much], limits=limits).exit_code == 1
+
+
+@mark.skipif(sys.platform != "linux", reason="limits are only applied on Linux")
+def test_limit_command_sets_limits_before_executing_the_command():
+    cmd = ["sh", "-c", "grep Cpus_allowed_list /proc/self/status"]
+    assert limit_command(cmd, ProcessLimits([], 0)) == cmd
+    core = host_cores()[-1]
+    limited_cmd = limit_command(cmd, ProcessLimits([core], 0))
+    assert limited_cmd[-len(cmd) :] == cmd
+    status = subprocess.run(limited_cmd, capture_output=True, text=True, check=True)
+    assert status.stdout.split() == ["Cpus_allowed_list:", str(core)]
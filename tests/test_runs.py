@@ -0,0 +1,71 @@
+"""Tests for the runs module."""
+import json
+from pathlib import Path
+from unittest.mock import patch
+
+from pytest import raises
+
+from kfp_local.runs import (
+    RUN_FILE,
+    create_run,
+    gc_runs,
+    latest_run,
+    list_runs,
+    new_run_id,
+    set_run_status,
+)
+
+
+def test_new_run_id_generates_unique_ids():
+    assert new_run_id() != new_run_id()
+
+
+def test_create_run_records_run_info(tmp_path: Path):
+    run_dir = create_run(str(tmp_path), "run-1", "my-pipeline")
+    run_info = json.loads((run_dir / RUN_FILE).read_text())
+    assert run_dir == tmp_path / "run-1"
+    assert run_info["pipeline_name"] == "my-pipeline"
+    assert run_info["status"] == "running"
+
+    set_run_status(run_dir, "succeeded")
+    created = run_info["created"]
+    run_info = json.loads(
+        (create_run(str(tmp_path), "run-1", "x") / RUN_FILE).read_text()
+    )
+    assert run_info["created"] == created
+    assert run_info["pipeline_name"] == "my-pipeline"
+
+
+def test_list_runs_ignores_other_directories(tmp_path: Path):
+    (tmp_path / "not-a-run").mkdir()
+    create_run(str(tmp_path), "run-1", "my-pipeline")
+    create_run(str(tmp_path), "run-2", "my-pipeline")
+    assert [run["run_id"] for run in list_runs(str(tmp_path))] == ["run-1", "run-2"]
+    assert latest_run(str(tmp_path)) == "run-2"
+    assert latest_run(str(tmp_path / "does-not-exist")) is None
+
+
+def test_list_runs_skips_run_files_that_cannot_be_read(tmp_path: Path):
+    create_run(str(tmp_path), "run-1", "my-pipeline")
+    (tmp_path / "run-2").mkdir()
+    (tmp_path / "run-2" / RUN_FILE).write_text('{"run_id": "run-2", "cre')
+    (tmp_path / "not-a-dir").write_text("")
+    assert [run["run_id"] for run in list_runs(str(tmp_path))] == ["run-1"]
+
+
+def test_run_files_are_written_atomically(tmp_path: Path):
+    run_dir = create_run(str(tmp_path), "run-1", "my-pipeline")
+    with patch("kfp_local.runs.os.replace", side_effect=OSError("disk full")):
+        with raises(OSError):
+            set_run_status(run_dir, "succeeded")
+    assert list_runs(str(tmp_path))[0]["status"] == "running"
+
+
+def test_gc_runs_deletes_oldest_finished_runs(tmp_path: Path):
+    for run_id in ["run-1", "run-2", "run-3", "run-4"]:
+        run_dir = create_run(str(tmp_path), run_id, "my-pipeline")
+        if run_id != "run-1":
+            set_run_status(run_dir, "succeeded")
+
+    assert gc_runs(str(tmp_path), keep=1) == ["run-2", "run-3"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["run-1", "run-4"]
@@ -0,0 +1,117 @@
+"""Tests for the scheduler module."""
+import threading
+import time
+
+from pytest import raises
+
+from kfp_local.pipelines import load_pipeline_spec
+from kfp_local.scheduler import (
+    build_task_graph,
+    downstream_depths,
+    run_dag,
+    topological_order,
+    upstream_closure,
+    upstream_tasks,
+)
+
+TEST_CONFIG_FILE = "tests/resources/pipeline.json"
+
+
+def test_build_task_graph_uses_dependent_tasks():
+    pipeline = load_pipeline_spec(TEST_CONFIG_FILE)
+    graph = build_task_graph(pipeline, ["stage-0", "stage-1", "stage-2", "stage-3"])
+    assert graph == {
+        "stage-0": set(),
+        "stage-1": {"stage-0"},
+        "stage-2": {"stage-1"},
+        "stage-3": {"stage-2"},
+    }
+
+
+def test_build_task_graph_ignores_tasks_not_being_run():
+    pipeline = load_pipeline_spec(TEST_CONFIG_FILE)
+    graph = build_task_graph(pipeline, ["stage-2", "stage-3"])
+    assert graph == {"stage-2": set(), "stage-3": {"stage-2"}}
+
+
+def test_upstream_tasks_include_producers_of_inputs():
+    pipeline = load_pipeline_spec(TEST_CONFIG_FILE)
+    pipeline.root.dag.tasks["stage-2"].ClearField("dependent_tasks")
+    assert upstream_tasks(pipeline, "stage-0") == set()
+    assert upstream_tasks(pipeline, "stage-2") == {"stage-1"}
+
+
+def test_upstream_closure_finds_all_upstream_tasks():
+    pipeline = load_pipeline_spec(TEST_CONFIG_FILE)
+    assert upstream_closure(pipeline, ["stage-2"]) == ["stage-0", "stage-1", "stage-2"]
+    assert upstream_closure(pipeline, ["stage-0"]) == ["stage-0"]
+
+
+def test_upstream_closure_excludes_materialised_tasks():
+    pipeline = load_pipeline_spec(TEST_CONFIG_FILE)
+    closure = upstream_closure(
+        pipeline, ["stage-3"], is_materialised=lambda task: task == "stage-1"
+    )
+    assert closure == ["stage-2", "stage-3"]
+
+
+def test_topological_order_puts_upstream_tasks_first():
+    graph = {"c": {"a", "b"}, "b": {"a"}, "a": set(), "d": set()}
+    assert topological_order(graph) == ["a", "d", "b", "c"]
+
+
+def test_topological_order_raises_error_on_cycles():
+    with raises(RuntimeError, match="cyclic dependencies"):
+        topological_order({"a": {"b"}, "b": {"a"}, "c": set()})
+
+
+def test_downstream_depths_measures_longest_chains():
+    graph = {"a": set(), "b": {"a"}, "c": {"b"}, "d": {"a"}, "e": set()}
+    assert downstream_depths(graph) == {"a": 3, "b": 2, "c": 1, "d": 1, "e": 1}
+
+
+def test_run_dag_runs_independent_tasks_concurrently():
+    graph = {"root": set(), "a": {"root"}, "b": {"root"}, "c": {"root"}}
+    barrier = threading.Barrier(3, timeout=5)
+    started: list[str] = []
+
+    def run_task(task: str) -> None:
+        started.append(task)
+        if task != "root":
+            barrier.wait()
+
+    run_dag(graph, run_task, max_workers=3)
+    assert started[0] == "root"
+    assert sorted(started[1:]) == ["a", "b", "c"]
+
+
+def test_run_dag_respects_max_workers():
+    graph = {task: set() for task in "abcdef"}
+    lock = threading.Lock()
+    n_running = 0
+    max_running = 0
+
+    def run_task(task: str) -> None:
+        nonlocal n_running, max_running
+        with lock:
+            n_running += 1
+            max_running = max(max_running, n_running)
+        time.sleep(0.02)
+        with lock:
+            n_running -= 1
+
+    run_dag(graph, run_task, max_workers=2)
+    assert max_running == 2
+
+
+def test_run_dag_does_not_run_downstream_tasks_after_failure():
+    graph = {"a": set(), "b": {"a"}}
+    started: list[str] = []
+
+    def run_task(task: str) -> None:
+        started.append(task)
+        raise ValueError(f"{task} failed")
+
+    with raises(ValueError, match="a failed"):
+        run_dag(graph, run_task)
+    assert started == ["a"]
@@ -0,0 +1,98 @@
+"""Tests for the spec module."""
+import gc
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import patch
+
+from kfp_local.spec import (
+    ROOT_DAG,
+    SPEC_CACHE_SUFFIX,
+    _indexes,
+    get_index,
+    load_pipeline_spec,
+)
+
+TEST_CONFIG_FILE = "tests/resources/pipeline.json"
+TEST_LOOP_CONFIG_FILE = "tests/resources/loop_pipeline.json"
+
+
+def test_load_pipeline_spec_caches_parsed_spec(tmp_path: Path):
+    pipeline_file = tmp_path / "pipeline.json"
+    shutil.copy(TEST_CONFIG_FILE, pipeline_file)
+
+    pipeline = load_pipeline_spec(str(pipeline_file))
+    cache_files = list(tmp_path.glob(f"*{SPEC_CACHE_SUFFIX}"))
+    assert len(cache_files) == 1
+    assert load_pipeline_spec(str(pipeline_file)) == pipeline
+
+    pipeline_file.write_text(pipeline_file.read_text().replace("stage-0", "stage-x"))
+    new_pipeline = load_pipeline_spec(str(pipeline_file))
+    assert "stage-x" in new_pipeline.root.dag.tasks
+    new_cache_files = list(tmp_path.glob(f"*{SPEC_CACHE_SUFFIX}"))
+    assert len(new_cache_files) == 1
+    assert new_cache_files != cache_files
+
+
+def test_load_pipeline_spec_writes_cache_atomically(tmp_path: Path):
+    pipeline_file = tmp_path / "pipeline.json"
+    shutil.copy(TEST_CONFIG_FILE, pipeline_file)
+
+    with patch("kfp_local.spec.os.replace", side_effect=OSError):
+        pipeline = load_pipeline_spec(str(pipeline_file))
+    assert list(tmp_path.iterdir()) == [pipeline_file]
+
+    with ThreadPoolExecutor(4) as executor:
+        pipelines = list(executor.map(load_pipeline_spec, [str(pipeline_file)] * 8))
+    assert all(loaded == pipeline for loaded in pipelines)
+    assert len(list(tmp_path.iterdir())) == 2
+
+
+def test_spec_index_contents():
+    pipeline = load_pipeline_spec(TEST_CONFIG_FILE)
+    index = get_index(pipeline)
+    assert list(index.tasks) == list(pipeline.root.dag.tasks)
+    assert index.upstream["stage-0"] == set()
+    assert index.upstream["stage-2"] == {"stage-1"}
+
+    executor_label = index.task_executors["stage-0"]
+    cmd, args = index.executors[executor_label]
+    assert cmd[0] == "sh"
+    assert "--executor_input" in args
+
+    input_params = index.input_params["stage-0"]
+    assert set(input_params) == {"config", "messages", "run_id"}
+    assert input_params["config"].default_value is None
+    assert input_params["run_id"].default_value.string_value == "42"
+
+
+def test_spec_index_indexes_sub_dags():
+    index = get_index(load_pipeline_spec(TEST_LOOP_CONFIG_FILE))
+    assert set(index.dags) == {ROOT_DAG, "comp-for-loop-2", "comp-for-loop-3"}
+    assert index.dags[ROOT_DAG].sub_dags == {
+        "for-loop-2": "comp-for-loop-2",
+        "for-loop-3": "comp-for-loop-3",
+    }
+    assert "for-loop-2" not in index.task_executors
+    assert index.upstream["total"] == {"for-loop-2"}
+
+    loop_dag = index.dags["comp-for-loop-2"]
+    assert list(loop_dag.tasks) == ["square"]
+    assert loop_dag.sub_dags == {}
+    assert loop_dag.task_executors["square"] in index.executors
+    assert index.resources[index.task_executors["total"]] == {
+        "cpuLimit": 1.0,
+        "memoryLimit": 1.0,
+    }
+
+
+def test_get_index_is_memoised_per_spec():
+    pipeline = load_pipeline_spec(TEST_CONFIG_FILE)
+    index = get_index(pipeline)
+    assert get_index(pipeline) is index
+    assert get_index(load_pipeline_spec(TEST_CONFIG_FILE)) is not index
+
+    key = id(pipeline)
+    del pipeline
+    gc.collect()
+    assert key not in _indexes
@@ -0,0 +1,71 @@
+"""Tests for the store module."""
+from pathlib import Path
+
+from kfp_local.store import (
+    BlobStore,
+    file_digest,
+    link_or_copy,
+    link_tree,
+    modified_files,
+    snapshot,
+)
+
+
+def test_link_or_copy_shares_storage_with_original(tmp_path: Path):
+    (tmp_path / "src").write_text("data")
+    (tmp_path / "dest").mkdir()
+    link_or_copy(tmp_path / "src", tmp_path / "dest")
+    assert (tmp_path / "dest").read_text() == "data"
+    assert (tmp_path / "src").samefile(tmp_path / "dest")
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["dest", "src"]
+
+
+def test_link_tree_links_every_file_in_a_directory(tmp_path: Path):
+    (tmp_path / "src" / "a").mkdir(parents=True)
+    (tmp_path / "src" / "a" / "file").write_text("foo")
+    (tmp_path / "src" / "empty").mkdir()
+    (tmp_path / "dest").mkdir()
+    (tmp_path / "dest" / "stale").write_text("bar")
+    link_tree(tmp_path / "src", tmp_path / "dest")
+    assert (tmp_path / "dest" / "a" / "file").read_text() == "foo"
+    assert (tmp_path / "dest" / "empty").is_dir()
+    assert not (tmp_path / "dest" / "stale").exists()
+
+
+def test_file_digest_changes_when_file_is_modified(tmp_path: Path):
+    (tmp_path / "file").write_text("foo")
+    digest = file_digest(tmp_path / "file")
+    assert file_digest(tmp_path / "file") == digest
+    (tmp_path / "file").write_text("foobar")
+    assert file_digest(tmp_path / "file") != digest
+
+
+def test_blob_store_deduplicates_files_by_content(tmp_path: Path):
+    store = BlobStore(str(tmp_path / "cache"))
+    for name in ["a", "b"]:
+        (tmp_path / name).write_text("same data")
+    (tmp_path / "c").write_text("other data")
+
+    digests = [store.put(tmp_path / name) for name in ["a", "b", "c"]]
+    assert digests[0] == digests[1] != digests[2]
+    assert (tmp_path / "a").samefile(tmp_path / "b")
+    assert (tmp_path / "a").samefile(store.path(digests[0]))
+    assert not (tmp_path / "a").stat().st_mode & 0o222
+
+    assert store.prune() == []
+    for name in ["a", "b"]:
+        (tmp_path / name).unlink()
+    assert store.prune() == [digests[0]]
+    assert store.path(digests[2]).exists()
+
+
+def test_modified_files_detects_files_changed_since_snapshot(tmp_path: Path):
+    (tmp_path / "dir").mkdir()
+    for name in ["dir/a", "dir/b", "c"]:
+        (tmp_path / name).write_text("data")
+    before = snapshot([tmp_path / "dir", tmp_path / "c"])
+    assert modified_files(before) == []
+
+    (tmp_path / "dir" / "a").write_text("more data")
+    (tmp_path / "c").unlink()
+    assert sorted(modified_files(before)) == [tmp_path / "c", tmp_path / "dir" / "a"]
@@ -0,0 +1,66 @@
+"""Tests for the sweep module."""
+import threading
+from pathlib import Path
+
+from pytest import raises
+
+from kfp_local.sweep import SingleFlight, load_param_grid, param_combinations
+
+
+def test_param_combinations_expands_grid():
+    grid = {"a": [1, 2], "b": ["x", "y"], "c": True}
+    assert param_combinations(grid) == [
+        {"a": 1, "b": "x", "c": True},
+        {"a": 1, "b": "y", "c": True},
+        {"a": 2, "b": "x", "c": True},
+        {"a": 2, "b": "y", "c": True},
+    ]
+
+
+def test_load_param_grid_loads_grids_and_lists(tmp_path: Path):
+    grid_file = tmp_path / "grid.yaml"
+    grid_file.write_text("a: [1, 2]\nb: foo\n")
+    assert load_param_grid(str(grid_file)) == [
+        {"a": 1, "b": "foo"},
+        {"a": 2, "b": "foo"},
+    ]
+
+    list_file = tmp_path / "list.yaml"
+    list_file.write_text("- {a: 1}\n- {a: 2, b: bar}\n")
+    assert load_param_grid(str(list_file)) == [{"a": 1}, {"a": 2, "b": "bar"}]
+
+
+def test_load_param_grid_raises_error_for_invalid_files(tmp_path: Path):
+    with raises(FileNotFoundError):
+        load_param_grid(str(tmp_path / "missing.yaml"))
+
+    params_file = tmp_path / "params.yaml"
+    params_file.write_text("- 1\n- 2\n")
+    with raises(ValueError, match="must contain a mapping or a list of mappings"):
+        load_param_grid(str(params_file))
+
+    params_file.write_text("a: []\n")
+    with raises(ValueError, match="doesn't define any parameter combinations"):
+        load_param_grid(str(params_file))
+
+
+def test_single_flight_shares_results_between_claims():
+    in_flight = SingleFlight()
+    assert in_flight.claim("key") is None
+    waiting = in_flight.claim("key")
+    assert waiting is not None and not waiting.done()
+
+    threading.Timer(0.05, in_flight.complete, args=("key", "result")).start()
+    assert waiting.result(timeout=5) == "result"
+    completed = in_flight.claim("key")
+    assert completed is not None and completed.result() == "result"
+
+
+def test_single_flight_releases_failed_keys():
+    in_flight = SingleFlight()
+    assert in_flight.claim("key") is None
+    waiting = in_flight.claim("key")
+    in_flight.fail("key", ValueError("broken"))
+    with raises(ValueError, match="broken"):
+        waiting.result()
+    assert in_flight.claim("key") is None
@@ -0,0 +1,61 @@
+"""Tests for the wheelhouse module."""
+from pathlib import Path
+from unittest.mock import patch
+
+from pytest import MonkeyPatch, raises
+
+from kfp_local.launcher import ProcessUsage
+from kfp_local.pipelines import load_pipeline_spec
+from kfp_local.wheelhouse import (
+    WHEELHOUSE_FOLDER,
+    _requirements,
+    build_wheelhouse,
+    find_wheelhouse,
+    pipeline_packages,
+)
+
+TEST_CONFIG_FILE = "tests/resources/pipeline.json"
+TEST_LOOP_CONFIG_FILE = "tests/resources/loop_pipeline.json"
+
+
+def test_pipeline_packages_collects_packages_from_every_executor():
+    packages = pipeline_packages(load_pipeline_spec(TEST_CONFIG_FILE))
+    assert packages == [
+        "kfp==2.4.0",
+        'typing-extensions>=3.7.4,<5; python_version<"3.9"',
+        "numpy",
+    ]
+    loop_packages = pipeline_packages(load_pipeline_spec(TEST_LOOP_CONFIG_FILE))
+    assert loop_packages[0] == "kfp==2.4.0"
+    assert "numpy" not in loop_packages
+
+
+def test_requirements_drops_pip_options_and_their_values():
+    packages = ["--index-url", "https://pypi.org/simple", "numpy", "--pre", "pandas"]
+    assert _requirements(packages) == ["numpy", "pandas"]
+
+
+def test_build_wheelhouse_builds_wheels_for_packages(tmp_path: Path):
+    wheelhouse = str(tmp_path / "wheels")
+    with patch("kfp_local.wheelhouse.run_process") as mock_run:
+        mock_run.return_value = ProcessUsage(0, 0.0, 0.0, 0.0, 0)
+        build_wheelhouse(["numpy"], wheelhouse)
+        wheel_cmd = mock_run.call_args.args[0]
+        assert wheel_cmd[1:4] == ["-m", "pip", "wheel"]
+        assert wheel_cmd[-1] == "numpy"
+        assert wheel_cmd[wheel_cmd.index("--wheel-dir") + 1] == wheelhouse
+        assert Path(wheelhouse).is_dir()
+
+        mock_run.return_value = ProcessUsage(1, 0.0, 0.0, 0.0, 0)
+        with raises(RuntimeError, match="failed to build wheels"):
+            build_wheelhouse(["numpy"], wheelhouse)
+
+
+def test_find_wheelhouse_uses_default_wheelhouse_if_it_exists(
+    tmp_path: Path, monkeypatch: MonkeyPatch
+):
+    monkeypatch.chdir(tmp_path)
+    assert find_wheelhouse() is None
+    assert find_wheelhouse("wheels") == "wheels"
+    (tmp_path / WHEELHOUSE_FOLDER).mkdir()
+    assert find_wheelhouse() == WHEELHOUSE_FOLDER
@@ -0,0 +1,114 @@
+"""Tests for the workers module."""
+import json
+from pathlib import Path
+
+from pytest import fixture, raises
+
+from kfp_local.pipelines import get_task_cmd_args, load_pipeline_spec
+from kfp_local.workers import WorkerPool, parse_component
+
+TEST_CONFIG_FILE = "tests/resources/pipeline.json"
+
+FAILING_COMPONENT = """
+from kfp.dsl import *
+
+def stage_0() -> None:
+    print("about to fail")
+    raise ValueError("this component is broken")
+"""
+
+ARRAY_COMPONENT = """
+from kfp.dsl import *
+
+def stage_0(data: Output[Dataset]) -> None:
+    from kfpl_artifacts import write_array
+
+    write_array(data, [1.0, 2.0])
+"""
+
+
+@fixture(scope="module")
+def worker_pool():
+    with WorkerPool(max_workers=1) as pool:
+        yield pool
+
+
+def test_parse_component_extracts_source_and_function_name():
+    pipeline = load_pipeline_spec(TEST_CONFIG_FILE)
+    cmd, args = get_task_cmd_args("stage-0", pipeline)
+    component = parse_component(cmd, args)
+    assert component is not None
+    source, function_name = component
+    assert "def stage_0(" in source
+    assert function_name == "stage_0"
+
+
+def test_parse_component_returns_none_for_container_components():
+    assert parse_component(["echo"], ["hello"]) is None
+
+
+def test_worker_pool_executes_tasks_and_captures_output(
+    worker_pool: WorkerPool, tmp_path: Path
+):
+    pipeline = load_pipeline_spec(TEST_CONFIG_FILE)
+    cmd, args = get_task_cmd_args("stage-0", pipeline)
+    output_file = tmp_path / "stage-0" / "output_metadata.json"
+    executor_input = {
+        "inputs": {
+            "parameterValues": {
+                "config": {"seed_low": 0, "seed_high": 42},
+                "messages": ["foo"],
+                "run_id": "001",
+            }
+        },
+        "outputs": {"outputFile": str(output_file)},
+    }
+    for _ in range(2):
+        result = worker_pool.run(cmd, args, json.dumps(executor_input))
+        assert result.exit_code == 0
+        assert "RUN_ID = 001" in result.stdout
+        assert "|- message-0: foo" in result.stdout
+        assert "Traceback" not in result.stderr
+    assert "Output" in json.loads(output_file.read_text())["parameterValues"]
+
+
+def test_worker_pool_reports_failed_tasks(worker_pool: WorkerPool, tmp_path: Path):
+    pipeline = load_pipeline_spec(TEST_CONFIG_FILE)
+    cmd, args = get_task_cmd_args("stage-0", pipeline)
+    cmd[-1] = FAILING_COMPONENT
+    executor_input = {"inputs": {}, "outputs": {"outputFile": str(tmp_path / "out")}}
+    result = worker_pool.run(cmd, args, json.dumps(executor_input))
+    assert result.exit_code == 1
+    assert "about to fail" in result.stdout
+    assert "this component is broken" in result.stderr
+
+
+def test_worker_pool_raises_error_for_container_components(worker_pool: WorkerPool):
+    with raises(ValueError, match="only Python function components"):
+        worker_pool.run(["echo"], ["hello"], "{}")
+
+
+def test_worker_pool_can_import_runtime_modules(
+    worker_pool: WorkerPool, tmp_path: Path
+):
+    pipeline = load_pipeline_spec(TEST_CONFIG_FILE)
+    cmd, args = get_task_cmd_args("stage-0", pipeline)
+    cmd[-1] = ARRAY_COMPONENT
+    output_file = tmp_path / "stage-0" / "output_metadata.json"
+    executor_input = {
+        "inputs": {},
+        "outputs": {
+            "artifacts": {
+                "data": {
+                    "artifacts": [{"name": "data", "uri": f"gs://{tmp_path}/data"}]
+                }
+            },
+            "outputFile": str(output_file),
+        },
+    }
+    result = worker_pool.run(cmd, args, json.dumps(executor_input))
+    assert result.exit_code == 0, result.stderr
+    output_metadata = json.loads(output_file.read_text())
+    metadata = output_metadata["artifacts"]["data"]["artifacts"][0]["metadata"]
+    assert metadata["dtype"] == "<f8"
+    assert metadata["shape"] == [2]